@@ -0,0 +1,7 @@
+"""Benchmarks for the storage engines and the console
+
+Each module is a script that can be run from the root of the repository:
+    `python3 -m benchmarks.bench_codec --sizes 10000 100000`
+suite times the main paths on the datasets of datasets.py, and compares
+two of its reports to flag the regressions.
+"""
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Benchmark of the aggregates over the columns of a class
+
+Each row times one report over `size` places of 100 cities: a Python loop
+over storage.all(Place) (the baseline), the first storage.aggregate(),
+which builds the columns it reads, and the next ones, which read the
+columns already built (after one price update, whose row is read again).
+The reports are "the mean price by city" and "the number of guests".
+
+Example:
+    `python3 -m benchmarks.bench_aggregate --sizes 10000 100000`
+"""
+import argparse
+from timeit import Timer
+
+from benchmarks.bench_codec import make_places
+from models.engine import columnar
+from models.engine.columnar import ColumnStore
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def timed(function, repeat=5):
+    """Returns the best time of function(), in milliseconds"""
+    timer = Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1000
+
+
+def mean_price_scan(storage):
+    totals = {}
+    for obj in storage.all(Place).values():
+        total = totals.setdefault(obj.city_id, [0, 0])
+        total[0] += obj.price_by_night
+        total[1] += 1
+    return {city_id: total / count
+            for city_id, (total, count) in totals.items()}
+
+
+def guests_scan(storage):
+    return float(sum(obj.max_guest for obj in storage.all(Place).values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f'NumPy: {"yes" if columnar.numpy is not None else "no"}')
+    print(f'{"objects":>9} {"report":>12} {"scan (ms)":>10} '
+          f'{"first (ms)":>10} {"next (ms)":>10}')
+    for size in args.sizes:
+        objs = make_places(size)
+        for i, obj in enumerate(objs):
+            obj.__dict__['city_id'] = f'city-{i % 100}'
+        storage = FileStorage()
+        for obj in objs:
+            storage.new(obj)
+
+        def mean_price(columns):
+            return columns.aggregate('mean', 'price_by_night', by='city_id')
+
+        def guests(columns):
+            return columns.aggregate('sum', 'max_guest')
+
+        def first(report):
+            return report(ColumnStore(storage.all(Place).items()))
+
+        def update_then(report):
+            obj = objs[size // 2]
+            storage.touch(obj, 'price_by_night', obj.price_by_night)
+            return report(storage.columns(Place))
+
+        assert mean_price_scan(storage) == update_then(mean_price)
+        assert guests_scan(storage) == update_then(guests)
+        for name, scan, report in (('mean price', mean_price_scan,
+                                    mean_price),
+                                   ('guests', guests_scan, guests)):
+            print(f'{size:>9} {name:>12} '
+                  f'{timed(lambda: scan(storage)):>10.3f} '
+                  f'{timed(lambda: first(report)):>10.3f} '
+                  f'{timed(lambda: update_then(report)):>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
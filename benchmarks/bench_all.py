@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark of printing every instance with the console's all command
+
+Each row prints `size` places to /dev/null three ways and shows the time
+and the peak memory allocated (tracemalloc, in a second run): the list of
+every str() printed at once (what all used to do), the same text streamed
+one instance at a time by HBNBCommand.print_objects() the first time (the
+storage formats every instance) and the second time (the text of every
+instance is cached by storage.render()), and the NDJSON output, which
+reuses the JSON text of the saved instances.
+
+Example:
+    `python3 -m benchmarks.bench_all --sizes 10000 100000`
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import models
+from console import HBNBCommand
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def print_list(objs):
+    print([str(obj) for obj in objs])
+
+
+def measure(function, objs, out):
+    """Returns the time of function(objs) in seconds and the peak memory
+    it allocates in MB, printing to out"""
+    with contextlib.redirect_stdout(out):
+        start = perf_counter()
+        function(objs)
+        elapsed = perf_counter() - start
+        tracemalloc.start()
+        function(objs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f'{"objects":>9} {"list (s)":>9} {"MB":>7} {"stream (s)":>11} '
+          f'{"MB":>7} {"cached (s)":>11} {"MB":>7} {"ndjson (s)":>11} '
+          f'{"MB":>7}')
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            open(os.devnull, 'w', encoding='UTF-8') as devnull:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           'file.json')
+        for size in args.sizes:
+            models.storage = FileStorage()
+            Place.bulk_create(size, name='Loft', amenity_ids=['a', 'b'])
+            objs = models.storage.all(Place).values()
+            old, old_mb = measure(print_list, objs, devnull)
+            # a new storage, so that nothing is rendered yet
+            models.storage = FileStorage()
+            models.storage.reload()
+            objs = models.storage.all(Place).values()
+            with contextlib.redirect_stdout(devnull):
+                start = perf_counter()
+                HBNBCommand.print_objects(objs)
+                cold = perf_counter() - start
+            cached, cached_mb = measure(HBNBCommand.print_objects, objs,
+                                        devnull)
+            ndjson, ndjson_mb = measure(HBNBCommand.print_ndjson, objs,
+                                        devnull)
+            # the peak of the first run, in another new storage
+            models.storage = FileStorage()
+            models.storage.reload()
+            objs = models.storage.all(Place).values()
+            tracemalloc.start()
+            with contextlib.redirect_stdout(devnull):
+                HBNBCommand.print_objects(objs)
+            cold_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            print(f'{size:>9} {old:>9.3f} {old_mb:>7.1f} {cold:>11.3f} '
+                  f'{cold_mb:>7.1f} {cached:>11.3f} {cached_mb:>7.1f} '
+                  f'{ndjson:>11.3f} {ndjson_mb:>7.1f}')
+
+
+if __name__ == '__main__':
+    main()
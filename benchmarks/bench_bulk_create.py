@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark of creating many instances with Model.bulk_create()
+
+Each row times the creation and the save of `size` places, in a fresh
+storage, three ways: `Place()` and `place.save()` for every place like
+the console's create command (only up to 1000 places, it saves the whole
+file every time), `Place()` for every place and a single save (what
+storage.batch() does), and Place.bulk_create(size).
+
+Example:
+    `python3 -m benchmarks.bench_bulk_create --sizes 10000 100000`
+"""
+import argparse
+import os
+import tempfile
+from time import perf_counter
+
+import models
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def timed(function, size):
+    """Returns the time of function(size) in a new storage, in seconds"""
+    models.storage = FileStorage()
+    start = perf_counter()
+    function(size)
+    elapsed = perf_counter() - start
+    assert models.storage.count(Place) == size
+    os.remove(FileStorage._FileStorage__file_path)
+    return elapsed
+
+
+def one_by_one(size):
+    for _ in range(size):
+        place = Place()
+        place.city_id = 'a'
+        place.save()
+
+
+def single_save(size):
+    for _ in range(size):
+        place = Place()
+        place.city_id = 'a'
+    models.storage.save()
+
+
+def bulk(size):
+    Place.bulk_create(size, city_id='a')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           'file.json')
+        print(f'{"objects":>9} {"save each (s)":>14} {"one save (s)":>13} '
+              f'{"bulk_create (s)":>16} {"objects/s":>10}')
+        for size in args.sizes:
+            each = f'{timed(one_by_one, size):.3f}' if size <= 1000 else '-'
+            single = timed(single_save, size)
+            elapsed = timed(bulk, size)
+            print(f'{size:>9} {each:>14} {single:>13.3f} {elapsed:>16.3f} '
+                  f'{size / elapsed:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
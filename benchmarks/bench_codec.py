@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark of FileStorage.save() and reload() for every JSON codec
+
+Every codec row is a FileStorage using that codec, saving with a cold
+cache (every object is encoded) and reloading the file it wrote; the
+speedups are relative to the stdlib 'json' codec. The baseline row is the
+original implementation, `json.dump` of the to_dict() of every object and
+`json.load` of the whole file, which neither caches the encoded objects
+nor builds the indexes.
+
+Example:
+    `python3 -m benchmarks.bench_codec --sizes 10000 100000 1000000`
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+from datetime import datetime
+from time import perf_counter
+from uuid import uuid4
+
+from models import classes
+from models.engine.codec import CODECS
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def make_places(size):
+    """Returns size Place instances that are not registered in storage"""
+    now = datetime.now().isoformat()
+    return [Place(id=str(uuid4()), created_at=now, updated_at=now,
+                  city_id=str(uuid4()), user_id=str(uuid4()),
+                  name=f'Place {i}', description='A nice place',
+                  number_rooms=i % 5, max_guest=i % 8,
+                  price_by_night=i % 300, latitude=37.77, longitude=-122.41,
+                  amenity_ids=[str(uuid4()), str(uuid4())])
+            for i in range(size)]
+
+
+def bench_baseline(objs, path):
+    """Times the original full json.dump / json.load round trip"""
+    gc.collect()
+    start = perf_counter()
+    with open(path, 'w', encoding='UTF-8') as file:
+        json.dump({f'Place.{obj.id}': obj.to_dict() for obj in objs}, file)
+    save = perf_counter() - start
+    start = perf_counter()
+    with open(path, 'r', encoding='UTF-8') as file:
+        loaded = {k: classes[v['__class__']](**v)
+                  for k, v in json.load(file).items()}
+    reload = perf_counter() - start
+    assert len(loaded) == len(objs)
+    return save, reload
+
+
+def bench_codec(objs, name):
+    """Times a cold FileStorage.save() and a reload() with one codec"""
+    gc.collect()
+    storage = FileStorage(codec=name)
+    for obj in objs:
+        storage.new(obj)
+    start = perf_counter()
+    storage.save()
+    save = perf_counter() - start
+    start = perf_counter()
+    storage.reload()
+    reload = perf_counter() - start
+    assert storage.count() == len(objs)
+    return save, reload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    file_path = FileStorage._FileStorage__file_path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'file.json')
+        FileStorage._FileStorage__file_path = path
+        try:
+            print(f'{"objects":>9} {"codec":>9} {"save (s)":>9} '
+                  f'{"reload (s)":>10} {"save x":>7} {"reload x":>8}')
+            for size in args.sizes:
+                objs = make_places(size)
+                rows = [('baseline', bench_baseline(objs, path))]
+                rows += [(name, bench_codec(objs, name)) for name in CODECS]
+                base = dict(rows)['json']
+                for name, (save, reload) in rows:
+                    print(f'{size:>9} {name:>9} {save:>9.3f} {reload:>10.3f}'
+                          f' {base[0] / save:>7.2f} {base[1] / reload:>8.2f}')
+        finally:
+            FileStorage._FileStorage__file_path = file_path
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Benchmark of the save latency of every fsync policy of FileStorage
+
+Every row times a series of saves of a storage of --size Place objects,
+each save after changing one object, in both persistence modes. The
+'group' policy flushes in a background thread, so its saves cost about
+the same as 'none' while a crash loses at most --interval milliseconds.
+
+Example:
+    `python3 -m benchmarks.bench_fsync --size 10000 --saves 200`
+"""
+import argparse
+import os
+import tempfile
+from statistics import mean, quantiles
+from time import perf_counter
+
+from benchmarks.bench_codec import make_places
+from models.engine.durability import SyncPolicy
+from models.engine.file_storage import FileStorage
+
+
+def bench_policy(objs, mode, policy, saves, interval):
+    """Returns the latency of every save, in milliseconds"""
+    storage = FileStorage(mode=mode, fsync=policy, fsync_interval=interval,
+                          log_threshold=len(objs) + saves)
+    for obj in objs:
+        storage.new(obj)
+    storage.save()
+    latencies = []
+    for i in range(saves):
+        obj = objs[i % len(objs)]
+        obj.name = f'Place {i}'
+        storage.new(obj)
+        start = perf_counter()
+        storage.save()
+        latencies.append((perf_counter() - start) * 1000)
+    storage.compact()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--saves', type=int, default=200)
+    parser.add_argument('--interval', type=int, default=50,
+                        help="delay of the 'group' flushes in milliseconds")
+    args = parser.parse_args()
+
+    objs = make_places(args.size)
+    file_path = FileStorage._FileStorage__file_path
+    with tempfile.TemporaryDirectory(dir='.') as tmp_dir:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           'file.json')
+        try:
+            print(f'{"mode":>8} {"fsync":>6} {"mean (ms)":>9} '
+                  f'{"p50 (ms)":>9} {"p99 (ms)":>9}')
+            for mode in FileStorage.modes:
+                for policy in SyncPolicy.policies:
+                    latencies = bench_policy(objs, mode, policy, args.saves,
+                                             args.interval)
+                    cuts = quantiles(latencies, n=100)
+                    print(f'{mode:>8} {policy:>6} {mean(latencies):>9.3f} '
+                          f'{cuts[49]:>9.3f} {cuts[98]:>9.3f}')
+        finally:
+            FileStorage._FileStorage__file_path = file_path
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark of the memory used per instance, regular against compact
+
+Instances are built the way FileStorage.reload() builds them, from the
+dictionaries of to_dict(), and the memory allocated for them is measured
+with tracemalloc. Strings shared by every instance (the class defaults)
+are not counted, the id and timestamps of each instance are.
+
+Example:
+    `python3 -m benchmarks.bench_memory --size 100000`
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime
+from uuid import uuid4
+
+from models.amenity import Amenity
+from models.city import City
+from models.compact import compact
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+def make_records(cls, size):
+    """Returns size to_dict() dictionaries of instances of cls"""
+    now = datetime.now().isoformat()
+    extra = {'City': {'state_id': 'state', 'name': 'San Francisco'},
+             'User': {'email': 'hbnb@example.com', 'first_name': 'Betty'},
+             'Place': {'city_id': 'city', 'user_id': 'user',
+                       'name': 'Loft', 'max_guest': 4,
+                       'price_by_night': 100, 'latitude': 37.77,
+                       'longitude': -122.41},
+             'Review': {'place_id': 'place', 'user_id': 'user',
+                        'text': 'Great'},
+             }.get(cls.__name__, {'name': 'name'})
+    return [dict(id=str(uuid4()), created_at=now, updated_at=now,
+                 __class__=cls.__name__, **extra) for _ in range(size)]
+
+
+def bytes_per_object(cls, records):
+    """Returns the memory allocated per instance of cls built from
+    records"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [cls(**record) for record in records]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(objs) == len(records)
+    return (after - before) / len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f'{"class":>8} {"regular":>9} {"compact":>9} {"saved":>6}')
+    for cls in (User, State, City, Amenity, Place, Review):
+        records = make_records(cls, args.size)
+        regular = bytes_per_object(cls, records)
+        small = bytes_per_object(compact(cls), records)
+        print(f'{cls.__name__:>8} {regular:>9.0f} {small:>9.0f} '
+              f'{1 - small / regular:>6.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark of the parsing of the console command lines
+
+Each row parses a script of `size` lines (show, update and count commands
+on places, in both syntaxes, half of them with quoted values) and prints
+the lines parsed per second: with shlex.split() (how parse_line used to
+tokenize every line), with console_parser without its caches (every line
+is parsed), and with console_parser once the caches hold the few shapes
+of the script (the lines differ by their ids and quoted names, which are
+put back in the cached results). The last columns run the whole script
+in the console, parsing and dispatch included, on a storage holding the
+places.
+
+Example:
+    `python3 -m benchmarks.bench_parse --sizes 10000 100000`
+"""
+import argparse
+import contextlib
+import os
+import shlex
+import tempfile
+from random import Random
+from time import perf_counter
+
+import console_parser
+import models
+from console import HBNBCommand
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def make_script(size, ids, seed=0):
+    """Returns size command lines on the places of ids"""
+    rand = Random(seed)
+    lines = []
+    for i in range(size):
+        obj_id = rand.choice(ids)
+        lines.append((f'show Place {obj_id}',
+                      f'Place.show("{obj_id}")',
+                      f'update Place {obj_id} name "Loft {i % 50}"',
+                      f'Place.update("{obj_id}", "max_guest", {i % 8})',
+                      f"Place.update(\"{obj_id}\", {{'name': 'Flat'}})",
+                      'Place.count()')[i % 6])
+    return lines
+
+
+def parse(lines):
+    """Parses lines like the console does"""
+    for line in lines:
+        call = console_parser.parse_call(line)
+        if call is None:
+            console_parser.tokenize(line)
+
+
+@contextlib.contextmanager
+def uncached():
+    """Parses with the functions of console_parser without their caches"""
+    names = ('_tokenize', '_parse_call', '_parse_query')
+    cached = [getattr(console_parser, name) for name in names]
+    for name, function in zip(names, cached):
+        setattr(console_parser, name, function.__wrapped__)
+    try:
+        yield
+    finally:
+        for name, function in zip(names, cached):
+            setattr(console_parser, name, function)
+
+
+def rate(function, lines):
+    """Returns the lines per second of function(lines), the best of 3"""
+    best = None
+    for _ in range(3):
+        start = perf_counter()
+        function(lines)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def run(lines):
+    """Runs lines in the console"""
+    console = HBNBCommand()
+    for line in lines:
+        console.onecmd(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f'{"lines":>9} {"shlex (/s)":>11} {"uncached (/s)":>14} '
+          f'{"cached (/s)":>12} {"run uncached (/s)":>18} '
+          f'{"run cached (/s)":>16}')
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            open(os.devnull, 'w', encoding='UTF-8') as devnull:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           'file.json')
+        for size in args.sizes:
+            models.storage = FileStorage()
+            ids = [obj.id for obj in Place.bulk_create(1000)]
+            lines = make_script(size, ids)
+            shlex_rate = rate(lambda lines: [shlex.split(line)
+                                             for line in lines], lines)
+            console_parser.cache_clear()
+            with uncached():
+                plain = rate(parse, lines)
+            cached = rate(parse, lines)
+            with models.storage.batch(), \
+                    contextlib.redirect_stdout(devnull):
+                with uncached():
+                    run_plain = rate(run, lines)
+                run_cached = rate(run, lines)
+            print(f'{size:>9} {shlex_rate:>11.0f} {plain:>14.0f} '
+                  f'{cached:>12.0f} {run_plain:>18.0f} '
+                  f'{run_cached:>16.0f}')
+
+
+if __name__ == '__main__':
+    main()
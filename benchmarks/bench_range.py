@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark of range queries with and without sorted indexes
+
+Each row times one query over `size` places: a Python scan of
+storage.all(Place) (the baseline), the same query through storage.query()
+without sorted indexes, which scans the instances of Place, and with the
+default sorted indexes, which bisect them. The queries are "places under
+$3" (1% of the places), "the 20 places updated last" and a price update,
+which moves the place in the sorted index (its scan column is the update
+without sorted indexes).
+
+Example:
+    `python3 -m benchmarks.bench_range --sizes 10000 100000`
+"""
+import argparse
+from datetime import datetime, timedelta
+from timeit import Timer
+
+from benchmarks.bench_codec import make_places
+from models.engine.file_storage import FileStorage
+from models.engine.index import DEFAULT_SORTED_INDEXES
+from models.place import Place
+
+
+def timed(function, repeat=5):
+    """Returns the best time of function(), in milliseconds"""
+    timer = Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1000
+
+
+def make_storage(objs, sorted_indexes):
+    storage = FileStorage(sorted_indexes=sorted_indexes)
+    for obj in objs:
+        storage.new(obj)
+    return storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f'{"objects":>9} {"query":>14} {"scan (ms)":>10} '
+          f'{"unsorted (ms)":>13} {"sorted (ms)":>11}')
+    for size in args.sizes:
+        objs = make_places(size)
+        start = datetime(2024, 1, 1)
+        for i, obj in enumerate(objs):
+            obj.__dict__['updated_at'] = start + timedelta(seconds=i)
+        unsorted = make_storage(objs, {})
+        indexed = make_storage(objs, DEFAULT_SORTED_INDEXES)
+
+        def cheap_scan(storage):
+            return [obj for obj in storage.all(Place).values()
+                    if obj.price_by_night < 3]
+
+        def latest_scan(storage):
+            return sorted(storage.all(Place).values(),
+                          key=lambda obj: obj.updated_at,
+                          reverse=True)[:20]
+
+        def cheap(storage):
+            return storage.query(Place).where(price_by_night__lt=3).all()
+
+        def latest(storage):
+            return storage.query(Place).order_by('-updated_at') \
+                .limit(20).all()
+
+        def update(storage):
+            obj = objs[size // 2]
+            value = 299 - obj.price_by_night
+            storage.touch(obj, 'price_by_night', value)
+            obj.__dict__['price_by_night'] = value
+
+        assert set(cheap_scan(unsorted)) == set(cheap(indexed))
+        assert latest_scan(unsorted) == latest(indexed)
+        for name, scan, query in (('under $3', cheap_scan, cheap),
+                                  ('latest 20', latest_scan, latest),
+                                  ('update', update, update)):
+            print(f'{size:>9} {name:>14} '
+                  f'{timed(lambda: scan(unsorted)):>10.3f} '
+                  f'{timed(lambda: query(unsorted)):>13.3f} '
+                  f'{timed(lambda: query(indexed)):>11.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark of the time and peak memory of FileStorage.reload()
+
+The baseline row is the original reload(), `json.load` of the whole file
+followed by the instances. The whole file row reads the file like the
+previous reload(): the whole text decoded with the fastest codec, then
+the instances and the cached JSON text of every object, so it holds the
+text, the decoded dictionary and the instances at the same time. The
+other rows are reload() reading each file format as a stream. Peak memory
+is measured with tracemalloc.
+
+Example:
+    `python3 -m benchmarks.bench_reload --sizes 10000 100000`
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+from benchmarks.bench_codec import make_places
+from models import classes
+from models.engine.codec import get_codec
+from models.engine.file_storage import FileStorage
+from models.engine.snapshot import FORMATS
+
+
+def measure(function):
+    """Returns the time and the peak memory, in MiB, of function(), from
+    two runs since tracemalloc slows down allocations"""
+    gc.collect()
+    start = perf_counter()
+    function()
+    elapsed = perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / (1 << 20)
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def baseline(path):
+    """The original reload()"""
+    with open(path, 'r', encoding='UTF-8') as file:
+        return {k: classes[v['__class__']](**v)
+                for k, v in json.load(file).items()}
+
+
+def whole_file(path):
+    """The previous FileStorage.reload(), without the indexes"""
+    codec = get_codec()
+    with open(path, 'r', encoding='UTF-8') as file:
+        objs_dict = codec.loads(file.read())
+    objs, fragments = {}, {}
+    for k, v in objs_dict.items():
+        objs[k] = classes[v['__class__']](**v)
+        fragments[k] = codec.dumps(v)
+    return objs, fragments
+
+
+def reload(file_format):
+    """FileStorage.reload() of a file in file_format"""
+    storage = FileStorage(file_format=file_format)
+    storage.reload()
+    return storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    file_path = FileStorage._FileStorage__file_path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            print(f'{"objects":>9} {"reader":>14} {"reload (s)":>10} '
+                  f'{"peak (MiB)":>10}')
+            for size in args.sizes:
+                objs = make_places(size)
+                for file_format in FORMATS:
+                    # a file per format and size: save() merges the file
+                    # it finds, which must be in its format
+                    path = os.path.join(tmp_dir, f'{size}.{file_format}')
+                    FileStorage._FileStorage__file_path = path
+                    storage = FileStorage(file_format=file_format)
+                    for obj in objs:
+                        storage.new(obj)
+                    storage.save()
+                    del storage
+                    rows = [(f'{file_format} stream',
+                             measure(lambda: reload(file_format)))]
+                    if file_format == 'json':
+                        rows[:0] = [('baseline',
+                                     measure(lambda: baseline(path))),
+                                    ('whole file',
+                                     measure(lambda: whole_file(path)))]
+                    for name, (elapsed, peak) in rows:
+                        print(f'{size:>9} {name:>14} {elapsed:>10.3f} '
+                              f'{peak:>10.1f}')
+        finally:
+            FileStorage._FileStorage__file_path = file_path
+
+
+if __name__ == '__main__':
+    main()
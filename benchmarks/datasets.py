@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Synthetic datasets of every model class for the benchmarks
+
+make_dataset(size, seed) returns `size` instances, not registered in any
+storage, linked like real data: states, their cities, users, amenities,
+places of a city and a user with a few amenities each, and reviews of a
+place by a user. The same size and seed give the same instances (ids,
+dates and values), so that two benchmark runs read the same data.
+
+Example:
+    `python3 -m benchmarks.datasets --size 100000`
+"""
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+from random import Random
+from uuid import UUID
+
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+# share of each class in a dataset, the reviews get the rest
+SHARES = (('State', 0.005), ('City', 0.05), ('Amenity', 0.01),
+          ('User', 0.1), ('Place', 0.3))
+
+_START = datetime(2024, 1, 1)
+
+
+def counts(size):
+    """Returns the number of instances of every class in a dataset of
+    size instances, by class name"""
+    numbers = {name: max(1, int(size * share)) for name, share in SHARES}
+    numbers['Review'] = max(size - sum(numbers.values()), 0)
+    return numbers
+
+
+class _Generator:
+    """Builds the instances of one dataset from a seeded random source"""
+
+    def __init__(self, seed):
+        self.random = Random(seed)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        self.words = [''.join(self.random.choices(
+            letters, k=self.random.randrange(3, 11))) for _ in range(2000)]
+
+    def base(self):
+        """Returns the id and dates of a new instance"""
+        created = _START + timedelta(
+            seconds=self.random.randrange(365 * 24 * 3600))
+        updated = created + timedelta(
+            seconds=self.random.randrange(30 * 24 * 3600))
+        return {'id': str(UUID(int=self.random.getrandbits(128),
+                               version=4)),
+                'created_at': created.isoformat(),
+                'updated_at': updated.isoformat()}
+
+    def word(self):
+        return self.random.choice(self.words).capitalize()
+
+    def text(self, count):
+        return ' '.join(self.random.choices(self.words, k=count))
+
+    def ids(self, objs, k):
+        return [obj.id for obj in self.random.sample(objs, min(k, len(objs)))]
+
+
+def make_dataset(size, seed=0):
+    """Returns size instances of every model class, linked by their ids
+
+    Args:
+        size (int): the number of instances
+        seed (int): the seed of the random values
+
+    Return:
+        list: the instances, by class (states first, reviews last)
+    """
+    gen = _Generator(seed)
+    rand = gen.random
+    numbers = counts(size)
+    states = [State(name=gen.word(), **gen.base())
+              for _ in range(numbers['State'])]
+    cities = [City(state_id=rand.choice(states).id, name=gen.word(),
+                   **gen.base())
+              for _ in range(numbers['City'])]
+    amenities = [Amenity(name=gen.word(), **gen.base())
+                 for _ in range(numbers['Amenity'])]
+    users = []
+    for _ in range(numbers['User']):
+        first, last = gen.word(), gen.word()
+        users.append(User(email=f'{first}.{last}@example.com'.lower(),
+                          password=gen.text(2), first_name=first,
+                          last_name=last, **gen.base()))
+    places = [Place(city_id=rand.choice(cities).id,
+                    user_id=rand.choice(users).id,
+                    name=f'{gen.word()} {gen.word()}',
+                    description=gen.text(12),
+                    number_rooms=rand.randrange(1, 6),
+                    number_bathrooms=rand.randrange(1, 4),
+                    max_guest=rand.randrange(1, 11),
+                    price_by_night=rand.randrange(20, 500),
+                    latitude=round(rand.uniform(25, 49), 6),
+                    longitude=round(rand.uniform(-124, -67), 6),
+                    amenity_ids=gen.ids(amenities, rand.randrange(0, 8)),
+                    **gen.base())
+              for _ in range(numbers['Place'])]
+    reviews = [Review(place_id=rand.choice(places).id,
+                      user_id=rand.choice(users).id,
+                      text=gen.text(rand.randrange(5, 40)),
+                      **gen.base())
+               for _ in range(numbers['Review'])]
+    return states + cities + amenities + users + places + reviews
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    objs = make_dataset(args.size, args.seed)
+    for name, count in Counter(type(obj).__name__ for obj in objs).items():
+        print(f'{name:>9} {count:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Benchmark suite of the storage and console hot paths
+
+`run` times every case on the datasets of benchmarks.datasets (every
+model class, linked by their ids) at each size, each case in its own
+process, so that its peak RSS is its own, and reports for each one:
+    throughput: objects per second for the cases over the whole storage
+        (save, reload, all), operations per second otherwise
+    latency: mean, p50, p90, p99 and max of one operation, in ms
+    peak RSS: the peak resident memory of the process, in MB
+The report is printed as a table and written as JSON with --output.
+
+`compare` reads two JSON reports and flags the cases whose p50 latency
+grew, or whose throughput dropped, by more than --threshold (10% by
+default), exiting with status 1 if there is any.
+
+Cases:
+    to_dict, init_kwargs: BaseModel.to_dict() and cls(**to_dict())
+    save_all, save_one, reload: FileStorage.save() of every instance, of
+        one changed instance, and FileStorage.reload()
+    all, count, show, update: the console commands on Place
+
+Example:
+    `python3 -m benchmarks.suite run --sizes 1000 100000 --output new.json`
+    `python3 -m benchmarks.suite compare old.json new.json`
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+from math import ceil
+from time import perf_counter
+
+from benchmarks.datasets import make_dataset
+
+SAMPLE = 10000  # instances timed one by one by the per-instance cases
+
+CASES = {}  # name -> function(objs, repeat) -> (latencies, items per op)
+
+
+def case(name):
+    """Registers the decorated function as the case name"""
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+
+def timed(function, *args, **kwargs):
+    """Returns the time of function(*args, **kwargs), in seconds"""
+    start = perf_counter()
+    function(*args, **kwargs)
+    return perf_counter() - start
+
+
+def sample(objs, count=SAMPLE):
+    """Returns at most count instances spread over objs"""
+    return objs[::max(1, len(objs) // count)][:count]
+
+
+def make_storage(objs, save=True):
+    """Returns a FileStorage holding objs, saved to its file"""
+    from models.engine.file_storage import FileStorage
+
+    storage = FileStorage()
+    for obj in objs:
+        storage.new(obj)
+    if save:
+        storage.save()
+    return storage
+
+
+@case('to_dict')
+def bench_to_dict(objs, repeat):
+    return [timed(obj.to_dict) for obj in sample(objs)], 1
+
+
+@case('init_kwargs')
+def bench_init_kwargs(objs, repeat):
+    records = [(type(obj), obj.to_dict()) for obj in sample(objs)]
+    return [timed(cls, **record) for cls, record in records], 1
+
+
+@case('save_all')
+def bench_save_all(objs, repeat):
+    latencies = []
+    for _ in range(repeat):
+        storage = make_storage(objs, save=False)
+        gc.collect()
+        latencies.append(timed(storage.save))
+    return latencies, len(objs)
+
+
+@case('save_one')
+def bench_save_one(objs, repeat):
+    storage = make_storage(objs)
+    latencies = []
+    for obj in sample(objs, repeat * 10):
+        storage.new(obj)
+        latencies.append(timed(storage.save))
+    return latencies, 1
+
+
+@case('reload')
+def bench_reload(objs, repeat):
+    storage = make_storage(objs)
+    latencies = []
+    for _ in range(repeat):
+        gc.collect()
+        latencies.append(timed(storage.reload))
+    return latencies, len(objs)
+
+
+def run_commands(objs, lines):
+    """Returns the time of every console command of lines, run like in
+    the interactive console on a storage holding objs"""
+    import models
+    from console import HBNBCommand
+
+    models.storage = make_storage(objs)
+    console = HBNBCommand()
+    latencies = []
+    with open(os.devnull, 'w', encoding='UTF-8') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for line in lines:
+            latencies.append(timed(
+                lambda: console.onecmd(console.precmd(line))))
+    return latencies
+
+
+def places(objs):
+    return [obj for obj in objs if type(obj).__name__ == 'Place']
+
+
+@case('all')
+def bench_all(objs, repeat):
+    return run_commands(objs, ['all Place'] * repeat), len(places(objs))
+
+
+@case('count')
+def bench_count(objs, repeat):
+    return run_commands(objs, ['Place.count()'] * repeat * 100), 1
+
+
+@case('show')
+def bench_show(objs, repeat):
+    return run_commands(objs, [f'show Place {obj.id}' for obj in
+                               sample(places(objs), repeat * 100)]), 1
+
+
+@case('update')
+def bench_update(objs, repeat):
+    return run_commands(objs, [f'update Place {obj.id} name "Loft"' for obj
+                               in sample(places(objs), repeat * 10)]), 1
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of the sorted values"""
+    return values[max(0, min(len(values) - 1,
+                             ceil(percent / 100 * len(values)) - 1))]
+
+
+def peak_rss():
+    """Returns the peak resident memory of the process, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_case(name, size, seed, repeat):
+    """Returns the result of the case name on a dataset of size instances"""
+    objs = make_dataset(size, seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        from models.engine.file_storage import FileStorage
+
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           'file.json')
+        latencies, items = CASES[name](objs, repeat)
+    total = sum(latencies)
+    latencies.sort()
+    return {'case': name,
+            'size': size,
+            'ops': len(latencies),
+            'unit': 'objects/s' if items > 1 else 'ops/s',
+            'throughput': len(latencies) * items / total if total else None,
+            'latency_ms': {'mean': total / len(latencies) * 1000,
+                           'p50': percentile(latencies, 50) * 1000,
+                           'p90': percentile(latencies, 90) * 1000,
+                           'p99': percentile(latencies, 99) * 1000,
+                           'max': latencies[-1] * 1000},
+            'peak_rss_mb': peak_rss()}
+
+
+def environment():
+    """Returns the description of the machine and code measured"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count(),
+            'commit': commit}
+
+
+def run(args):
+    """Runs every case at every size, each in a new process"""
+    results = []
+    print(f'{"case":>12} {"objects":>9} {"throughput":>20} {"p50 (ms)":>9} '
+          f'{"p99 (ms)":>9} {"RSS (MB)":>9}', file=sys.stderr)
+    for size in args.sizes:
+        for name in args.cases:
+            worker = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.suite', 'worker', name,
+                 str(size), '--seed', str(args.seed),
+                 '--repeat', str(args.repeat)],
+                capture_output=True, text=True, check=True)
+            result = json.loads(worker.stdout)
+            results.append(result)
+            latency = result['latency_ms']
+            print(f'{name:>12} {size:>9} '
+                  f'{result["throughput"]:>10.0f} {result["unit"]:<9} '
+                  f'{latency["p50"]:>9.3f} {latency["p99"]:>9.3f} '
+                  f'{result["peak_rss_mb"]:>9.1f}', file=sys.stderr)
+    report = {'version': 1, 'seed': args.seed, 'repeat': args.repeat,
+              'environment': environment(), 'results': results}
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            json.dump(report, file, indent=2)
+
+
+def compare(args):
+    """Flags the regressions of the new report, returns the exit status"""
+    reports = []
+    for path in (args.old, args.new):
+        with open(path, encoding='UTF-8') as file:
+            reports.append({(result['case'], result['size']): result
+                            for result in json.load(file)['results']})
+    old, new = reports
+    regressions = 0
+    print(f'{"case":>12} {"objects":>9} {"p50 old":>10} {"p50 new":>10} '
+          f'{"p50":>7} {"throughput":>10}')
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        latency = after['latency_ms']['p50'] / before['latency_ms']['p50'] \
+            if before['latency_ms']['p50'] else 1.0
+        throughput = after['throughput'] / before['throughput'] \
+            if before['throughput'] else 1.0
+        slower = latency > 1 + args.threshold or \
+            throughput < 1 - args.threshold
+        regressions += slower
+        print(f'{key[0]:>12} {key[1]:>9} '
+              f'{before["latency_ms"]["p50"]:>10.3f} '
+              f'{after["latency_ms"]["p50"]:>10.3f} {latency - 1:>+7.1%} '
+              f'{throughput - 1:>+10.1%}{"  REGRESSION" if slower else ""}')
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f'{key[0]:>12} {key[1]:>9} only in '
+              f'{args.old if key in old else args.new}')
+    print(f'{regressions} regression(s) above {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[1000, 10000, 100000])
+    run_parser.add_argument('--cases', nargs='+', choices=list(CASES),
+                            default=list(CASES))
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--repeat', type=int, default=5,
+                            help='repetitions of the whole-storage cases')
+    run_parser.add_argument('--output', help='JSON report file, - for '
+                            'the standard output')
+    compare_parser = commands.add_parser('compare',
+                                         help='compare two JSON reports')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    worker_parser = commands.add_parser('worker', help=argparse.SUPPRESS)
+    worker_parser.add_argument('case', choices=list(CASES))
+    worker_parser.add_argument('size', type=int)
+    worker_parser.add_argument('--seed', type=int, default=0)
+    worker_parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'compare':
+        sys.exit(compare(args))
+    else:
+        json.dump(run_case(args.case, args.size, args.seed, args.repeat),
+                  sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,13 @@ Example:
     python console.py
     ```
 
+    To run the commands of a file, or piped to the script, saving the
+    changes once at the end (or every N commands with --flush-every N):
+    ```
+    python console.py --script fixtures.txt
+    cat fixtures.txt | python console.py --flush-every 10000
+    ```
+
 Key Features:
     - Supports various commands for managing HBNB properties.
     - Provides an interactive command-line interface for user interaction.
@@ -25,13 +32,17 @@ Notes:
 """
 # standard library imports
 import cmd
-import re
+import json
+import shlex
+import sys
 
 # related third party imports
 from inspect import cleandoc
 
 # local imports
 import models
+from console_parser import parse_call, parse_query, tokenize
+from models.engine.metrics import profile, registry as metrics, timed
 
 
 class HBNBCommand(cmd.Cmd):
@@ -39,6 +50,7 @@ class HBNBCommand(cmd.Cmd):
     An interactive command line interpreter
 
     Methods:
+    - precmd(line): Loads the changes of other processes.
     - emptyline(): Does nothing when an empty line is entered.
     - parse_line(line): Parses the input line and validates inputs.
     - do_quit(): Exits the program.
@@ -48,44 +60,94 @@ class HBNBCommand(cmd.Cmd):
     - do_show(line): Prints details of a specific instance.
     - do_destroy(line): Deletes a specific instance.
     - do_update(line): Updates or add an attribute of a specific instance.
+    - do_aggregate(line): Prints an aggregate of the instances of a class.
+    - do_stats(line): Prints the metrics of the storage and the console.
+    - do_profile(line): Runs a command under a profiler.
     - count(class_name): count the number of instances from a class.
+    - query(class_name, expression): prints the instances of a query.
+    - near(class_name, expression): prints the instances near a point.
+    - print_objects(objs): prints instances as a list, one at a time.
+    - print_ndjson(objs): prints the JSON of instances, one per line.
+    - aggregate(class_name, expression): prints an aggregate of instances.
+    - run_script(lines, flush_every): runs commands in batches.
     """
     prompt = "(hbnb) "
+    # the handlers of <class name>.<method>(...), by method: the ones
+    # taking the class name and the expression after the dot, and the
+    # commands taking the class name and the arguments as their line
+    expression_methods = {'where': 'query',
+                          'near': 'near',
+                          'nearest': 'near',
+                          'aggregate': 'aggregate',
+                          }
+    # the options of all, the other ones take a value
+    all_options = ('limit', 'offset', 'after', 'ndjson')
+    argument_methods = {'all': 'do_all',
+                        'count': 'count',
+                        'show': 'do_show',
+                        'destroy': 'do_destroy',
+                        'update': 'do_update',
+                        }
 
     def default(self, line):
         """Handle custom commands
         Synopsis
         -------
             <class name>.method()
+            <class name>.where(...)[.order_by(...)][.limit(...)]
+            <class name>.near(latitude, longitude, radius in km)
+            <class name>.nearest(latitude, longitude[, count])
+            <class name>.aggregate(function[, attribute][, by=attribute])
         """
-        tokens = line.strip().split('.', 1)
-        class_name = tokens[0]
-        # possible class name method command found
-        if class_name in models.classes and len(tokens) > 1:
-            method = tokens[1]
-            arg_list = self.extract_all(method)
-            if isinstance(arg_list, list):
-                cmd_dict = {'all': self.do_all,
-                            'count': self.count,
-                            'show': self.do_show,
-                            'destroy': self.do_destroy,
-                            'update': self.do_update
-                            }
-
-                cmd_name = method[:method.find('(')]
-                if cmd_name == 'update' and len(arg_list) == 2:
-                    obj = self.string_to_dict(arg_list[1])
-                    # treat 'update' differently when a dictionary is passed
-                    if obj is not None:
-                        arg_list[1] = obj
-                        arg_list.insert(0, class_name)
-                        return self.update_with_dict(arg_list)
-                if cmd_name in cmd_dict:
-                    line = class_name + ' ' + ' '.join(arg_list)
-                    return cmd_dict[cmd_name](line.strip())
+        call = parse_call(line)
+        if call is not None and call.class_name in models.classes:
+            handler = self.expression_methods.get(call.method)
+            if handler is not None:
+                return getattr(self, handler)(call.class_name,
+                                              call.expression)
+            handler = self.argument_methods.get(call.method)
+            if handler is not None and call.args is not None:
+                args = [call.class_name, *call.args]
+                # treat 'update' differently when a dictionary is passed
+                if call.method == 'update' and len(args) == 3 and \
+                        isinstance(args[2], dict):
+                    return self.update_with_dict(args)
+                return getattr(self, handler)(
+                    ' '.join(shlex.quote(str(arg)) for arg in args))
 
         super().default(line)
 
+    def onecmd(self, line):
+        """Runs the command of line, and records its latency when the
+        metrics are enabled (see models.engine.metrics)"""
+        if not metrics.enabled:
+            return super().onecmd(line)
+        with metrics.timer('console.' + self.command_name(line)):
+            return super().onecmd(line)
+
+    def command_name(self, line):
+        """Returns the name of the command of line, 'other' when it is
+        not a command"""
+        words = line.split(None, 1)
+        if not words:
+            return 'emptyline'
+        name = words[0]
+        if '.' in name:  # <class name>.<method>(...)
+            call = parse_call(line)
+            if call is not None and (call.method in self.argument_methods
+                                     or call.method in
+                                     self.expression_methods):
+                return call.method
+        elif hasattr(self, 'do_' + name):
+            return name
+        return 'other'
+
+    def precmd(self, line):
+        """Loads the changes saved by other processes, such as another
+        console, before every command"""
+        models.storage.refresh()
+        return line
+
     def emptyline(self):
         """
         Name
@@ -118,8 +180,10 @@ class HBNBCommand(cmd.Cmd):
         Description
         -----------
             This method is called to terminate the program ensuring
-            proper cleanup and resource deallocation.
+            proper cleanup and resource deallocation. It waits for the
+            saves still being written by the storage.
         """
+        models.storage.flush()
         return True
 
     def help_quit(self):
@@ -148,6 +212,7 @@ class HBNBCommand(cmd.Cmd):
 
         """
         print()
+        models.storage.flush()
         return True
 
     def help_EOF(self):
@@ -162,12 +227,15 @@ class HBNBCommand(cmd.Cmd):
         Synopsis
         --------
             create [class name]
+            create [class name] [count]
 
         Description
         ----------
             This method creates a new instance of the specified class and
             saves it to a JSON file. It then prints the ID of the newly
-            created instance.
+            created instance. With a count, it creates count instances at
+            once with a single save (see BaseModel.bulk_create) and prints
+            their IDs, one per line.
 
         Examples
         --------
@@ -180,12 +248,21 @@ class HBNBCommand(cmd.Cmd):
         ------
             `** class name missing **`  [class name] is not given.
             `** class doesn't exit`     [class name] isn't supported
+            `** invalid count **`       [count] isn't a positive integer
         """
         tokens = self.parse_line(line, m=True, c=True)
-        if tokens:
+        if not tokens:
+            return
+        if len(tokens) < 2:
             obj = models.classes[tokens[0]]()
             obj.save()
             print(obj.id)
+            return
+        if not tokens[1].isdigit() or int(tokens[1]) == 0:
+            print('** invalid count **')
+            return
+        objs = models.classes[tokens[0]].bulk_create(int(tokens[1]))
+        print('\n'.join(obj.id for obj in objs))
 
     def help_create(self):
         print(cleandoc(self.do_create.__doc__), '\n')
@@ -222,7 +299,8 @@ class HBNBCommand(cmd.Cmd):
         """
         tokens = self.parse_line(line, m=True, c=True, i=True, n=True)
         if tokens:
-            print(models.storage.all()[f'{tokens[0]}.{tokens[1]}'])
+            obj = models.storage.get(tokens[0], tokens[1])
+            print(models.storage.render(obj))
 
     def help_show(self):
         print(cleandoc(self.do_show.__doc__), '\n')
@@ -259,7 +337,8 @@ class HBNBCommand(cmd.Cmd):
         """
         tokens = self.parse_line(line, m=True, c=True, i=True, n=True)
         if tokens:
-            models.storage.all().pop(f'{tokens[0]}.{tokens[1]}')
+            obj = models.storage.get(tokens[0], tokens[1])
+            models.storage.delete(obj)
             models.storage.save()
 
     def help_destroy(self):
@@ -275,32 +354,256 @@ class HBNBCommand(cmd.Cmd):
         --------
             all
             all [class name]
+            all [class name] [limit N] [offset N] [after id] [ndjson]
 
         Description
         -----------
             This method prints the string representation of all instances,
-            optionally filtered by the provided class name. It retrieves
-            the instances from the JSON file and displays their details.
+            optionally filtered by the provided class name, as a list. The
+            instances are printed one at a time as they are formatted, and
+            the text of every instance is kept by the storage until it
+            changes (see storage.render).
+
+            limit N prints at most N instances, offset N skips the first
+            N, and after id starts after the instance with this id: the
+            last id of a page is the cursor of the next one. The pages list
+            the instances by class name then by id, which the storage keeps
+            in a sorted index, so a page costs the same at any cursor.
+            ndjson prints the JSON of the dictionary of every instance, one
+            per line, instead of the list.
+
+        Examples
+        --------
+            `all Place limit 100 after 1`
+
+            This will print the 100 places following the place with ID "1".
 
         Errors
         ------
-            `** class doesn't exit` [class name] isn't supported.
-        """
-        objs = models.storage.all().values()
-        obj_list = None
-        if line == '':  # all
-            obj_list = [str(obj) for obj in objs]
-        else:  # all [class name]
-            tokens = self.parse_line(line, m=True, c=True)
-            if tokens:
-                obj_list = [str(obj) for obj in objs
-                            if obj.__class__.__name__ == tokens[0]]
-        if obj_list:
-            print(obj_list)
+            `** class doesn't exit`      [class name] isn't supported.
+            `** unknown option: X **`    X isn't an option.
+            `** invalid X **`            the value of the option X is
+                                         missing or isn't a number.
+            `** no instance found **`    the instance of after isn't
+                                         available.
+        """
+        tokens = self.parse_line(line)
+        if tokens is None:
+            return
+        class_name = None
+        if tokens and tokens[0] not in self.all_options:
+            if tokens[0] not in models.classes:
+                print("** class doesn't exist **")
+                return
+            class_name = tokens.pop(0)
+        options = {}
+        words = iter(tokens)
+        for word in words:
+            if word == 'ndjson':
+                options[word] = True
+            elif word in self.all_options:
+                value = next(words, None)
+                if value is None or \
+                        (word != 'after' and not value.isdigit()):
+                    print(f'** invalid {word} **')
+                    return
+                options[word] = value if word == 'after' else int(value)
+            else:
+                print(f'** unknown option: {word} **')
+                return
+        if options.keys() - {'ndjson'}:
+            class_names = [class_name] if class_name else sorted(
+                models.classes)
+            after = options.get('after')
+            if after is not None:
+                # the page starts in the class of the instance of after
+                first = next((i for i, name in enumerate(class_names)
+                              if models.storage.exists(name, after)), None)
+                if first is None:
+                    print('** no instance found **')
+                    return
+                class_names = class_names[first:]
+            objs = self.page(class_names, after, options.get('offset', 0),
+                             options.get('limit'))
+        else:
+            objs = models.storage.all(class_name).values()
+        if 'ndjson' in options:
+            self.print_ndjson(objs)
+        else:
+            self.print_objects(objs)
+
+    @staticmethod
+    def page(class_names, after=None, offset=0, limit=None):
+        """Yields a page of the instances of class_names, in the order of
+        their class name then of their id
+
+        The ids of each class are looked up in the sorted index the
+        storage keeps by default (see models.engine.index), so a page
+        costs O(log N + k) whatever its cursor.
+
+        Args:
+            class_names (list): the class names, in order
+            after (str): the page starts after the instance of the first
+                class with this id
+            offset (int): the number of instances skipped first
+            limit (int): the maximum number of instances
+        """
+        storage = models.storage
+        for class_name in class_names:
+            if limit is not None and limit <= 0:
+                return
+            objs = storage.find_range(
+                class_name, 'id', low=after, include_low=False,
+                limit=None if limit is None else offset + limit)
+            after = None
+            skipped = min(offset, len(objs))
+            offset -= skipped
+            objs = objs[skipped:]
+            if limit is not None:
+                limit -= len(objs)
+            yield from objs
 
     def help_all(self):
         print(cleandoc(self.do_all.__doc__), '\n')
 
+    def do_aggregate(self, line):
+        """
+        Name
+        ----
+            aggregate - prints an aggregate of the instances of a class
+
+        Synopsis
+        --------
+            aggregate [class name] count [attribute] [by [attribute]]
+            aggregate [class name] [function] [attribute] [by [attribute]]
+
+        Description
+        -----------
+            This method prints the count, sum, mean, min or max of the
+            numbers an attribute holds in the instances of a class, or the
+            number of instances for a count without an attribute. With by,
+            it prints a dictionary of the results by value of the second
+            attribute.
+
+        Examples
+        --------
+            `aggregate Place mean price_by_night by city_id`
+
+            This will print the mean price_by_night of the places of every
+            city, by city id.
+
+        Errors
+        ------
+            `** class name missing **`  [class name] is not given.
+            `** class doesn't exit`     [class name] isn't supported.
+            `** function missing **`    [function] is not given.
+            `** invalid aggregate: ... **` [function] or [attribute] is
+            invalid.
+        """
+        tokens = self.parse_line(line, m=True, c=True)
+        if not tokens:
+            return
+        if len(tokens) < 2:
+            print('** function missing **')
+            return
+        class_name, func, *args = tokens
+        by = None
+        if len(args) >= 2 and args[-2] == 'by':
+            by, args = args[-1], args[:-2]
+        if len(args) > 1:
+            print(f'** invalid aggregate: unexpected {args[1]} **')
+            return
+        self.print_aggregate(class_name, [func] + args, {'by': by})
+
+    def help_aggregate(self):
+        print(cleandoc(self.do_aggregate.__doc__), '\n')
+
+    def do_stats(self, line):
+        """
+        Name
+        ----
+            stats - prints the metrics of the storage and the console
+
+        Synopsis
+        --------
+            stats
+            stats json
+            stats reset
+            stats on
+            stats off
+
+        Description
+        -----------
+            This method prints the number of calls and the latency
+            percentiles, in milliseconds, of the commands and the storage
+            operations, and the numbers of objects and bytes read and
+            written (see models.engine.metrics), as a table or as JSON.
+            They are recorded when the HBNB_METRICS environment variable is
+            set, or after `stats on`. reset forgets what was recorded.
+
+        Errors
+        ------
+            `** unknown option: ... **` the option is not one of the above.
+        """
+        option = line.strip()
+        if option == '':
+            print(metrics.report())
+            if not metrics.enabled:
+                print('** metrics are off, turn them on with stats on **')
+        elif option == 'json':
+            print(json.dumps(metrics.snapshot()))
+        elif option == 'reset':
+            metrics.reset()
+        elif option == 'on':
+            metrics.enable()
+        elif option == 'off':
+            metrics.disable()
+        else:
+            print(f'** unknown option: {option} **')
+
+    def help_stats(self):
+        print(cleandoc(self.do_stats.__doc__), '\n')
+
+    def do_profile(self, line):
+        """
+        Name
+        ----
+            profile - runs a command under a profiler
+
+        Synopsis
+        --------
+            profile [command]
+            profile cpu [command]
+            profile memory [command]
+
+        Description
+        -----------
+            This method runs the command, then prints the functions it
+            spent the most time in (cpu, the default, with cProfile) or
+            the lines that allocated the memory it kept and its peak
+            memory (memory, with tracemalloc).
+
+        Examples
+        --------
+            `profile memory all Place`
+
+        Errors
+        ------
+            `** command missing **` [command] is not given.
+        """
+        mode, _, command = line.strip().partition(' ')
+        if mode not in ('cpu', 'memory'):
+            mode, command = 'cpu', line.strip()
+        if not command.strip():
+            print('** command missing **')
+            return
+        result, report = profile(lambda: self.onecmd(command.strip()), mode)
+        print(report)
+        return result
+
+    def help_profile(self):
+        print(cleandoc(self.do_profile.__doc__), '\n')
+
     def do_update(self, line):
 
         """
@@ -347,17 +650,16 @@ class HBNBCommand(cmd.Cmd):
                 except ValueError:
                     pass
             # update or add the attribute and it value
-            obj = models.storage.all()[f'{tokens[0]}.{tokens[1]}']
-            obj.__dict__.update({tokens[2]: tokens[3]})
+            obj = models.storage.get(tokens[0], tokens[1])
+            setattr(obj, tokens[2], tokens[3])
             obj.save()
 
     def update_with_dict(self, arg_list):
         """Updates an instance based on a dictionary"""
-        key = f'{arg_list[0]}.{arg_list[1]}'
-
-        if key in models.storage.all():
-            obj = models.storage.all()[key]
-            obj.__dict__.update(arg_list[2])
+        obj = models.storage.get(arg_list[0], arg_list[1])
+        if obj is not None:
+            for name, value in arg_list[2].items():
+                setattr(obj, name, value)
         else:
             print('** no instance found **')
 
@@ -366,14 +668,164 @@ class HBNBCommand(cmd.Cmd):
 
     def count(self, class_name):
         """Print the total number of instances of a particular class"""
-        count = 0
-        objs = models.storage.all()
+        print(models.storage.count(class_name))
+
+    def query(self, class_name, expression):
+        """
+        Print the instances of class_name selected by a query.
+
+        The expression chains the methods of models.engine.query.Query,
+        starting with where(), and only takes literal arguments:
+            where(price_by_night__lt=100).order_by("-updated_at").limit(20)
+
+        Args:
+            class_name (str): the class of the instances.
+            expression (str): the query, after `<class name>.`.
+        """
+        try:
+            calls = self.parse_query(expression)
+        except (SyntaxError, ValueError) as error:
+            print(f'** invalid query: {error} **')
+            return
+        query = models.storage.query(class_name)
+        try:
+            for name, args, kwargs in calls:
+                query = getattr(query, name)(*args, **kwargs)
+            objs = list(query)
+        except (TypeError, ValueError) as error:
+            print(f'** invalid query: {error} **')
+            return
+        self.print_objects(objs)
+
+    def aggregate(self, class_name, expression):
+        """
+        Print an aggregate of the instances of class_name.
+
+        Args:
+            class_name (str): the class of the instances.
+            expression (str): aggregate(function, attribute, by=attribute)
+                with literal arguments, like storage.aggregate().
+        """
+        try:
+            calls = self.parse_query(expression, ('aggregate',),
+                                     ('aggregate',))
+            if len(calls) > 1:
+                raise ValueError('aggregate() cannot be chained')
+        except (SyntaxError, ValueError) as error:
+            print(f'** invalid aggregate: {error} **')
+            return
+        _, args, kwargs = calls[0]
+        self.print_aggregate(class_name, args, kwargs)
+
+    @staticmethod
+    def print_aggregate(class_name, args, kwargs):
+        """Print storage.aggregate(class_name, *args, **kwargs)"""
+        try:
+            print(models.storage.aggregate(class_name, *args, **kwargs))
+        except (TypeError, ValueError) as error:
+            print(f'** invalid aggregate: {error} **')
+
+    def near(self, class_name, expression):
+        """
+        Print the instances of class_name near a point, nearest first.
+
+        Args:
+            class_name (str): the class of the instances.
+            expression (str): near(latitude, longitude, radius) for the
+                instances at most radius km away, or nearest(latitude,
+                longitude, count) for the count nearest ones (1 by
+                default).
+        """
+        try:
+            calls = self.parse_query(expression, ('near', 'nearest'),
+                                     ('near', 'nearest'))
+            if len(calls) > 1:
+                raise ValueError('near() cannot be chained')
+            name, args, kwargs = calls[0]
+            if name == 'near':
+                objs = models.storage.find_within(class_name, *args,
+                                                  **kwargs)
+            else:
+                objs = models.storage.find_nearest(class_name, *args,
+                                                   **kwargs)
+        except (SyntaxError, TypeError, ValueError) as error:
+            print(f'** invalid query: {error} **')
+            return
+        self.print_objects(objs)
+
+    @staticmethod
+    def print_objects(objs):
+        """
+        Print the instances of objs as a list of their string
+        representations, the same text as print([str(obj) for obj in
+        objs]), but one instance at a time instead of building the list
+        first, and nothing when there is no instance.
+
+        Args:
+            objs (iterable): the instances.
+        """
+        render = models.storage.render
+        write = sys.stdout.write
+        separator = '['
         for obj in objs:
-            obj_class_name = obj.split('.')[0]
-            if class_name == obj_class_name:
-                count += 1
-        print(count)
+            write(separator + repr(render(obj)))
+            separator = ', '
+        if separator != '[':
+            write(']\n')
+
+    @staticmethod
+    def print_ndjson(objs):
+        """
+        Print the JSON text of the dictionary of every instance of objs,
+        one per line (see storage.to_json).
+
+        Args:
+            objs (iterable): the instances.
+        """
+        to_json = models.storage.to_json
+        write = sys.stdout.write
+        for obj in objs:
+            write(to_json(obj) + '\n')
+
+    # parses a query expression (see console_parser.parse_query)
+    parse_query = staticmethod(parse_query)
+
+    def run_script(self, lines, flush_every=0):
+        """
+        Run the commands of lines, without prompt, in storage batches.
+
+        The changes are saved once at the end, or every flush_every
+        commands, instead of after every command. Running stops at the end
+        of lines or at the first command that ends the interpreter (quit).
+
+        Args:
+            lines (iterable): the command lines, read as they are run.
+            flush_every (int): number of commands per save, 0 for a single
+                save at the end.
 
+        Returns:
+            int: the number of commands run, empty lines excluded.
+        """
+        lines = iter(lines)
+        count = 0
+        done = False
+        while not done:
+            with models.storage.batch():
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    count += 1
+                    if self.onecmd(self.precmd(line)):
+                        done = True
+                        break
+                    if flush_every and count % flush_every == 0:
+                        break
+                else:
+                    done = True
+        return count
+
+    @timed('console.parse_line')
     def parse_line(self, line, m=False, c=False, i=False,
                    n=False, a=False, v=False):
         """
@@ -394,16 +846,19 @@ class HBNBCommand(cmd.Cmd):
             list: Tokens extracted from the input line.
             Returns None if an error occurs.
         """
-        from shlex import split
+        try:
+            tokens = list(tokenize(line))
+        except ValueError as error:  # a quotation is not closed
+            print(f'** invalid syntax: {error} **')
+            return
         # check for errors based on flags pass
-        tokens = split(line)
         if m and line == '':
             print('** class name missing **')
         elif c and tokens[0] not in models.classes:
             print("** class doesn't exist **")
         elif i and len(tokens) < 2:
             print('** instance id missing **')
-        elif n and f'{tokens[0]}.{tokens[1]}' not in models.storage.all():
+        elif n and not models.storage.exists(tokens[0], tokens[1]):
             print('** no instance found **')
         elif a and len(tokens) < 3:
             print('** attribute name missing **')
@@ -412,41 +867,28 @@ class HBNBCommand(cmd.Cmd):
         else:
             return tokens  # success, all checks pass
 
-    @staticmethod
-    def extract_all(method):
-        """Extract all arguments from the command name method"""
-        # capture   (id)    (dictionary or attribute name) (attribute value)
-        pattern = r"\(\s*([^,]*)\s*,?\s*(\{.+\}|[^,]*)?\s*,?\s*([^,]*)\)"
-        match = re.search(pattern, method)
-
-        args = None
-        if match:
-            args = [grp.strip("'") for grp in match.groups() if grp]
-
-        return args
-
-    @staticmethod
-    def string_to_dict(string):
-        """
-        Converts a string to a dictionary if the string is in a dictionary
-        representations.
-        """
-        dict_pattern = r'^\s*\{\s*([\'"][^\'"]*[\'"]\s*:.+\s*,?\s*)*\}\s*$'
-
-        if re.match(dict_pattern, string):
-            import ast
-            try:
-                obj = ast.literal_eval(string)
-                if isinstance(obj, dict):
-                    return obj
-            except (ValueError, SyntaxError):
-                pass
-
 
 if __name__ == '__main__':
-    # import sys
-    # if sys.stdin.isatty():  # interactive mode
-    HBNBCommand().cmdloop()
-    # else:  # non interactive mode
-    #     input_data = sys.stdin.read()
-    #     HBNBCommand().onecmd(input_data)
+    import argparse
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='HBNB command interpreter')
+    parser.add_argument('--script', metavar='FILE',
+                        help='run the commands of FILE instead of stdin')
+    parser.add_argument('--flush-every', metavar='N', type=int, default=0,
+                        help='save every N commands instead of at the end')
+    args = parser.parse_args()
+
+    if args.script is None and sys.stdin.isatty():  # interactive mode
+        HBNBCommand().cmdloop()
+    else:  # non interactive mode
+        start = perf_counter()
+        if args.script is None:
+            count = HBNBCommand().run_script(sys.stdin, args.flush_every)
+        else:
+            with open(args.script, 'r', encoding='UTF-8') as script:
+                count = HBNBCommand().run_script(script, args.flush_every)
+        elapsed = perf_counter() - start
+        print(f'{count} commands in {elapsed:.3f}s '
+              f'({count / max(elapsed, 1e-9):.0f} commands/s)',
+              file=sys.stderr)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Parser of the command lines of the console
+
+The console parses every line with the functions of this module, which
+compile their regular expressions once and cache their results by shape
+(an LRU cache), so a script repeating the same commands on other
+instances and values parses each command once:
+    tokenize(text): the words of `<command> <arguments>`, like
+        shlex.split() but without going through shlex for the lines
+        without quotes or backslashes (most of them)
+    parse_call(line): the class, method and arguments of
+        `<class name>.<method>(<arguments>)`, or None
+    parse_query(expression, methods, first): the method calls of a
+        `where(...).order_by(...)` chain with literal arguments
+
+The shape of a line is the line with its quoted strings and its ids
+replaced by numbered placeholders: `Place.show("<id>")` and
+`Place.show("<other id>")` have the same shape, parsed once, and the
+strings and ids of each line are put back in the cached result, which
+builds new lists and dictionaries, so the values that can be changed
+(the dictionary of `update`, the lists of a query) are never shared.
+The bare numbers stay in the shape, and the lines with a backslash are
+parsed every time.
+
+Example:
+    >>> tokenize('update Place 1 name "Lagos"')
+    ('update', 'Place', '1', 'name', 'Lagos')
+    >>> parse_call('Place.show("1")')
+    Call(class_name='Place', method='show', expression='show("1")', \
+args=('1',))
+"""
+import ast
+import re
+import shlex
+from collections import namedtuple
+from functools import lru_cache, wraps
+
+CACHE_SIZE = 4096  # shapes kept by each cache
+
+# <class name>.<method>(<arguments>), the arguments of a chain of calls
+# are the expression
+_CALL = re.compile(r'\s*(\w+)\.(\w+)\((.*)\)\s*', re.DOTALL)
+# one argument of a call and the comma after it: a quoted string, a
+# dictionary (the last argument of update) or a bare word, which is not a
+# keyword argument or a call
+_ARGUMENT = re.compile(r"""\s*("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'
+                           |\{.*\}|[^,'"{}()=]*?)\s*(,|$)""",
+                       re.DOTALL | re.VERBOSE)
+# the characters that make shlex.split() differ from str.split()
+_QUOTING = re.compile(r'[\'"\\]')
+# the values taken out of the shape of a line: a quoted string, with the
+# word it is glued to (a prefix like b"..." is kept in the shape), and a
+# bare id, str(uuid4()) (see models.base_model.new_ids)
+_STRING = r"""(\w*)("[^"\n]*"|'[^'\n]*')"""
+_VALUE = re.compile(_STRING + r'|(?<![\w-])([0-9a-f]{8}-[0-9a-f]{4}-'
+                    r'[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?![\w-])',
+                    re.IGNORECASE)
+_QUOTED = re.compile(_STRING)
+# a placeholder of the shape, the index of its value between two
+# characters of the private use area, which the console never reads
+_OPEN, _CLOSE = '\ue000', '\ue001'
+_PLACEHOLDER = re.compile(f'{_OPEN}(\\d+){_CLOSE}')
+
+
+def _shape(line, ids=True):
+    """Returns the shape of line and the values taken out of it
+
+    Args:
+        line (str): the text to parse
+        ids (bool): whether the bare ids are taken out too (not in the
+            queries, where a bare id is not a literal anyway)
+
+    Return:
+        tuple: the shape and the list of values, (None, None) when line
+            cannot be shaped (a backslash, a placeholder character)
+    """
+    if '\\' in line or _OPEN in line or _CLOSE in line:
+        return None, None
+    values = []
+
+    def take(match):
+        prefix, string = match.group(1, 2)
+        if string is None:  # a bare id
+            values.append(match.group(3))
+            return f'{_OPEN}{len(values) - 1}{_CLOSE}'
+        if prefix:
+            return match.group()
+        values.append(string[1:-1])
+        return f'{string[0]}{_OPEN}{len(values) - 1}{_CLOSE}{string[0]}'
+
+    return (_VALUE if ids else _QUOTED).sub(take, line), values
+
+
+def _fill(value, values):
+    """Returns a copy of value with the placeholders of its strings
+    replaced by values"""
+    if isinstance(value, str):
+        if _OPEN not in value:
+            return value
+        return _PLACEHOLDER.sub(lambda match: values[int(match.group(1))],
+                                value)
+    if isinstance(value, dict):
+        return {_fill(key, values): _fill(item, values)
+                for key, item in value.items()}
+    if isinstance(value, tuple):
+        items = [_fill(item, values) for item in value]
+        return value._make(items) if hasattr(value, '_make') \
+            else tuple(items)
+    if isinstance(value, (list, set, frozenset)):
+        return type(value)(_fill(item, values) for item in value)
+    return value
+
+
+def _by_shape(ids=True):
+    """Returns a decorator caching the results of a parser by the shape
+    of its first argument, a line (see _shape), with its other arguments
+
+    The parser runs on the line itself when the line cannot be shaped or
+    its shape does not parse, so its errors name the text of the line.
+    """
+    def decorator(function):
+        cached = lru_cache(maxsize=CACHE_SIZE)(function)
+
+        @wraps(function)
+        def wrapper(line, *args):
+            shape, values = _shape(line, ids)
+            if shape is None:
+                return function(line, *args)
+            try:
+                result = cached(shape, *args)
+            except (SyntaxError, ValueError):
+                return function(line, *args)
+            return _fill(result, values)
+
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+    return decorator
+
+
+Call = namedtuple('Call', ['class_name', 'method', 'expression', 'args'])
+Call.__doc__ = """A `<class name>.<method>(<arguments>)` line
+
+Attributes:
+    class_name (str): the name before the dot
+    method (str): the name of the first method called
+    expression (str): the text after the dot, the whole chain of calls
+    args (tuple): the arguments of the call, strings unquoted, a
+        dictionary for {...}, None when they are not a list of literals
+        and words (a query chain)
+"""
+
+
+def tokenize(text):
+    """Returns the tuple of the words of text, split like shlex.split()
+
+    Raises:
+        ValueError: when a quotation is not closed
+    """
+    if _QUOTING.search(text) is None:
+        return tuple(text.split())
+    return _tokenize(text)
+
+
+@_by_shape()
+def _tokenize(text):
+    return tuple(shlex.split(text))
+
+
+def _argument(token):
+    """Returns the value of the argument token of a call"""
+    if token[:1] in ('"', "'"):
+        try:
+            return ast.literal_eval(token)
+        except (ValueError, SyntaxError):
+            return token[1:-1]
+    if token[:1] == '{':
+        try:
+            value = ast.literal_eval(token)
+        except (ValueError, SyntaxError):
+            return token
+        return value if isinstance(value, dict) else token
+    return token
+
+
+def _arguments(text):
+    """Returns the tuple of the arguments of the text between the
+    parentheses of a call, None if it is not a list of arguments"""
+    args = []
+    pos = 0
+    while pos < len(text):
+        match = _ARGUMENT.match(text, pos)
+        if match is None or match.end() == pos:
+            return None
+        token, comma = match.groups()
+        if token or comma:  # `f()` has no argument, `f(a, )` has one
+            args.append(_argument(token))
+        pos = match.end()
+    return tuple(args)
+
+
+@_by_shape()
+def _parse_call(line):
+    match = _CALL.fullmatch(line)
+    if match is None:
+        return None
+    class_name, method, text = match.groups()
+    expression = line.strip()[len(class_name) + 1:]
+    return Call(class_name, method, expression, _arguments(text))
+
+
+def parse_call(line):
+    """Parses a `<class name>.<method>(<arguments>)` line
+
+    Return:
+        Call: the call, None when line is not a call
+    """
+    return _parse_call(line)
+
+
+@_by_shape(ids=False)
+def _parse_query(expression, methods, first):
+    node = ast.parse(expression.strip(), mode='eval').body
+    calls = []
+    while isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Attribute):  # <query>.name(...)
+            name, inner = node.func.attr, node.func.value
+        elif isinstance(node.func, ast.Name):  # where(...)
+            name, inner = node.func.id, None
+        else:
+            break
+        if name not in methods:
+            raise ValueError(f'unknown method {name}')
+        if any(keyword.arg is None for keyword in node.keywords):
+            raise ValueError('**kwargs arguments are not supported')
+        calls.append((name,
+                      [ast.literal_eval(arg) for arg in node.args],
+                      {keyword.arg: ast.literal_eval(keyword.value)
+                       for keyword in node.keywords}))
+        node = inner
+    if node is not None or not calls or calls[-1][0] not in first:
+        raise ValueError(f'a query starts with {first[0]}()')
+    calls.reverse()
+    return calls
+
+
+def parse_query(expression,
+                methods=('where', 'order_by', 'limit', 'offset'),
+                first=('where',)):
+    """Returns the method calls of a query expression
+
+    Args:
+        expression (str): chained calls with literal arguments
+        methods (tuple): the names of the methods allowed
+        first (tuple): the names of the methods starting a chain
+
+    Return:
+        list: the (name, args, kwargs) of every call, in order
+
+    Raises:
+        SyntaxError: when expression is not Python
+        ValueError: when expression is not a chain of query methods with
+            literal arguments
+    """
+    return _parse_query(expression, tuple(methods), tuple(first))
+
+
+def cache_clear():
+    """Empties the caches of the parser"""
+    for function in (_tokenize, _parse_call, _parse_query):
+        function.cache_clear()
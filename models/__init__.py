@@ -1,7 +1,35 @@
 """Initialize the package models
 It creates FileStorage instance and read the json string from the file
 during initialization
+
+Environment:
+    HBNB_TYPE_STORAGE: storage engine, 'file' (default, FileStorage and
+    file.json) or 'db' (DBStorage and the SQLite database file.db)
+    HBNB_STORAGE_MODE: persistence mode of the storage, 'snapshot'
+    (default) or 'log' (see FileStorage)
+    HBNB_JSON_CODEC: JSON library used by the storage, 'orjson', 'ujson'
+    or 'json', by default the fastest one installed
+    HBNB_STORAGE_FORMAT: format of file.json, 'json' (default) or
+    'ndjson', one object per line (see models.engine.snapshot)
+    HBNB_STORAGE_LAYOUT: 'single' (default), every object in file.json,
+    or 'sharded', a file per class in storage/ (see FileStorage and
+    models.engine.migrate)
+    HBNB_STORAGE_LAZY: set to 1 to build the stored instances on demand
+    instead of when the file is read
+    HBNB_COMPACT: set to 1 to store the attributes of the instances in
+    __slots__ instead of a dictionary (see models.compact)
+    HBNB_FSYNC: when the saves are flushed to the disk, 'none' (default),
+    'always' or 'group' (see models.engine.durability)
+    HBNB_FSYNC_INTERVAL: delay of the 'group' flushes in milliseconds,
+    50 by default
+    HBNB_ASYNC_SAVE: set to 1 to write the saves in a background thread
+    HBNB_METRICS: set to 1 to record the metrics of the storage and the
+    console (see models.engine.metrics and the stats command), to a file
+    path to also write them there as JSON at exit, or to - to print them
+    to stderr at exit
 """
+from os import getenv
+
 from models.engine.file_storage import FileStorage
 from models.base_model import BaseModel
 from models.user import User
@@ -21,5 +49,26 @@ classes = {'BaseModel': BaseModel,
            'Review': Review,
            }
 
-storage = FileStorage()
+if getenv('HBNB_METRICS', '0') != '0':
+    from models.engine.metrics import registry
+    registry.enable(dump=None if getenv('HBNB_METRICS') == '1'
+                    else getenv('HBNB_METRICS'))
+
+if getenv('HBNB_COMPACT') == '1':
+    from models.compact import compact
+    classes = {name: compact(cls) for name, cls in classes.items()}
+
+if getenv('HBNB_TYPE_STORAGE') == 'db':
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage(codec=getenv('HBNB_JSON_CODEC'))
+else:
+    storage = FileStorage(mode=getenv('HBNB_STORAGE_MODE', 'snapshot'),
+                          codec=getenv('HBNB_JSON_CODEC'),
+                          file_format=getenv('HBNB_STORAGE_FORMAT', 'json'),
+                          layout=getenv('HBNB_STORAGE_LAYOUT', 'single'),
+                          lazy=getenv('HBNB_STORAGE_LAZY') == '1',
+                          fsync=getenv('HBNB_FSYNC', 'none'),
+                          fsync_interval=int(getenv('HBNB_FSYNC_INTERVAL',
+                                                    '50')),
+                          async_save=getenv('HBNB_ASYNC_SAVE') == '1')
 storage.reload()
@@ -2,12 +2,18 @@
 """A module that defines a class called Amenity."""
 
 from models.base_model import BaseModel
+from models.engine.relations import listed_in
 
 
 class Amenity(BaseModel):
     """A class that inherit from BaseModel.
     Public attributes:
     name(str): empty string
+
+    Relationships:
+    places: the places whose amenity_ids hold the id of the amenity
     """
 
     name = ""
+
+    places = listed_in('Place', 'amenity_ids')
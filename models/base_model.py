@@ -8,12 +8,26 @@ Example:
         [BaseModel] (...) {...}
 """
 # related third party imports
+import os
 from datetime import datetime
 from uuid import uuid4
 
 # local imports
 import models
 
+# the variant nibble of a UUID4 (10xx in binary) for any random nibble
+_VARIANTS = '89ab' * 4
+
+
+def new_ids(count):
+    """Returns count random ids in the format of str(uuid4()), from a
+    single read of the random source instead of one per id"""
+    text = os.urandom(16 * count).hex()
+    return [f'{text[i:i + 8]}-{text[i + 8:i + 12]}-4{text[i + 13:i + 16]}-'
+            f'{_VARIANTS[int(text[i + 16], 16)]}{text[i + 17:i + 20]}-'
+            f'{text[i + 20:i + 32]}'
+            for i in range(0, 32 * count, 32)]
+
 
 class BaseModel:
     """ Defines common attributes and methods for other classes.
@@ -27,10 +41,16 @@ class BaseModel:
 
     Methods:
         __init__(): Initializes the instance attributes.
+        __setattr__(): Sets an attribute and lets the storage know that the
+            instance changed, so only changed instances are re-serialized.
         __str__(): Returns a string representation of the instance:
             "[<class name>] (<self.id>) <self.__dict__>".
         save(): Updates the public instance attribute 'updated_at' with the
             current datetime.
+        bulk_create(n, **attrs): Creates, stores and saves n instances at
+            once.
+        class_default(name, default): Returns the class default of an
+            attribute.
         to_dict(): Returns a dictionary containing all keys and values of
             __dict__ of the instance. Includes a key '__class__' with the class
             name, and 'created_at' and 'updated_at' converted to ISO format.
@@ -39,18 +59,26 @@ class BaseModel:
     def __init__(self, *args, **kwargs):
         """Initializes the instance attribute"""
         if kwargs:
-            for key, value in kwargs.items():
-                if key in ['created_at', 'updated_at']:
+            attrs = kwargs.copy()
+            attrs.pop('__class__', None)
+            for key in ('created_at', 'updated_at'):
+                if key in attrs:
                     # convert from ISO string format to datetime
-                    value = datetime.fromisoformat(value)
-                if key != '__class__':
-                    setattr(self, key, value)
+                    attrs[key] = datetime.fromisoformat(attrs[key])
+            # the instance is not stored yet, no need to go through
+            # __setattr__ for every attribute
+            self.__dict__.update(attrs)
         else:
             self.id = str(uuid4())
             self.updated_at = datetime.now()
             self.created_at = datetime.now()
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        """Sets the attribute and marks the instance as changed in storage"""
+        models.storage.touch(self, name, value)
+        super().__setattr__(name, value)
+
     def __str__(self):
         """Returns a string representation of the instance."""
         return f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
@@ -60,6 +88,45 @@ class BaseModel:
         self.updated_at = datetime.now()
         models.storage.save()
 
+    @classmethod
+    def bulk_create(cls, n, **attrs):
+        """Creates n instances holding attrs, stores them and saves once
+
+        The instances get their ids from new_ids() and share a single
+        created_at/updated_at timestamp, they are stored with
+        storage.new_many(), which updates the indexes of the class once,
+        and saved by a single storage.save(). The list, dict and set values
+        of attrs are copied for every instance.
+
+        Args:
+            n (int): the number of instances
+            attrs: the attributes set on every instance
+
+        Return:
+            list: the instances
+        """
+        now = datetime.now()
+        mutable = [name for name, value in attrs.items()
+                   if isinstance(value, (list, dict, set))]
+        objs = []
+        for id in new_ids(n):
+            obj = cls.__new__(cls)
+            # the instance is not stored yet, like in __init__(**kwargs)
+            obj.__dict__.update(id=id, updated_at=now, created_at=now,
+                                **attrs)
+            for name in mutable:
+                obj.__dict__[name] = attrs[name].copy()
+            objs.append(obj)
+        models.storage.new_many(objs)
+        models.storage.save()
+        return objs
+
+    @classmethod
+    def class_default(cls, name, default=None):
+        """Returns the value of the attribute name of the class, the value
+        of the instances that never set it, default if there is none"""
+        return getattr(cls, name, default)
+
     def to_dict(self):
         """Returns a dictionary containing all keys and values of __dict__.
         and key __class__ with the class name.
@@ -2,6 +2,7 @@
 """A module that define a class called City"""
 
 from models.base_model import BaseModel
+from models.engine.relations import belongs_to, has_many
 
 
 class City(BaseModel):
@@ -11,7 +12,14 @@ class City(BaseModel):
     state_id(str): the id of the State class(State.id),
     default to empty string
     name(str): the name, default to empty string
+
+    Relationships:
+    state: the State of state_id
+    places: the places of the city
     """
 
     state_id = ""
     name = ""
+
+    state = belongs_to('State', 'state_id')
+    places = has_many('Place', 'city_id')
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Memory-compact variants of the model classes
+
+compact(cls) returns a subclass of cls, with the same name and module,
+that stores `id`, `created_at`, `updated_at` and the attributes declared
+on the class (for instance `city_id` or `price_by_night` for Place) in
+__slots__ instead of a per-instance dictionary. Attributes that are not
+declared are kept in an overflow dictionary that is only created when one
+is set.
+
+The instances behave like the regular ones: `obj.__dict__` is a mapping
+of every attribute that has been set, so to_dict(), __str__() and
+`obj.__dict__.update(...)` work as before, and declared attributes that
+were never set still read as the class default. On the class itself the
+slots hide the defaults, cls.class_default(name) returns them.
+
+The compact classes are used for the instances built by the storage when
+the HBNB_COMPACT environment variable is set to 1 (see models/__init__.py).
+
+Example:
+    >>> from models.place import Place
+    >>> CompactPlace = compact(Place)
+    >>> CompactPlace.__name__, issubclass(CompactPlace, Place)
+    ('Place', True)
+"""
+from collections.abc import MutableMapping
+
+import models
+from models.base_model import BaseModel
+
+
+class AttributeView(MutableMapping):
+    """The __dict__ of a compact instance: a live view of its attributes
+
+    Reading goes through the slots and the overflow dictionary, writing
+    goes through setattr() so the storage still sees every change.
+    """
+
+    __slots__ = ('__obj',)
+
+    def __init__(self, obj):
+        self.__obj = obj
+
+    def __getitem__(self, name):
+        obj = self.__obj
+        if name in obj._slots:
+            try:
+                return object.__getattribute__(obj, name)
+            except AttributeError:
+                raise KeyError(name) from None
+        extra = object.__getattribute__(obj, '_extra')
+        if extra is None:
+            raise KeyError(name)
+        return extra[name]
+
+    def __setitem__(self, name, value):
+        setattr(self.__obj, name, value)
+
+    def __delitem__(self, name):
+        try:
+            delattr(self.__obj, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        obj = self.__obj
+        for name in obj._fields:
+            try:
+                object.__getattribute__(obj, name)
+            except AttributeError:
+                continue
+            yield name
+        extra = object.__getattribute__(obj, '_extra')
+        if extra:
+            yield from list(extra)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        """Returns a regular dictionary of the attributes"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class CompactMixin:
+    """Attribute handling of the classes built by compact()"""
+
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        obj = super().__new__(cls)
+        # the overflow dictionary slot starts empty instead of unset
+        object.__setattr__(obj, '_extra', None)
+        return obj
+
+    @classmethod
+    def class_default(cls, name, default=None):
+        """Returns the class default of the attribute name, which the slot
+        of a declared attribute hides on the class"""
+        if name in cls._slots:
+            return cls._defaults.get(name, default)
+        return super().class_default(name, default)
+
+    def __reduce__(self):
+        """Pickles the instance as its model class and its attributes"""
+        return _restore, (self._model, self.__dict__.copy())
+
+    def __getattr__(self, name):
+        """Called for unset slots and attributes that are not declared"""
+        if name in self._slots:
+            # a declared attribute that was never set: the class default
+            if name in self._defaults:
+                return self._defaults[name]
+        else:
+            extra = object.__getattribute__(self, '_extra')
+            if extra is not None and name in extra:
+                return extra[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no "
+                             f"attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        models.storage.touch(self, name, value)
+        if name in self._slots:
+            object.__setattr__(self, name, value)
+        else:
+            if object.__getattribute__(self, '_extra') is None:
+                object.__setattr__(self, '_extra', {})
+            object.__getattribute__(self, '_extra')[name] = value
+
+    def __delattr__(self, name):
+        if name in self._slots:
+            object.__delattr__(self, name)
+            return
+        extra = object.__getattribute__(self, '_extra')
+        if extra is None or name not in extra:
+            raise AttributeError(name)
+        del extra[name]
+
+
+def declared_attributes(cls):
+    """Returns the names of the attributes declared on cls and its bases
+
+    Return:
+        tuple: 'id', 'created_at', 'updated_at' followed by the public
+        class attributes that are not methods or properties
+    """
+    names = ['id', 'created_at', 'updated_at']
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if not name.startswith('_') and name not in names and \
+                    not callable(value) and \
+                    not isinstance(value, (property, classmethod,
+                                           staticmethod)):
+                names.append(name)
+    return tuple(names)
+
+
+def _restore(model, attrs):
+    """Returns a compact instance of model holding attrs, unpickled"""
+    klass = compact(model)
+    obj = klass.__new__(klass)
+    for name, value in attrs.items():
+        if name in klass._slots:
+            object.__setattr__(obj, name, value)
+        else:
+            if object.__getattribute__(obj, '_extra') is None:
+                object.__setattr__(obj, '_extra', {})
+            object.__getattribute__(obj, '_extra')[name] = value
+    return obj
+
+
+_compacts = {}  # model class -> its compact class
+
+
+def compact(cls):
+    """Returns the compact variant of the model class cls, built once
+
+    The slots of the declared attributes hide their class defaults, which
+    are kept in _defaults and returned by class_default().
+    """
+    if not issubclass(cls, BaseModel):
+        raise TypeError(f'{cls.__name__} is not a BaseModel subclass')
+    if cls in _compacts:
+        return _compacts[cls]
+    slots = declared_attributes(cls)
+    namespace = {'__slots__': slots + ('_extra',),
+                 '__module__': cls.__module__,
+                 '__qualname__': cls.__qualname__,
+                 '__doc__': cls.__doc__,
+                 # type() would add the __dict__ of the instances
+                 '__dict__': property(AttributeView),
+                 '_model': cls,
+                 '_fields': slots,
+                 '_slots': frozenset(slots),
+                 '_defaults': {name: getattr(cls, name) for name in slots
+                               if hasattr(cls, name)},
+                 }
+    _compacts[cls] = type(cls.__name__, (CompactMixin, cls), namespace)
+    return _compacts[cls]
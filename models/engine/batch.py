@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Helpers for the batch() context manager of the storage engines
+
+Inside `with storage.batch():` the storage only records changes:
+BaseModel.save() and storage.save() do not write anything, and the
+changes are written once when the block ends. If the block raises, the
+objects changed in the block are put back in the state they had before
+it, the objects it created are removed and the ones it deleted are
+stored again. The list, dictionary and set values of an object are copied
+when it is first changed in the block, so the ones changed in place
+afterwards (`place.amenity_ids.append(...)`) are restored as well.
+"""
+from copy import deepcopy
+
+_MUTABLE = (list, dict, set)
+
+
+class UndoLog:
+    """Remembers the objects of a batch before their first change
+
+    Methods:
+        remember(key, obj): saves the current state of the object stored
+            under key, obj is None when nothing is stored under key yet
+        restore(add, remove): puts every remembered object back
+    """
+
+    def __init__(self):
+        self.__entries = {}  # <obj class name>.id -> (obj, attributes)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def remember(self, key, obj):
+        """Saves the state of obj, the object stored under key, unless the
+        batch already changed it"""
+        if key not in self.__entries:
+            attrs = None
+            if obj is not None:
+                attrs = {name: deepcopy(value)
+                         if isinstance(value, _MUTABLE) else value
+                         for name, value in obj.__dict__.items()}
+            self.__entries[key] = (obj, attrs)
+
+    def restore(self, add, remove):
+        """Puts the remembered objects back in the storage
+
+        Args:
+            add (callable): add(key, obj) stores obj under key
+            remove (callable): remove(key) forgets the object under key
+        """
+        for key, (obj, attrs) in self.__entries.items():
+            remove(key)
+            if obj is not None:
+                current = obj.__dict__
+                for name in list(current):
+                    if name not in attrs:
+                        del current[name]
+                current.update(attrs)
+                add(key, obj)
+        self.__entries.clear()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""JSON codecs used by the storage engines to encode and decode objects
+
+The fastest available codec is used by default: orjson, then ujson, then
+the standard library json module. Every codec writes compact JSON (no
+whitespace) and encodes datetime values natively as ISO 8601 strings,
+the same text as datetime.isoformat(), so model instances can be encoded
+from their attributes without going through BaseModel.to_dict().
+
+Note that orjson decodes integers that do not fit in 64 bits as floats.
+
+Example:
+    >>> from models.engine.codec import get_codec
+    >>> codec = get_codec('json')
+    >>> codec.dumps({'id': '1', 'numbers': [1, 2]})
+    '{"id":"1","numbers":[1,2]}'
+"""
+
+import json
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # optional dependency
+    ujson = None
+
+
+def _default(obj):
+    """Encodes the values json does not know about"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {obj.__class__.__name__} '
+                    'is not JSON serializable')
+
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'),
+                                 default=_default)
+
+
+class Codec:
+    """A pair of JSON encoding and decoding functions
+
+    Attributes:
+        name (str): the name of the library behind the codec
+        dumps (callable): encodes an object to a JSON str
+        loads (callable): decodes a JSON str or bytes to an object
+    """
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return f'<Codec {self.name}>'
+
+    def dumps_instance(self, obj):
+        """Encodes the to_dict() form of the model instance obj"""
+        record = obj.__dict__.copy()
+        record['__class__'] = obj.__class__.__name__
+        return self.dumps(record)
+
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj).decode()
+    except TypeError:  # integers over 64 bits, non str keys, ...
+        return _json_encoder.encode(obj)
+
+
+def _ujson_dumps(obj):
+    return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                       default=_default)
+
+
+CODECS = {'json': Codec('json', _json_encoder.encode, json.loads)}
+if ujson is not None:
+    CODECS['ujson'] = Codec('ujson', _ujson_dumps, ujson.loads)
+if orjson is not None:
+    CODECS['orjson'] = Codec('orjson', _orjson_dumps, orjson.loads)
+
+
+def get_codec(name=None):
+    """Returns the codec called name, by default the fastest available
+
+    Raises:
+        ValueError: when the codec is unknown or its library is missing
+    """
+    if name is None:
+        for name in ('orjson', 'ujson', 'json'):
+            if name in CODECS:
+                break
+    if name not in CODECS:
+        raise ValueError(f'JSON codec not available: {name}')
+    return CODECS[name]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""A module that defines the columnar view of the instances of a class
+
+A ColumnStore keeps the values of the attributes of the instances of one
+class in columns, one array per attribute, so that reports such as the
+mean price_by_night of the places of every city run over arrays instead of
+reading one attribute of one instance at a time:
+    number columns: an array of floats, NaN where an instance holds no
+        number
+    dictionary columns: an array of codes, with the distinct values in a
+        list, for ids and strings (and for the groups of group by)
+
+A column is built the first time it is used and then kept up to date: the
+storage reports the instances that are created, changed or deleted, and
+only their rows are read again before the next aggregation. With NumPy
+installed, the aggregations are vectorized (numpy.bincount and ufuncs over
+views of the arrays), without it they run in a Python loop over the
+arrays.
+
+Example:
+    >>> columns = ColumnStore(storage.all(Place).items())
+    >>> columns.aggregate('mean', 'price_by_night', by='city_id')
+    {'<city id>': 120.5, ...}
+"""
+from array import array
+from math import isnan, nan
+
+try:
+    import numpy
+except ImportError:  # optional, the aggregations run in Python
+    numpy = None
+
+FUNCTIONS = ('count', 'sum', 'mean', 'min', 'max')
+
+
+def _number(value):
+    """Returns value as a float, NaN if it is not a number"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return nan
+
+
+class ColumnStore:
+    """Columns of the attributes of the instances of one class
+
+    Methods:
+        add(key, obj): records that obj was created or changed
+        discard(key): records that the instance under key was deleted
+        rebuild(items): replaces the instances with the (key, obj) items
+        numbers(attr): returns the number column of attr
+        labels(attr): returns the codes and the distinct values of attr
+        aggregate(func, attr, by): computes func of attr, by group
+    """
+
+    def __init__(self, items=()):
+        self.__keys = []  # row -> <obj class name>.id
+        self.__objects = []  # row -> obj
+        self.__rows = {}  # <obj class name>.id -> row
+        self.__numbers = {}  # attr -> array of floats
+        self.__labels = {}  # attr -> (array of codes, values, value codes)
+        self.__pending = {}  # <obj class name>.id -> obj, None if deleted
+        self.rebuild(items)
+
+    def __len__(self):
+        self.__apply()
+        return len(self.__keys)
+
+    def add(self, key, obj, value=None):
+        """Records that obj, stored under key, was created or changed; its
+        row is read again before the next use (value is not used, the
+        attributes are read then)"""
+        self.__pending[key] = obj
+
+    def discard(self, key):
+        """Records that the instance stored under key was deleted"""
+        self.__pending[key] = None
+
+    def rebuild(self, items):
+        """Replaces the instances with the (key, obj) items and drops the
+        columns, which are built again when they are used"""
+        self.__keys = []
+        self.__objects = []
+        for key, obj in items:
+            self.__keys.append(key)
+            self.__objects.append(obj)
+        self.__rows = {key: row for row, key in enumerate(self.__keys)}
+        self.__numbers.clear()
+        self.__labels.clear()
+        self.__pending.clear()
+
+    def clear(self):
+        """Removes every instance"""
+        self.rebuild(())
+
+    def __code(self, attr, value):
+        """Returns the code of value in the dictionary column of attr"""
+        _, values, codes = self.__labels[attr]
+        try:
+            code = codes.get(value)
+        except TypeError:  # unhashable values are grouped by their text
+            value = repr(value)
+            code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def __apply(self):
+        """Applies the changes recorded since the last use to the rows"""
+        if not self.__pending:
+            return
+        pending, self.__pending = self.__pending, {}
+        for key, obj in pending.items():
+            row = self.__rows.get(key)
+            if obj is None:
+                if row is not None:
+                    self.__delete(row)
+                continue
+            if row is None:
+                row = self.__rows[key] = len(self.__keys)
+                self.__keys.append(key)
+                self.__objects.append(obj)
+                for attr, column in self.__numbers.items():
+                    column.append(_number(getattr(obj, attr, None)))
+                for attr, (column, _, _) in self.__labels.items():
+                    column.append(self.__code(attr,
+                                              getattr(obj, attr, None)))
+                continue
+            self.__objects[row] = obj
+            for attr, column in self.__numbers.items():
+                column[row] = _number(getattr(obj, attr, None))
+            for attr, (column, _, _) in self.__labels.items():
+                column[row] = self.__code(attr, getattr(obj, attr, None))
+
+    def __delete(self, row):
+        """Removes row by moving the last row in its place"""
+        last = len(self.__keys) - 1
+        del self.__rows[self.__keys[row]]
+        columns = list(self.__numbers.values()) + \
+            [column for column, _, _ in self.__labels.values()]
+        if row != last:
+            self.__keys[row] = self.__keys[last]
+            self.__objects[row] = self.__objects[last]
+            self.__rows[self.__keys[row]] = row
+            for column in columns:
+                column[row] = column[last]
+        self.__keys.pop()
+        self.__objects.pop()
+        for column in columns:
+            column.pop()
+
+    def numbers(self, attr):
+        """Returns the number column of attr, a copy that is not updated:
+        a NumPy array of floats, or an array('d') without NumPy; NaN where
+        the instance holds no number"""
+        column = self.__number_column(attr)
+        if numpy is None:
+            return array('d', column)
+        return numpy.array(column, dtype=float)
+
+    def labels(self, attr):
+        """Returns the codes of the values of attr, a copy like numbers(),
+        and the list of the distinct values by code"""
+        codes, values, _ = self.__label_column(attr)
+        if numpy is None:
+            return array('q', codes), list(values)
+        return numpy.array(codes, dtype=numpy.int64), list(values)
+
+    def __number_column(self, attr):
+        self.__apply()
+        column = self.__numbers.get(attr)
+        if column is None:
+            column = self.__numbers[attr] = array(
+                'd', (_number(getattr(obj, attr, None))
+                      for obj in self.__objects))
+        return column
+
+    def __label_column(self, attr):
+        self.__apply()
+        if attr not in self.__labels:
+            self.__labels[attr] = (array('q'), [], {})
+            codes = self.__labels[attr][0]
+            codes.extend(self.__code(attr, getattr(obj, attr, None))
+                         for obj in self.__objects)
+        return self.__labels[attr]
+
+    def aggregate(self, func, attr=None, by=None):
+        """Computes func over the values of attr, by group
+
+        Args:
+            func (str): one of FUNCTIONS
+            attr (str): the attribute to aggregate; count() counts the
+                instances when there is none, and the instances holding a
+                number in attr otherwise
+            by (str): the attribute to group the instances by
+
+        Return:
+            the result, or a dictionary of the result by value of by, for
+            the groups holding at least one number (one instance for
+            count()); None for the mean, min and max of no numbers
+
+        Raises:
+            ValueError: when func is unknown, or needs attr
+        """
+        if func not in FUNCTIONS:
+            raise ValueError(f'unknown function: {func}')
+        if attr is None and func != 'count':
+            raise ValueError(f'{func} needs an attribute')
+        self.__apply()
+        values = None if attr is None else self.__number_column(attr)
+        if by is None:
+            codes, labels = None, [None]
+        else:
+            codes, labels, _ = self.__label_column(by)
+        if numpy is None:
+            results, counts = self.__reduce(func, values, codes,
+                                            len(labels))
+        else:
+            results, counts = self.__reduce_numpy(func, values, codes,
+                                                  len(labels))
+        if by is None:
+            return results[0] if counts[0] or func in ('count', 'sum') \
+                else None
+        return {label: result for label, result, count in
+                zip(labels, results, counts) if count}
+
+    def __reduce(self, func, values, codes, size):
+        """Returns the results and the counts of every group, in Python"""
+        if codes is None:
+            return self.__reduce_all(func, values)
+        counts = [0] * size
+        if values is None:
+            for code in codes:
+                counts[code] += 1
+            return counts, counts
+        if func in ('min', 'max'):
+            results = [None] * size
+            better = min if func == 'min' else max
+            for code, value in zip(codes, values):
+                if value == value:  # not NaN
+                    result = results[code]
+                    results[code] = value if result is None \
+                        else better(result, value)
+                    counts[code] += 1
+            return results, counts
+        results = [0.0] * size
+        for code, value in zip(codes, values):
+            if value == value:
+                results[code] += value
+                counts[code] += 1
+        if func == 'count':
+            return counts, counts
+        if func == 'mean':
+            results = [result / count if count else None
+                       for result, count in zip(results, counts)]
+        return results, counts
+
+    def __reduce_all(self, func, values):
+        """Returns the result and the count of a single group, in Python:
+        the builtins run over the whole array when it holds no NaN"""
+        if values is None:
+            return [len(self.__keys)], [len(self.__keys)]
+        total = sum(values)
+        if isnan(total):
+            values = [value for value in values if not isnan(value)]
+            total = sum(values)
+        count = len(values)
+        if not count or func in ('sum', 'count'):
+            return [total if func == 'sum' else count], [count]
+        result = {'mean': lambda: total / count,
+                  'min': lambda: min(values),
+                  'max': lambda: max(values)}[func]()
+        return [result], [count]
+
+    def __reduce_numpy(self, func, values, codes, size):
+        """Returns the results and the counts of every group, with NumPy
+        views of the arrays"""
+        rows = len(self.__keys)
+        if not rows:  # no buffer to view
+            return self.__reduce(func, values, codes, size)
+        codes = numpy.zeros(rows, dtype=numpy.int64) if codes is None \
+            else numpy.frombuffer(codes, dtype=numpy.int64)
+        if values is None:
+            counts = numpy.bincount(codes, minlength=size)
+            return counts.tolist(), counts.tolist()
+        values = numpy.frombuffer(values, dtype=float)
+        valid = ~numpy.isnan(values)
+        codes, values = codes[valid], values[valid]
+        counts = numpy.bincount(codes, minlength=size)
+        if func == 'count':
+            results = counts
+        elif func in ('sum', 'mean'):
+            results = numpy.bincount(codes, weights=values, minlength=size)
+            if func == 'mean':
+                results = results / numpy.maximum(counts, 1)
+        else:
+            results = numpy.full(size, numpy.inf if func == 'min'
+                                 else -numpy.inf)
+            (numpy.minimum if func == 'min' else numpy.maximum).at(
+                results, codes, values)
+        return results.tolist(), counts.tolist()
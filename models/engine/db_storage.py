@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+"""A module that defines a class called DBStorage"""
+
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from math import degrees, pi
+
+from models.engine import relations
+from models.engine.batch import UndoLog
+from models.engine.codec import get_codec
+from models.engine.columnar import FUNCTIONS
+from models.engine.geo import DEFAULT_GEO_INDEXES, EARTH_RADIUS, GeoIndex
+from models.engine.index import (DEFAULT_INDEXES, DEFAULT_SORTED_INDEXES,
+                                 SortedIndex)
+from models.engine.query import Query
+from models.engine.render import RenderCache
+
+_NAME = re.compile(r'^\w+$')
+
+
+class DBStorage:
+    """A storage engine with the interface of FileStorage backed by SQLite
+
+    Every object is a row of the `objects` table: its key
+    (<obj class name>.id), class name, id and the JSON text of its
+    to_dict(). Only the objects that are asked for are read from the
+    database, and they are kept in an identity map so that reading the
+    same object twice returns the same instance.
+
+    Changes work like in FileStorage: new(), delete() and touch() record
+    them, and they are written in one transaction by save(). Until then
+    they are visible to this storage only: a read writes them in a
+    savepoint that it rolls back, so no transaction is left open, and
+    reload() discards them.
+    batch() works like in FileStorage, the block runs in a savepoint.
+
+    prefetch() reads the instances related to a set of instances with one
+    query per relationship (WHERE ... IN), instead of one per instance.
+
+    Private Attributes:
+        __file_path: string - path to the SQLite database
+        __objects: dictionary - the instances read or created so far
+        by <obj class name>.id
+
+    Methods:
+        all(self, cls): returns a dictionary of all objects, or of the
+        objects of class cls
+        count(self, cls): returns the number of objects, or of objects of
+        class cls
+        get(self, cls, id): returns the instance of cls with id
+        exists(self, cls, id): tells if there is an instance of cls with id
+        new(self, obj): adds obj to the storage
+        new_many(self, objs): adds every obj of objs to the storage
+        delete(self, obj): removes obj from the storage
+        touch(self, obj, name, value): records that obj is about to change
+        render(self, obj): returns str(obj), cached until obj changes
+        to_json(self, obj): returns the JSON text of obj.to_dict()
+        add_index(self, cls, attr, ordered): indexes the attribute attr
+        of cls
+        find(self, cls, attr, value): returns the instances of cls whose
+        attribute attr equals value
+        find_range(self, cls, attr, low, high, include_low,
+        include_high, reverse, limit): returns the instances of cls whose
+        attribute attr is between low and high, in order
+        find_containing(self, cls, attr, value): returns the instances of
+        cls whose list attribute attr holds value
+        indexed(self, cls, attr, ordered, members): tells if the
+        attribute attr of cls is indexed
+        related(self, obj, name): returns the instances related to obj by
+        its relationship name
+        prefetch(self, objs, *paths): follows the relationships of paths
+        from objs at once
+        add_geo_index(self, cls, lat_attr, lon_attr): indexes the
+        coordinates of the instances of cls
+        find_within(self, cls, lat, lon, radius): returns the instances
+        of cls at most radius km away from a point, nearest first
+        find_in_box(self, cls, south, west, north, east): returns the
+        instances of cls inside a box of coordinates
+        find_nearest(self, cls, lat, lon, k): returns the k instances of
+        cls nearest to a point
+        query(self, cls): returns a Query over the instances of cls
+        aggregate(self, cls, func, attr, by): computes func of the
+        attribute attr of the instances of cls, by group
+        batch(self): groups the saves of a block into one
+        save(self): commits the changes to the database
+        reload(self): discards the changes and the instances read so far
+        refresh(self): forgets the instances read so far when another
+        connection changed the database
+        flush(self): waits for the saves to be written (they already are)
+        close(self): commits the changes and closes the database
+    """
+
+    __file_path = "file.db"
+
+    def __init__(self, indexes=DEFAULT_INDEXES, codec=None,
+                 sorted_indexes=DEFAULT_SORTED_INDEXES,
+                 geo_indexes=DEFAULT_GEO_INDEXES):
+        """Opens the database, creating its table and indexes if needed
+
+        Args:
+            indexes (dict): attribute names to index, by class name
+            codec (str): name of the JSON codec (see models.engine.codec)
+            sorted_indexes (dict): attribute names to index for ranges,
+                by class name; the indexes of SQLite are all sorted
+            geo_indexes (dict): the (latitude, longitude) attribute names
+                to index together, by class name
+        """
+        self.__codec = get_codec(codec)
+        self.__objects = {}
+        self.__journal = {}  # <obj class name>.id -> 'put' or 'delete'
+        self.__undo = None  # UndoLog of the running batch
+        self.__indexed = set()  # (class name, attr) of add_index()
+        self.__geo = {}  # class name -> (latitude, longitude) attributes
+        # the results of prefetch(), by (<obj class name>.id, relationship)
+        self.__related = {}
+        self.__rendered = RenderCache()  # the str() of the instances
+        # transactions are opened and closed by the storage itself
+        self.__conn = sqlite3.connect(self.__file_path, isolation_level=None,
+                                      check_same_thread=False)
+        self.__conn.execute('CREATE TABLE IF NOT EXISTS objects ('
+                            'key TEXT PRIMARY KEY, class TEXT NOT NULL, '
+                            'id TEXT NOT NULL, data TEXT NOT NULL)')
+        self.__conn.execute('CREATE INDEX IF NOT EXISTS ix_objects_class '
+                            'ON objects(class)')
+        for class_name, attrs in (indexes or {}).items():
+            for attr in attrs:
+                self.add_index(class_name, attr)
+        for class_name, attrs in (sorted_indexes or {}).items():
+            for attr in attrs:
+                self.add_index(class_name, attr, ordered=True)
+        for class_name, (lat_attr, lon_attr) in (geo_indexes or {}).items():
+            self.add_geo_index(class_name, lat_attr, lon_attr)
+        self.__data_version = self.__version()
+
+    @property
+    def codec(self):
+        """The JSON codec used to encode the objects"""
+        return self.__codec
+
+    @staticmethod
+    def _class_name(cls):
+        """Returns the name of cls, which may already be a name"""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    @staticmethod
+    def __check_name(name):
+        """Makes sure that name can be used as is in a query"""
+        if not _NAME.match(name):
+            raise ValueError(f'invalid name: {name!r}')
+        return name
+
+    def __load(self, key, data):
+        """Returns the instance of the row with key and data"""
+        from models import classes
+
+        obj = self.__objects.get(key)
+        if obj is None:
+            record = self.__codec.loads(data)
+            if record['__class__'] not in classes:
+                return None
+            obj = self.__objects[key] = classes[record['__class__']](**record)
+        return obj
+
+    def __select(self, query, params=()):
+        """Returns the rows of query, the changes not saved yet included,
+        without leaving a transaction open
+
+        Outside of a batch, the changes are written in a savepoint that is
+        rolled back once the rows are read, they stay recorded until
+        save(). In a batch, which keeps its transaction open, they are
+        written to it.
+        """
+        if not self.__journal or self.__undo is not None:
+            self.__flush()
+            return self.__conn.execute(query, params).fetchall()
+        self.__conn.execute('SAVEPOINT hbnb_read')
+        try:
+            self.__write_changes()
+            return self.__conn.execute(query, params).fetchall()
+        finally:
+            self.__conn.execute('ROLLBACK TO hbnb_read')
+            self.__conn.execute('RELEASE hbnb_read')
+
+    def __rows(self, query, params=()):
+        """Returns a dictionary of the instances of the rows of query"""
+        objs = {}
+        for key, data in self.__select(query, params):
+            obj = self.__load(key, data)
+            if obj is not None:
+                objs[key] = obj
+        return objs
+
+    def all(self, cls=None):
+        """Returns a new dictionary of all objects, or of the objects of
+        cls, by <obj class name>.id"""
+        if cls is None:
+            return self.__rows('SELECT key, data FROM objects')
+        return self.__rows('SELECT key, data FROM objects WHERE class = ?',
+                           (self._class_name(cls),))
+
+    def count(self, cls=None):
+        """Returns the number of objects, or of objects of cls"""
+        if cls is None:
+            query, params = 'SELECT COUNT(*) FROM objects', ()
+        else:
+            query = 'SELECT COUNT(*) FROM objects WHERE class = ?'
+            params = (self._class_name(cls),)
+        return self.__select(query, params)[0][0]
+
+    def get(self, cls, id):
+        """Returns the instance of cls with id, or None if there is none"""
+        key = f'{self._class_name(cls)}.{id}'
+        if key in self.__objects:
+            return self.__objects[key]
+        return self.__rows('SELECT key, data FROM objects WHERE key = ?',
+                           (key,)).get(key)
+
+    def exists(self, cls, id):
+        """Tells if there is an instance of cls with id, without building
+        it"""
+        key = f'{self._class_name(cls)}.{id}'
+        if key in self.__objects:
+            return True
+        return bool(self.__select('SELECT 1 FROM objects WHERE key = ?',
+                                  (key,)))
+
+    def __add(self, key, obj):
+        """Puts obj in the identity map under key"""
+        self.__objects[key] = obj
+        self.__related.clear()
+        self.__rendered.discard(key)
+
+    def __remove(self, key):
+        """Takes the object under key out of the identity map"""
+        self.__related.clear()
+        self.__rendered.discard(key)
+        return self.__objects.pop(key, None)
+
+    def new(self, obj):
+        """Adds obj to the storage and records it as changed"""
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if self.__undo is not None:
+            # a row that was never read comes back with the savepoint
+            self.__undo.remember(key, self.__objects.get(key))
+        self.__objects[key] = obj
+        self.__record(key, 'put')
+
+    def new_many(self, objs):
+        """Adds every instance of objs to the storage, like new() on each
+        of them, they are inserted by a single executemany() on save()
+
+        Return:
+            int: the number of instances added
+        """
+        count = 0
+        for obj in objs:
+            key = "{}.{}".format(obj.__class__.__name__, obj.id)
+            if self.__undo is not None:
+                self.__undo.remember(key, self.__objects.get(key))
+            self.__objects[key] = obj
+            self.__journal.pop(key, None)
+            self.__journal[key] = 'put'
+            self.__rendered.discard(key)
+            count += 1
+        self.__related.clear()
+        return count
+
+    def delete(self, obj=None):
+        """Removes obj from the storage"""
+        if obj is not None:
+            key = "{}.{}".format(obj.__class__.__name__, obj.id)
+            if self.__undo is not None:
+                self.__undo.remember(key, obj)
+            self.__objects.pop(key, None)
+            self.__record(key, 'delete')
+
+    def touch(self, obj, name, value):
+        """Records that the attribute name of obj is about to be set"""
+        key = "{}.{}".format(obj.__class__.__name__, getattr(obj, 'id', None))
+        if self.__objects.get(key) is not obj:
+            return
+        if self.__undo is not None:
+            self.__undo.remember(key, obj)
+        if self.__journal.get(key) != 'put':
+            self.__record(key, 'put')
+        self.__rendered.discard(key)
+
+    def __record(self, key, op):
+        self.__journal.pop(key, None)
+        self.__journal[key] = op
+        self.__related.clear()
+        self.__rendered.discard(key)
+
+    def render(self, obj):
+        """Returns str(obj), formatted once for an instance in the identity
+        map until it changes (see models.engine.render)"""
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if self.__objects.get(key) is not obj:
+            return str(obj)
+        return self.__rendered.render(key, obj)
+
+    def to_json(self, obj):
+        """Returns the JSON text of obj.to_dict()"""
+        return self.__codec.dumps_instance(obj)
+
+    def add_index(self, cls, attr, ordered=False):
+        """Indexes the attribute attr of the instances of cls
+
+        The items of a list attribute cannot be indexed, find_containing()
+        reads every instance of cls.
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the attribute
+            ordered (bool): ignored, the index also serves find_range()
+        """
+        from models import classes
+
+        class_name = self.__check_name(self._class_name(cls))
+        self.__check_name(attr)
+        model = classes.get(class_name)
+        if model is not None and isinstance(model.class_default(attr), list):
+            return
+        self.__conn.execute(
+            f'CREATE INDEX IF NOT EXISTS ix_{class_name}_{attr} ON objects('
+            f"json_extract(data, '$.{attr}')) WHERE class = '{class_name}'")
+        self.__indexed.add((class_name, attr))
+
+    def find(self, cls, attr, value):
+        """Returns the instances of cls whose attribute attr equals value
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the attribute
+            value: the value to look for
+
+        Return:
+            list: the matching instances
+        """
+        from models import classes
+
+        class_name = self.__check_name(self._class_name(cls))
+        self.__check_name(attr)
+        # the class name is part of the query so the partial index applies
+        condition = f"json_extract(data, '$.{attr}') = ?"
+        if class_name in classes and \
+                classes[class_name].class_default(attr) == value:
+            # objects that never set attr hold the class default
+            condition = f"({condition} OR json_extract(data, " \
+                        f"'$.{attr}') IS NULL)"
+        return list(self.__rows(
+            f"SELECT key, data FROM objects WHERE class = '{class_name}' "
+            f"AND {condition}", (value,)).values())
+
+    def find_range(self, cls, attr, low=None, high=None, include_low=True,
+                   include_high=True, reverse=False, limit=None):
+        """Returns the instances of cls whose attribute attr is between low
+        and high, sorted by attr
+
+        The database selects the rows in the range, with the index on attr
+        when there is one, and the instances are checked and sorted with
+        the comparisons of Python (a number never matches a string bound,
+        unlike in SQLite). With a limit and string bounds, or no bounds,
+        the database sorts the values and only returns the first limit
+        rows.
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the attribute
+            low: the lowest value, None for no lower bound
+            high: the highest value, None for no upper bound
+            include_low (bool): whether low itself is in the range
+            include_high (bool): whether high itself is in the range
+            reverse (bool): return the highest values first
+            limit (int): return the first limit instances only
+
+        Return:
+            list: the matching instances
+        """
+        from models import classes
+
+        class_name = self.__check_name(self._class_name(cls))
+        self.__check_name(attr)
+        column = f"json_extract(data, '$.{attr}')"
+        conditions, params = [], []
+        for bound, include, op in ((low, include_low, '>'),
+                                   (high, include_high, '<')):
+            if bound is not None:
+                conditions.append(f"{column} {op}{'=' if include else ''} ?")
+                # dates are stored in ISO format, which sorts like them
+                params.append(bound.isoformat()
+                              if isinstance(bound, datetime) else bound)
+        condition = ' AND '.join(conditions) or '1'
+        table, order = 'objects', ''
+        if class_name in classes and \
+                classes[class_name].class_default(attr) is not None:
+            # objects that never set attr hold the class default
+            condition = f'({condition} OR {column} IS NULL)'
+        elif limit is not None and \
+                attr not in ('created_at', 'updated_at') and \
+                all(type(bound) is str for bound in (low, high)
+                    if bound is not None):
+            # SQLite sorts the numbers before the text values, like the
+            # families of SortedIndex, and the text values like the
+            # strings of Python, so only the first limit rows are read (a
+            # page of ids)
+            types = "'text'" if conditions else "'integer', 'real', 'text'"
+            condition += f" AND typeof({column}) IN ({types})"
+            order = (f" ORDER BY {column}{' DESC' if reverse else ''}"
+                     f" LIMIT {int(limit)}")
+            if (class_name, attr) in self.__indexed:
+                # without statistics SQLite prefers the index on class
+                # and sorts every row of the class
+                table = f'objects INDEXED BY ix_{class_name}_{attr}'
+        index = SortedIndex(attr)
+        index.rebuild(self.__rows(
+            f"SELECT key, data FROM {table} WHERE class = '{class_name}' "
+            f"AND {condition}{order}", params).items())
+        return index.range(low, high, include_low, include_high, reverse,
+                           limit)
+
+    def find_containing(self, cls, attr, value):
+        """Returns the instances of cls whose list attribute attr holds
+        value
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the list attribute
+            value: the item to look for
+
+        Return:
+            list: the matching instances
+        """
+        return self.__containing(cls, attr, [value]).get(value, [])
+
+    def __containing(self, cls, attr, values):
+        """Returns the instances of cls whose list attribute attr holds
+        one of values, by value"""
+        class_name = self.__check_name(self._class_name(cls))
+        self.__check_name(attr)
+        found = {}
+        for chunk in self.__chunks(values):
+            for obj in self.__rows(
+                    f"SELECT key, data FROM objects WHERE class = "
+                    f"'{class_name}' AND EXISTS (SELECT 1 FROM json_each("
+                    f"data, '$.{attr}') WHERE value IN "
+                    f"({', '.join('?' * len(chunk))}))", chunk).values():
+                items = getattr(obj, attr, None)
+                for value in chunk:
+                    if isinstance(items, (list, tuple)) and value in items:
+                        found.setdefault(value, []).append(obj)
+        return found
+
+    @staticmethod
+    def __chunks(values, size=500):
+        """Returns the distinct values by lists of at most size, below
+        the limit of parameters of a query"""
+        values = list(dict.fromkeys(values))
+        return [values[i:i + size] for i in range(0, len(values), size)]
+
+    def indexed(self, cls, attr, ordered=False, members=False):
+        """Tells if find() and find_range() answer from an index of the
+        database for the attribute attr of cls; find_containing() never
+        does"""
+        if members:
+            return False
+        return (self._class_name(cls), attr) in self.__indexed
+
+    def related(self, obj, name):
+        """Returns the instances related to obj by its relationship name
+        (see models.engine.relations)
+
+        Return:
+            the related instance, or None, for a belongs_to relationship,
+            and the list of the related instances otherwise
+
+        Raises:
+            ValueError: when the class of obj has no such relationship
+        """
+        relation = relations.relationship(obj, name)
+        key = relations.key(obj)
+        if (key, name) in self.__related:
+            return self.__related[(key, name)]
+        return self.__load_related(relation, [obj])[key]
+
+    def prefetch(self, objs, *paths):
+        """Follows the relationships of paths from objs, a level at a
+        time with one query per relationship, so that related() answers
+        them without a query until the next change
+
+        Args:
+            objs (iterable): the instances
+            paths (str): names of relationships, separated by dots to
+                follow them further ('cities.places.reviews')
+
+        Return:
+            list: objs
+
+        Raises:
+            ValueError: when a class has no such relationship
+        """
+        objs = list(objs)
+        self.__related.update(relations.prefetch(objs, paths,
+                                                 self.__load_related))
+        return objs
+
+    def __load_related(self, relation, objs):
+        """Returns the instances related to each of objs by relation, by
+        key, with one query"""
+        target = self.__check_name(relation.target)
+        attr = self.__check_name(relation.attr)
+        if relation.kind in ('belongs_to', 'has_ids'):
+            ids = {relations.key(obj): relations.ids(obj, relation)
+                   for obj in objs}
+            found = {}
+            for chunk in self.__chunks(f'{target}.{id}'
+                                       for id_list in ids.values()
+                                       for id in id_list
+                                       if isinstance(id, str)):
+                found.update(self.__rows(
+                    f"SELECT key, data FROM objects WHERE key IN "
+                    f"({', '.join('?' * len(chunk))})", chunk))
+            results = {obj_key: [found[f'{target}.{id}'] for id in id_list
+                                 if f'{target}.{id}' in found]
+                       for obj_key, id_list in ids.items()}
+            if relation.kind == 'belongs_to':
+                return {obj_key: related[0] if related else None
+                        for obj_key, related in results.items()}
+            return results
+        ids = [obj.id for obj in objs]
+        if relation.kind == 'listed_in':
+            found = self.__containing(target, attr, ids)
+        else:
+            found = {}
+            for chunk in self.__chunks(ids):
+                for obj in self.__rows(
+                        f"SELECT key, data FROM objects WHERE class = "
+                        f"'{target}' AND json_extract(data, '$.{attr}') "
+                        f"IN ({', '.join('?' * len(chunk))})",
+                        chunk).values():
+                    found.setdefault(getattr(obj, attr, None),
+                                     []).append(obj)
+        return {relations.key(obj): found.get(obj.id, []) for obj in objs}
+
+    def query(self, cls):
+        """Returns a Query over the instances of cls (see
+        models.engine.query)"""
+        return Query(self, cls)
+
+    def aggregate(self, cls, func, attr=None, by=None):
+        """Computes func over the attribute attr of the instances of cls,
+        by group, in the database without reading the instances
+
+        Args:
+            cls (type or str): the class, or its name
+            func (str): count, sum, mean, min or max
+            attr (str): the attribute to aggregate, whose values that are
+                not numbers are left out; count() counts the instances
+                when there is none
+            by (str): the attribute to group the instances by, whose
+                values are the ones stored (dates are ISO strings)
+
+        Return:
+            the result, or a dictionary of the results by value of by
+
+        Raises:
+            ValueError: when func is unknown, or needs attr
+        """
+        from models import classes
+
+        if func not in FUNCTIONS:
+            raise ValueError(f'unknown function: {func}')
+        if attr is None and func != 'count':
+            raise ValueError(f'{func} needs an attribute')
+        class_name = self.__check_name(self._class_name(cls))
+        cls = classes.get(class_name)
+        value, value_params = '*', []
+        if attr is not None:
+            self.__check_name(attr)
+            value = f"CASE json_type(data, '$.{attr}') " \
+                    f"WHEN 'integer' THEN json_extract(data, '$.{attr}') " \
+                    f"WHEN 'real' THEN json_extract(data, '$.{attr}') END"
+            default = None if cls is None else cls.class_default(attr)
+            if isinstance(default, (int, float)) and \
+                    not isinstance(default, bool):
+                # objects that never set attr hold the class default
+                value = f"CASE WHEN json_type(data, '$.{attr}') IS NULL " \
+                        f"THEN ? ELSE {value} END"
+                value_params.append(default)
+        group, group_params = 'NULL', []
+        if by is not None:
+            self.__check_name(by)
+            group = f"COALESCE(json_extract(data, '$.{by}'), ?)"
+            default = None if cls is None else cls.class_default(by)
+            group_params.append(default.isoformat()
+                                if isinstance(default, datetime)
+                                else default)
+        function = {'count': 'COUNT', 'sum': 'TOTAL', 'mean': 'AVG',
+                    'min': 'MIN', 'max': 'MAX'}[func]
+        rows = self.__select(
+            f"SELECT {group}, {function}({value}), COUNT({value}) "
+            f"FROM objects WHERE class = '{class_name}'"
+            f"{' GROUP BY 1' if by is not None else ''}",
+            group_params + value_params * 2)
+        results = {}
+        for label, result, count in rows:
+            # the groups without numbers are left out, like in FileStorage
+            if count or (by is None and func in ('count', 'sum')):
+                if func != 'count' and result is not None:
+                    result = float(result)
+                results[label] = result
+        if by is not None:
+            return results
+        return results.get(None)
+
+    def add_geo_index(self, cls, lat_attr='latitude', lon_attr='longitude'):
+        """Indexes the coordinates of the instances of cls: the database
+        indexes the latitude, which narrows the searches to a band
+
+        Args:
+            cls (type or str): the class, or its name
+            lat_attr (str): the name of the latitude attribute
+            lon_attr (str): the name of the longitude attribute
+        """
+        class_name = self._class_name(cls)
+        self.add_index(class_name, lat_attr, ordered=True)
+        self.__geo[class_name] = (lat_attr, lon_attr)
+
+    def __geo_index(self, cls, south, north):
+        """Returns a GeoIndex over the instances of cls between the
+        latitudes south and north"""
+        class_name = self._class_name(cls)
+        lat_attr, lon_attr = self.__geo.get(class_name,
+                                            ('latitude', 'longitude'))
+        geo = GeoIndex(lat_attr, lon_attr)
+        geo.rebuild((f'{class_name}.{obj.id}', obj) for obj in
+                    self.find_range(class_name, lat_attr, max(south, -90),
+                                    min(north, 90)))
+        return geo
+
+    def find_within(self, cls, lat, lon, radius):
+        """Returns the instances of cls at most radius km away from the
+        point (lat, lon), nearest first
+
+        Return:
+            list: the matching instances
+        """
+        spread = degrees(radius / EARTH_RADIUS)
+        geo = self.__geo_index(cls, lat - spread, lat + spread)
+        return [obj for _, obj in geo.within_radius(lat, lon, radius)]
+
+    def find_in_box(self, cls, south, west, north, east):
+        """Returns the instances of cls whose coordinates are inside the
+        box, which goes east from west to east (across the antimeridian
+        when west > east)
+
+        Return:
+            list: the matching instances, in no particular order
+        """
+        return self.__geo_index(cls, south, north).within_box(
+            south, west, north, east)
+
+    def find_nearest(self, cls, lat, lon, k=1):
+        """Returns the k instances of cls nearest to the point (lat, lon),
+        searching in larger and larger circles
+
+        Return:
+            list: the instances, nearest first
+        """
+        if k <= 0:
+            return []
+        radius = 10.0
+        while True:
+            found = self.find_within(cls, lat, lon, radius)
+            if len(found) >= k or radius >= pi * EARTH_RADIUS:
+                return found[:k]
+            radius *= 4
+
+    def __flush(self):
+        """Writes the recorded changes to the open transaction"""
+        if not self.__journal:
+            return
+        if not self.__conn.in_transaction:
+            self.__conn.execute('BEGIN')
+        self.__write_changes()
+        self.__journal.clear()
+
+    def __write_changes(self):
+        """Writes the recorded changes to the database"""
+        puts, deletes = [], []
+        for key, op in self.__journal.items():
+            obj = self.__objects.get(key)
+            if op == 'put' and obj is not None:
+                puts.append((key, obj.__class__.__name__, obj.id,
+                             self.__codec.dumps_instance(obj)))
+            else:
+                deletes.append((key,))
+        self.__conn.executemany('DELETE FROM objects WHERE key = ?', deletes)
+        self.__conn.executemany('INSERT OR REPLACE INTO objects '
+                                '(key, class, id, data) VALUES (?, ?, ?, ?)',
+                                puts)
+
+    @contextmanager
+    def batch(self):
+        """Saves once at the end of the block instead of on every save()
+
+        The changes of the block are written in a savepoint which is
+        rolled back, along with the objects, if the block raises.
+        """
+        if self.__undo is not None:  # part of the outer batch
+            yield self
+            return
+        self.__flush()
+        if not self.__conn.in_transaction:
+            self.__conn.execute('BEGIN')
+        self.__conn.execute('SAVEPOINT hbnb_batch')
+        self.__undo = UndoLog()
+        try:
+            yield self
+        except BaseException:
+            undo, self.__undo = self.__undo, None
+            self.__conn.execute('ROLLBACK TO hbnb_batch')
+            self.__conn.execute('RELEASE hbnb_batch')
+            undo.restore(self.__add, self.__remove)
+            self.__journal = {}
+            raise
+        self.__undo = None
+        self.__conn.execute('RELEASE hbnb_batch')
+        self.save()
+
+    def save(self):
+        """Writes the changes to the database in a single transaction"""
+        if self.__undo is not None:  # saved at the end of the batch
+            return
+        self.__flush()
+        if self.__conn.in_transaction:
+            self.__conn.execute('COMMIT')
+
+    def reload(self):
+        """Discards the changes that were not saved and the instances read
+        so far, the next reads come from the database"""
+        if self.__conn.in_transaction:
+            self.__conn.execute('ROLLBACK')
+        self.__journal = {}
+        self.__objects = {}
+        self.__related = {}
+        self.__rendered = RenderCache()
+
+    def flush(self):
+        """Does nothing, save() writes synchronously, here for the
+        interface of FileStorage"""
+
+    def __version(self):
+        """Returns the version of the database, which changes when another
+        connection commits"""
+        return self.__conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def refresh(self):
+        """Forgets the instances read so far, except the changed ones, when
+        another connection (another process) committed since the last
+        check, so that they are read again
+
+        Return:
+            bool: True if the database had changed
+        """
+        if self.__undo is not None or self.__conn.in_transaction:
+            return False
+        version = self.__version()
+        if version == self.__data_version:
+            return False
+        self.__data_version = version
+        self.__objects = {key: obj for key, obj in self.__objects.items()
+                          if key in self.__journal}
+        self.__related = {}
+        self.__rendered = RenderCache()
+        return True
+
+    def close(self):
+        """Saves the changes and closes the database"""
+        self.save()
+        self.__conn.close()
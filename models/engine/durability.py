@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Crash-safe writes of the storage files
+
+atomic_write() writes the new content of a file, which may be produced
+piece by piece, to a temporary file next to it and renames it over the
+old one, so a crash in the middle of a save
+leaves the previous version of the file instead of a truncated one.
+
+When the written data reaches the disk is set by a SyncPolicy:
+    none: the operating system writes it when it wants to (fastest, a
+        power loss can lose the last saves)
+    always: every write is followed by an fsync() of the file and of its
+        directory, a save is on disk when it returns
+    group: the written files are fsync()ed together by a background
+        thread `interval` milliseconds after the first write, a power loss
+        loses at most the saves of the last interval
+
+Example:
+    >>> sync = SyncPolicy('group', interval=20)
+    >>> atomic_write('file.json', '{}', sync)
+    >>> sync.flush()  # on disk now instead of in 20 ms
+"""
+
+import os
+import threading
+
+
+def _fsync_path(path):
+    """Flushes the file or directory at path to the disk"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:  # renamed or removed since it was written
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SyncPolicy:
+    """When the files written by the storage are flushed to the disk
+
+    Attributes:
+        policy (str): one of SyncPolicy.policies
+        interval (int): delay of the 'group' flushes, in milliseconds
+
+    Methods:
+        sync_file(file): flushes the open file when the policy is 'always'
+        written(path, new_entry): called once path is written and closed
+        flush(): flushes the files waiting for a 'group' flush
+    """
+
+    policies = ('none', 'always', 'group')
+
+    def __init__(self, policy='none', interval=50):
+        """
+        Args:
+            policy (str): one of SyncPolicy.policies
+            interval (int): delay of the 'group' flushes, in milliseconds
+        """
+        if policy not in self.policies:
+            raise ValueError(f'unknown fsync policy: {policy}')
+        self.policy = policy
+        self.interval = interval
+        self.__pending = set()  # paths of the files and directories
+        self.__lock = threading.Lock()
+        self.__timer = None
+
+    def __repr__(self):
+        return f'<SyncPolicy {self.policy}>'
+
+    def sync_file(self, file):
+        """Flushes the open file to the disk when the policy is 'always'"""
+        if self.policy == 'always':
+            file.flush()
+            os.fsync(file.fileno())
+
+    def written(self, path, new_entry=False):
+        """Makes the file at path durable according to the policy
+
+        Args:
+            path (str): the file that was written and closed
+            new_entry (bool): the file was created or renamed, so its
+                directory has to be flushed as well
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        if self.policy == 'always':
+            if new_entry:
+                _fsync_path(directory)
+        elif self.policy == 'group':
+            with self.__lock:
+                self.__pending.add(path)
+                if new_entry:
+                    self.__pending.add(directory)
+                if self.__timer is None:
+                    self.__timer = threading.Timer(self.interval / 1000,
+                                                   self.flush)
+                    self.__timer.daemon = True
+                    self.__timer.start()
+
+    def flush(self):
+        """Flushes the files waiting for a 'group' flush to the disk"""
+        with self.__lock:
+            pending, self.__pending = self.__pending, set()
+            timer, self.__timer = self.__timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        # the files before their directories, which record their renames
+        for path in sorted(pending, key=os.path.isdir):
+            _fsync_path(path)
+
+
+NO_SYNC = SyncPolicy()
+
+
+def atomic_write(path, text, sync=NO_SYNC):
+    """Replaces the content of the file at path with text
+
+    Args:
+        path (str): path of the file, created if it does not exist
+        text (str or iterable): the new content, or its pieces, which are
+            written one at a time as they are produced
+        sync (SyncPolicy): when the new content is flushed to the disk
+    """
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='UTF-8') as file:
+            if isinstance(text, str):
+                file.write(text)
+            else:
+                file.writelines(text)
+            sync.sync_file(file)
+    except BaseException:  # the previous file is left as it was
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    sync.written(path, new_entry=True)
@@ -1,7 +1,24 @@
 #!/usr/bin/env python3
 """A module that defines a class called FileStorage"""
 
-import json
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+
+from models.engine import relations, snapshot, write_ahead_log
+from models.engine.batch import UndoLog
+from models.engine.codec import get_codec
+from models.engine.columnar import ColumnStore
+from models.engine.durability import SyncPolicy, atomic_write
+from models.engine.geo import DEFAULT_GEO_INDEXES, GeoIndex
+from models.engine.index import (DEFAULT_INDEXES, DEFAULT_SORTED_INDEXES,
+                                 AttributeIndex, MemberIndex, SortedIndex)
+from models.engine.locking import directory_lock
+from models.engine.metrics import registry as metrics, timed
+from models.engine.query import Query
+from models.engine.render import RenderCache
+from models.engine.writer import BackgroundWriter
 
 
 class FileStorage:
@@ -9,51 +26,1257 @@ class FileStorage:
 
     Private Attributes:
         __file_path: string - path to the JSON file
+        __shards_path: string - path to the directory of the class files
+        of the sharded layout
         __objects: dictionary - empty but will store all objects
         by <obj class name>.id
+        __classes: dictionary - the objects of __objects partitioned by
+        class name, {<obj class name>: {<obj class name>.id: obj}}
+
+    Only the objects changed since the previous save (passed to new() or
+    touched by BaseModel.__setattr__) are encoded again, the JSON text of
+    the others is cached; a list attribute changed in place must be
+    followed by new(obj) or obj.save(). The options of __init__ and the
+    modules implementing them:
+        mode: 'snapshot' rewrites the JSON file, 'log' appends to a log
+        (models.engine.write_ahead_log)
+        file_format: 'json' or 'ndjson', read and written as a stream
+        (models.engine.snapshot)
+        layout: 'single' file, or 'sharded' in a file per class under
+        __shards_path (models.engine.migrate converts them)
+        fsync: when the atomic saves reach the disk
+        (models.engine.durability)
+        async_save: write in a background thread (models.engine.writer)
+        lazy: build the instances read by reload() when first used
+    Several processes can share the files (models.engine.locking). The
+    indexes (models.engine.index, models.engine.geo), relationships
+    (models.engine.relations), aggregates (models.engine.columnar),
+    batches (models.engine.batch), rendered text (models.engine.render)
+    and metrics (models.engine.metrics) are described in their modules.
 
     Methods:
-        all(): returns the dictionary __objects
+        all(self, cls): returns the dictionary __objects, or the objects
+        of class cls
+        count(self, cls): returns the number of objects, or of objects of
+        class cls
+        get(self, cls, id): returns the instance of cls with id
+        exists(self, cls, id): tells if there is an instance of cls with id
         new(self, obj): sets in __objects the obj with
         key <obj class name>.id
+        new_many(self, objs): sets every obj of objs in __objects at once
+        delete(self, obj): removes obj from __objects
+        touch(self, obj, name, value): records that obj is about to change
+        render(self, obj): returns str(obj), cached until obj changes
+        to_json(self, obj): returns the JSON text of obj.to_dict()
+        add_index(self, cls, attr, ordered): indexes the attribute attr
+        of cls
+        find(self, cls, attr, value): returns the instances of cls whose
+        attribute attr equals value
+        find_range(self, cls, attr, low, high, include_low,
+        include_high, reverse, limit): returns the instances of cls whose
+        attribute attr is between low and high, in order
+        find_containing(self, cls, attr, value): returns the instances of
+        cls whose list attribute attr holds value
+        indexed(self, cls, attr, ordered, members): tells if the
+        attribute attr of cls is indexed
+        related(self, obj, name): returns the instances related to obj by
+        its relationship name
+        prefetch(self, objs, *paths): follows the relationships of paths
+        from objs at once
+        add_geo_index(self, cls, lat_attr, lon_attr, cell_size): indexes
+        the coordinates of the instances of cls
+        find_within(self, cls, lat, lon, radius): returns the instances
+        of cls at most radius km away from a point, nearest first
+        find_in_box(self, cls, south, west, north, east): returns the
+        instances of cls inside a box of coordinates
+        find_nearest(self, cls, lat, lon, k): returns the k instances of
+        cls nearest to a point
+        query(self, cls): returns a Query over the instances of cls
+        columns(self, cls): returns the ColumnStore of cls
+        aggregate(self, cls, func, attr, by): computes func of the
+        attribute attr of the instances of cls, by group
+        batch(self): groups the saves of a block into one
         save(self): serializes __objects to the JSON
         file (path: __file_path)
-        reload(self): deserializes the JSON file to __objects
+        flush(self): waits for the saves to be written to the disk
+        close(self): flushes and stops the background writer
+        reload(self, classes): deserializes the JSON file to __objects
+        refresh(self): merges the changes saved by other processes
+        compact(self): folds the log into the JSON file
     """
 
     __file_path = "file.json"
+    __shards_path = "storage"
     __objects = {}
+    modes = ('snapshot', 'log')
+    layouts = ('single', 'sharded')
+
+    def __init__(self, mode='snapshot', log_threshold=10000,
+                 indexes=DEFAULT_INDEXES, codec=None, lazy=False,
+                 fsync='none', fsync_interval=50, async_save=False,
+                 file_format='json', layout='single',
+                 sorted_indexes=DEFAULT_SORTED_INDEXES,
+                 geo_indexes=DEFAULT_GEO_INDEXES):
+        """Initializes the storage
+
+        Args:
+            mode (str): one of FileStorage.modes
+            log_threshold (int): number of log records that triggers a
+                background compaction in 'log' mode
+            indexes (dict): attribute names to index, by class name
+            codec (str): name of the JSON codec (see models.engine.codec),
+                by default the fastest one installed
+            lazy (bool): build the instances read by reload() on demand
+            fsync (str): when the saves are flushed to the disk, one of
+                SyncPolicy.policies
+            fsync_interval (int): delay of the 'group' flushes, in
+                milliseconds
+            async_save (bool): write the saves in a background thread
+            file_format (str): format of the JSON file, one of
+                snapshot.FORMATS
+            layout (str): one of FileStorage.layouts
+            sorted_indexes (dict): attribute names to index in order, by
+                class name
+            geo_indexes (dict): the (latitude, longitude) attribute names
+                to index together, by class name
+        """
+        if mode not in self.modes:
+            raise ValueError(f'unknown storage mode: {mode}')
+        if file_format not in snapshot.FORMATS:
+            raise ValueError(f'unknown file format: {file_format}')
+        if layout not in self.layouts:
+            raise ValueError(f'unknown storage layout: {layout}')
+        if layout == 'sharded' and mode != 'snapshot':
+            raise ValueError('the sharded layout needs the snapshot mode')
+        self.__layout = layout
+        self.__format = file_format
+        self.__mode = mode
+        self.__codec = get_codec(codec)
+        self.__lazy = lazy
+        self.__sync = SyncPolicy(fsync, fsync_interval)
+        self.__async = async_save
+        self.__writer = None
+        # the writer's copy of the entries of every file it wrote, by shard
+        # (see __shard), and the shards it has a copy of
+        self.__entries = {}
+        self.__mirrored = set()
+        self.__loaded = None  # the shards loaded by reload(), None for all
+        # the version of the files of every shard last read or written,
+        # by the instances and by the background writer
+        self.__stamps = {}
+        self.__written = {}
+        self.__log_threshold = log_threshold
+        self.__log_records = 0
+        self.__journal = {}  # <obj class name>.id -> 'put' or 'delete'
+        self.__fragments = {}  # <obj class name>.id -> JSON text of obj
+        self.__compactor = None
+        self.__lock = threading.Lock()
+        self.__objects = {}
+        self.__classes = {}
+        self.__raw = {}  # class name -> {<class name>.id: raw dictionary}
+        # class name -> {attribute name: index}, the GeoIndex of a class
+        # is also there under the names of its attributes, as a tuple,
+        # and the ColumnStore under ()
+        self.__indexes = {}
+        self.__geo = {}  # class name -> GeoIndex
+        self.__columns = {}  # class name -> ColumnStore
+        # the results of prefetch(), by (<obj class name>.id, relationship)
+        self.__related = {}
+        self.__rendered = RenderCache()  # the str() of the instances
+        self.__undo = None  # UndoLog of the running batch
+        for class_name, attrs in (indexes or {}).items():
+            for attr in attrs:
+                self.add_index(class_name, attr)
+        for class_name, attrs in (sorted_indexes or {}).items():
+            for attr in attrs:
+                self.add_index(class_name, attr, ordered=True)
+        for class_name, (lat_attr, lon_attr) in (geo_indexes or {}).items():
+            self.add_geo_index(class_name, lat_attr, lon_attr)
+
+    @property
+    def mode(self):
+        """The persistence mode of the storage"""
+        return self.__mode
+
+    @property
+    def codec(self):
+        """The JSON codec used to read and write the file"""
+        return self.__codec
+
+    @property
+    def layout(self):
+        """The layout of the files"""
+        return self.__layout
+
+    @property
+    def file_path(self):
+        """The path of the JSON file of the single layout"""
+        return self.__file_path
+
+    @property
+    def shards_path(self):
+        """The path of the directory of the sharded layout"""
+        return self.__shards_path
 
-    def all(self):
+    @property
+    def file_format(self):
+        """The format of the JSON file"""
+        return self.__format
+
+    @property
+    def fsync(self):
+        """The fsync policy of the saves"""
+        return self.__sync.policy
+
+    @property
+    def __log_path(self):
+        return self.__file_path + '.log'
+
+    @property
+    def __compacting_path(self):
+        return self.__file_path + '.log.compacting'
+
+    @staticmethod
+    def _class_name(cls):
+        """Returns the name of cls, which may already be a name"""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def all(self, cls=None):
         """Returns the dictionary __objects
+
+        Args:
+            cls (type or str): only return the objects of this class, the
+                class or its name
+
         Return:
-            dict: a dictionary of all objects"""
-        return self.__objects
+            dict: a dictionary of all objects, or a new dictionary of the
+            objects of cls which is built in O(k) for k objects of cls"""
+        if cls is None:
+            for class_name in list(self.__raw):
+                self.__hydrate(class_name)
+            return self.__objects
+        class_name = self._class_name(cls)
+        self.__hydrate(class_name)
+        return dict(self.__classes.get(class_name, {}))
+
+    def count(self, cls=None):
+        """Returns the number of objects, or of objects of cls, in O(1)"""
+        if cls is None:
+            return len(self.__objects) + sum(map(len, self.__raw.values()))
+        class_name = self._class_name(cls)
+        return len(self.__classes.get(class_name, {})) + \
+            len(self.__raw.get(class_name, {}))
+
+    def get(self, cls, id):
+        """Returns the instance of cls with id, or None if there is none"""
+        key = f'{self._class_name(cls)}.{id}'
+        obj = self.__objects.get(key)
+        if obj is None:
+            record = self.__raw.get(self._class_name(cls), {}).pop(key, None)
+            if record is not None:
+                obj = self.__build(key, record)
+                for index in self.__indexes.get(obj.__class__.__name__,
+                                                {}).values():
+                    index.add(key, obj)
+        return obj
+
+    def exists(self, cls, id):
+        """Tells if there is an instance of cls with id, without building
+        it"""
+        key = f'{self._class_name(cls)}.{id}'
+        return key in self.__objects or \
+            key in self.__raw.get(self._class_name(cls), {})
+
+    def __add(self, key, obj):
+        """Stores obj under key in __objects, __classes and the indexes"""
+        class_name = obj.__class__.__name__
+        self.__raw.get(class_name, {}).pop(key, None)
+        self.__objects[key] = obj
+        self.__classes.setdefault(class_name, {})[key] = obj
+        for index in self.__indexes.get(class_name, {}).values():
+            index.add(key, obj)
+        self.__related.clear()
+        self.__rendered.discard(key)
+
+    def __remove(self, key):
+        """Forgets the object stored under key and returns it"""
+        obj = self.__objects.pop(key, None)
+        if obj is not None:
+            class_name = obj.__class__.__name__
+            self.__classes.get(class_name, {}).pop(key, None)
+            for index in self.__indexes.get(class_name, {}).values():
+                index.discard(key)
+            self.__related.clear()
+            self.__rendered.discard(key)
+        return obj
 
     def new(self, obj):
-        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        """Sets obj in __objects and records it as changed"""
+        class_name = obj.__class__.__name__
+        key = "{}.{}".format(class_name, obj.id)
+        if self.__undo is not None:
+            self.__undo.remember(key, self.get(class_name, obj.id))
+        self.__add(key, obj)
+        self.__record(key, 'put')
+
+    @timed('storage.new_many')
+    def new_many(self, objs):
+        """Sets every instance of objs in __objects and records them as
+        changed, like new() on each of them
+
+        The indexes of a class are rebuilt once when the instances added
+        are at least a quarter of the instances of the class, so that a
+        sorted index sorts once instead of inserting them one by one.
+
+        Args:
+            objs (iterable): the instances
+
+        Return:
+            int: the number of instances stored
+        """
+        added = {}  # class name -> [(<obj class name>.id, obj)]
+        objects = self.__objects
+        journal = self.__journal
+        rendered = self.__rendered
+        for obj in objs:
+            class_name = obj.__class__.__name__
+            key = f'{class_name}.{obj.id}'
+            if self.__undo is not None:
+                self.__undo.remember(key, self.get(class_name, obj.id))
+            objects[key] = obj
+            items = added.get(class_name)
+            if items is None:
+                items = added[class_name] = []
+            items.append((key, obj))
+            # like __record, a key added again moves to the end
+            journal.pop(key, None)
+            journal[key] = 'put'
+            rendered.discard(key)
+        count = 0
+        for class_name, items in added.items():
+            raws = self.__raw.get(class_name)
+            if raws:
+                for key, _ in items:
+                    raws.pop(key, None)
+            stored = self.__classes.setdefault(class_name, {})
+            stored.update(items)
+            indexes = self.__indexes.get(class_name, {}).values()
+            if len(items) * 4 >= len(stored):
+                for index in indexes:
+                    index.rebuild(stored.items())
+            else:
+                for index in indexes:
+                    for key, obj in items:
+                        index.add(key, obj)
+            count += len(items)
+        if added:
+            self.__related.clear()
+        metrics.count('storage.objects_added', count)
+        return count
+
+    def delete(self, obj=None):
+        """Removes obj from __objects and records the deletion"""
+        if obj is not None:
+            key = "{}.{}".format(obj.__class__.__name__, obj.id)
+            if self.__undo is not None and key in self.__objects:
+                self.__undo.remember(key, self.__objects[key])
+            if self.__remove(key) is not None:
+                self.__record(key, 'delete')
+
+    def touch(self, obj, name, value):
+        """Records that the attribute name of obj is about to be set
+
+        Objects that are not in __objects (for instance while they are
+        being initialized) are ignored.
+        """
+        class_name = obj.__class__.__name__
+        key = "{}.{}".format(class_name, getattr(obj, 'id', None))
+        if self.__objects.get(key) is not obj:
+            return
+        if self.__undo is not None:
+            self.__undo.remember(key, obj)
+        if self.__journal.get(key) != 'put':
+            self.__record(key, 'put')
+        self.__related.clear()
+        self.__rendered.discard(key)
+        index = self.__indexes.get(class_name, {}).get(name)
+        if index is not None:
+            index.add(key, obj, value)
+        geo = self.__geo.get(class_name)
+        if geo is not None and name in geo.attrs:
+            geo.add(key, obj, **{name: value})
+        columns = self.__columns.get(class_name)
+        if columns is not None:
+            columns.add(key, obj)
+
+    def render(self, obj):
+        """Returns str(obj), formatted once for a stored instance until it
+        changes (see models.engine.render)"""
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if self.__objects.get(key) is not obj:
+            return str(obj)
+        return self.__rendered.render(key, obj)
+
+    def to_json(self, obj):
+        """Returns the JSON text of obj.to_dict(), the cached text of the
+        file for a stored instance that did not change since it was last
+        read or saved"""
+        key = f'{obj.__class__.__name__}.{obj.id}'
+        if self.__objects.get(key) is obj and key not in self.__journal:
+            text = self.__fragments.get(key)
+            if text is not None:
+                return text
+        return self.__codec.dumps_instance(obj)
+
+    def add_index(self, cls, attr, ordered=False):
+        """Indexes the attribute attr of the instances of cls
+
+        The index of an attribute whose class default is a list indexes
+        the items of the lists, for find_containing().
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the attribute
+            ordered (bool): keep the values in order, for find_range()
+        """
+        from models import classes
+
+        class_name = self._class_name(cls)
+        model = classes.get(class_name)
+        if ordered:
+            index = SortedIndex(attr)
+        elif model is not None and \
+                isinstance(model.class_default(attr), list):
+            index = MemberIndex(attr)
+        else:
+            index = AttributeIndex(attr)
+        index.rebuild(self.__classes.get(class_name, {}).items())
+        self.__indexes.setdefault(class_name, {})[attr] = index
+
+    def find(self, cls, attr, value):
+        """Returns the instances of cls whose attribute attr equals value
+
+        The lookup uses the index on attr when there is one and scans the
+        instances of cls otherwise.
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the attribute
+            value: the value to look for
+
+        Return:
+            list: the matching instances
+        """
+        class_name = self._class_name(cls)
+        self.__hydrate(class_name)
+        index = self.__indexes.get(class_name, {}).get(attr)
+        if isinstance(index, (AttributeIndex, SortedIndex)):
+            return index.find(value)
+        return [obj for obj in self.__classes.get(class_name, {}).values()
+                if getattr(obj, attr, None) == value]
+
+    def find_containing(self, cls, attr, value):
+        """Returns the instances of cls whose list attribute attr holds
+        value
+
+        The lookup uses the index of attr when there is one and scans the
+        instances of cls otherwise.
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the list attribute
+            value: the item to look for
+
+        Return:
+            list: the matching instances
+        """
+        class_name = self._class_name(cls)
+        self.__hydrate(class_name)
+        index = self.__indexes.get(class_name, {}).get(attr)
+        if not isinstance(index, MemberIndex):
+            index = MemberIndex(attr)
+            index.rebuild(self.__classes.get(class_name, {}).items())
+        return index.find(value)
+
+    def find_range(self, cls, attr, low=None, high=None, include_low=True,
+                   include_high=True, reverse=False, limit=None):
+        """Returns the instances of cls whose attribute attr is between low
+        and high, sorted by attr
+
+        The lookup uses the sorted index on attr when there is one and
+        scans the instances of cls otherwise.
+
+        Args:
+            cls (type or str): the class, or its name
+            attr (str): the name of the attribute
+            low: the lowest value, None for no lower bound
+            high: the highest value, None for no upper bound
+            include_low (bool): whether low itself is in the range
+            include_high (bool): whether high itself is in the range
+            reverse (bool): return the highest values first
+            limit (int): return the first limit instances only
+
+        Return:
+            list: the matching instances; the instances whose value cannot
+            be compared with the bounds are left out
+        """
+        class_name = self._class_name(cls)
+        self.__hydrate(class_name)
+        index = self.__indexes.get(class_name, {}).get(attr)
+        if not isinstance(index, SortedIndex):
+            index = SortedIndex(attr)
+            index.rebuild(self.__classes.get(class_name, {}).items())
+        return index.range(low, high, include_low, include_high, reverse,
+                           limit)
+
+    def indexed(self, cls, attr, ordered=False, members=False):
+        """Tells if find(), or find_range() when ordered is set, or
+        find_containing() when members is set, answers from an index for
+        the attribute attr of cls"""
+        index = self.__indexes.get(self._class_name(cls), {}).get(attr)
+        if ordered:
+            return isinstance(index, SortedIndex)
+        if members:
+            return isinstance(index, MemberIndex)
+        return isinstance(index, (AttributeIndex, SortedIndex))
+
+    def related(self, obj, name):
+        """Returns the instances related to obj by its relationship name
+        (see models.engine.relations)
+
+        Return:
+            the related instance, or None, for a belongs_to relationship,
+            and the list of the related instances otherwise
+
+        Raises:
+            ValueError: when the class of obj has no such relationship
+        """
+        relation = relations.relationship(obj, name)
+        key = relations.key(obj)
+        if (key, name) in self.__related:
+            return self.__related[(key, name)]
+        return self.__load_related(relation, [obj])[key]
+
+    def prefetch(self, objs, *paths):
+        """Follows the relationships of paths from objs, a level at a
+        time, so that related() answers them without a lookup until the
+        next change
+
+        Args:
+            objs (iterable): the instances
+            paths (str): names of relationships, separated by dots to
+                follow them further ('cities.places.reviews')
+
+        Return:
+            list: objs
+
+        Raises:
+            ValueError: when a class has no such relationship
+        """
+        objs = list(objs)
+        self.__related.update(relations.prefetch(objs, paths,
+                                                 self.__load_related))
+        return objs
+
+    def __load_related(self, relation, objs):
+        """Returns the instances related to each of objs by relation, by
+        key, with an index or a single scan of the target class"""
+        target, attr = relation.target, relation.attr
+        if relation.kind == 'belongs_to':
+            return {relations.key(obj):
+                    self.get(target, getattr(obj, attr, None))
+                    for obj in objs}
+        if relation.kind == 'has_ids':
+            return {relations.key(obj):
+                    [related for related in
+                     (self.get(target, id)
+                      for id in relations.ids(obj, relation))
+                     if related is not None]
+                    for obj in objs}
+        self.__hydrate(target)
+        index = self.__indexes.get(target, {}).get(attr)
+        wanted = MemberIndex if relation.kind == 'listed_in' else \
+            (AttributeIndex, SortedIndex)
+        if not isinstance(index, wanted):
+            # one scan for every instance of objs
+            index = MemberIndex(attr) if relation.kind == 'listed_in' \
+                else AttributeIndex(attr)
+            index.rebuild(self.__classes.get(target, {}).items())
+        return {relations.key(obj): index.find(obj.id) for obj in objs}
+
+    def query(self, cls):
+        """Returns a Query over the instances of cls (see
+        models.engine.query)"""
+        return Query(self, cls)
+
+    def add_geo_index(self, cls, lat_attr='latitude', lon_attr='longitude',
+                      cell_size=0.1):
+        """Indexes the coordinates of the instances of cls
+
+        Args:
+            cls (type or str): the class, or its name
+            lat_attr (str): the name of the latitude attribute
+            lon_attr (str): the name of the longitude attribute
+            cell_size (float): the size of the cells of the grid, in
+                degrees, about the radius of the usual searches
+        """
+        class_name = self._class_name(cls)
+        indexes = self.__indexes.setdefault(class_name, {})
+        old = self.__geo.get(class_name)
+        if old is not None:
+            del indexes[old.attrs]
+        geo = GeoIndex(lat_attr, lon_attr, cell_size)
+        geo.rebuild(self.__classes.get(class_name, {}).items())
+        self.__geo[class_name] = indexes[geo.attrs] = geo
+
+    def __geo_index(self, cls):
+        """Returns the GeoIndex of cls, or a temporary one over a scan of
+        its instances"""
+        class_name = self._class_name(cls)
+        self.__hydrate(class_name)
+        geo = self.__geo.get(class_name)
+        if geo is None:
+            geo = GeoIndex()
+            geo.rebuild(self.__classes.get(class_name, {}).items())
+        return geo
+
+    def find_within(self, cls, lat, lon, radius):
+        """Returns the instances of cls at most radius km away from the
+        point (lat, lon), nearest first
+
+        The lookup uses the geospatial index of cls when there is one and
+        scans the instances of cls otherwise.
+
+        Return:
+            list: the matching instances
+        """
+        return [obj for _, obj in
+                self.__geo_index(cls).within_radius(lat, lon, radius)]
+
+    def find_in_box(self, cls, south, west, north, east):
+        """Returns the instances of cls whose coordinates are inside the
+        box, which goes east from west to east (across the antimeridian
+        when west > east)
+
+        Return:
+            list: the matching instances, in no particular order
+        """
+        return self.__geo_index(cls).within_box(south, west, north, east)
+
+    def find_nearest(self, cls, lat, lon, k=1):
+        """Returns the k instances of cls nearest to the point (lat, lon)
+
+        Return:
+            list: the instances, nearest first
+        """
+        return [obj for _, obj in self.__geo_index(cls).nearest(lat, lon, k)]
+
+    def columns(self, cls):
+        """Returns the ColumnStore of the instances of cls, which is kept
+        up to date from then on (see models.engine.columnar)"""
+        class_name = self._class_name(cls)
+        self.__hydrate(class_name)
+        columns = self.__columns.get(class_name)
+        if columns is None:
+            columns = ColumnStore(self.__classes.get(class_name, {}).items())
+            self.__columns[class_name] = \
+                self.__indexes.setdefault(class_name, {})[()] = columns
+        return columns
+
+    def aggregate(self, cls, func, attr=None, by=None):
+        """Computes func over the attribute attr of the instances of cls,
+        by group
+
+        Args:
+            cls (type or str): the class, or its name
+            func (str): count, sum, mean, min or max
+            attr (str): the attribute to aggregate, whose values that are
+                not numbers are left out; count() counts the instances
+                when there is none
+            by (str): the attribute to group the instances by
+
+        Return:
+            the result, or a dictionary of the results by value of by
+
+        Raises:
+            ValueError: when func is unknown, or needs attr
+        """
+        return self.columns(cls).aggregate(func, attr, by)
+
+    def __build(self, key, record, text=None):
+        """Turns the raw dictionary stored under key, whose JSON text may
+        already be known, into an instance"""
+        from models import classes
+
+        class_name = record['__class__']
+        obj = classes[class_name](**record)
         self.__objects[key] = obj
+        self.__classes.setdefault(class_name, {})[key] = obj
+        if text is not None:
+            self.__fragments[key] = text
+        elif key not in self.__fragments:
+            self.__fragments[key] = self.__codec.dumps(record)
+        return obj
+
+    def __hydrate(self, class_name):
+        """Builds the instances of every raw dictionary of class_name"""
+        records = self.__raw.pop(class_name, None)
+        if records:
+            with metrics.timer('storage.hydrate'):
+                for key, record in records.items():
+                    self.__build(key, record)
+                for index in self.__indexes.get(class_name, {}).values():
+                    index.rebuild(self.__classes.get(class_name,
+                                                     {}).items())
+            metrics.count('storage.objects_hydrated', len(records))
+
+    def __record(self, key, op):
+        # re-inserting keeps the journal in the order of the last change
+        self.__journal.pop(key, None)
+        self.__journal[key] = op
+
+    @timed('storage.encode')
+    def __encode_changes(self):
+        """Refreshes the cached JSON text of the objects in the journal
+
+        Return:
+            list: (op, key, JSON text or None) for every journal entry
+        """
+        changes = []
+        for key, op in self.__journal.items():
+            obj = self.__objects.get(key)
+            if op == 'put' and obj is not None:
+                text = self.__codec.dumps_instance(obj)
+                self.__fragments[key] = text
+                changes.append(('put', key, text))
+            else:
+                self.__fragments.pop(key, None)
+                changes.append(('delete', key, None))
+        self.__journal.clear()
+        metrics.count('storage.objects_encoded', len(changes))
+        return changes
+
+    def __entry(self, key, text):
+        """Returns the entry of the JSON file of the object text"""
+        return snapshot.entry(key, text, self.__codec, self.__format)
+
+    def __shard(self, key):
+        """Returns the shard of the object stored under key: its class name
+        in the sharded layout, None for the single file"""
+        return key.split('.', 1)[0] if self.__layout == 'sharded' else None
+
+    def __shard_path(self, shard):
+        """Returns the path of the file of shard"""
+        if shard is None:
+            return self.__file_path
+        return os.path.join(self.__shards_path, f'{shard}.json')
 
+    def __snapshot_entries(self, shard=None):
+        """Yields the key and the entry of the JSON file (see
+        models.engine.snapshot) of every object, or of every object of the
+        class shard"""
+        fragments = self.__fragments
+        entry = self.__entry
+        if shard is None:
+            objs, raws = self.__objects, self.__raw.values()
+        else:
+            objs = self.__classes.get(shard, {})
+            raws = (self.__raw.get(shard, {}),)
+        for key, obj in objs.items():
+            text = fragments.get(key)
+            if text is None:  # added to __objects without new()
+                text = fragments[key] = self.__codec.dumps_instance(obj)
+            yield key, entry(key, text)
+        for records in raws:
+            for key, record in records.items():
+                text = fragments.get(key)
+                if text is None:
+                    text = fragments[key] = self.__codec.dumps(record)
+                yield key, entry(key, text)
+        if shard is None and len(fragments) > self.count():
+            # objects removed without delete()
+            self.__fragments = {k: v for k, v in fragments.items()
+                                if k in self.__objects or
+                                k in self.__raw.get(k.split('.')[0], {})}
+
+    @contextmanager
+    def batch(self):
+        """Saves once at the end of the block instead of on every save()
+
+        A batch started inside another one is part of the outer batch.
+
+        Example:
+            with storage.batch():
+                for email in emails:
+                    user = User()
+                    user.email = email
+                    user.save()
+        """
+        if self.__undo is not None:
+            yield self
+            return
+        self.__undo = UndoLog()
+        journal = dict(self.__journal)
+        try:
+            yield self
+        except BaseException:
+            undo, self.__undo = self.__undo, None
+            undo.restore(self.__add, self.__remove)
+            self.__journal = journal
+            raise
+        self.__undo = None
+        self.save()
+
+    @timed('storage.save')
     def save(self):
-        """Serializes __objects to the JSON file (path: __file_path)"""
-        with open(self.__file_path, 'w', encoding='UTF-8') as file:
-            objs_dict = {k: v.to_dict() for k, v in self.__objects.items()}
-            json.dump(objs_dict, file)
+        """Serializes __objects to the JSON file (path: __file_path)
+
+        In snapshot mode only the serialization is incremental: the
+        objects changed since the last save are encoded again and the
+        others reuse their text, but the whole file (the file of each
+        changed class with the sharded layout) is still written, O(N)
+        I/O. In log mode a save only appends the changed objects.
+
+        The files changed on disk by another process since this storage
+        last read or wrote them are merged first (see refresh()), so the
+        changes of the other process are kept.
+
+        With async_save, the file is written by the background writer and
+        an error of a previous write is raised here or by flush().
+        """
+        if self.__undo is not None:  # saved at the end of the batch
+            return
+        if self.__mode == 'log':
+            changes = self.__encode_changes()
+            if not self.__async:
+                self.__write_log(changes)
+                return
+            self.__start_writer(self.__write_log)
+            self.__writer.submit(changes)
+            return
+        if self.__layout == 'single':
+            shards = {None}
+        else:  # only the classes of the changed objects
+            shards = {self.__shard(key) for key in self.__journal}
+        if not self.__async:
+            with self.__files_lock.hold():
+                for shard in shards:
+                    if self.__stamp(shard) != self.__stamps.get(shard):
+                        self.__merge(shard)  # before the journal is cleared
+                self.__encode_changes()
+                for shard in shards:
+                    self.__write_shard(shard, (
+                        entry for _, entry in self.__snapshot_entries(shard)))
+                    self.__stamps[shard] = self.__stamp(shard)
+            return
+        changes = self.__encode_changes()
+        self.__start_writer(self.__write_entries)
+        # the writer gets a copy of the entries of a shard once, then only
+        # the changes
+        fresh = shards - self.__mirrored
+        items = [(shard, None, dict(self.__snapshot_entries(shard)))
+                 for shard in fresh]
+        self.__mirrored |= fresh
+        for _, key, text in changes:
+            items.append((self.__shard(key), key, None if text is None
+                          else self.__entry(key, text)))
+        self.__writer.submit(items)
+
+    def __start_writer(self, write):
+        """Starts the background writer if it is not running"""
+        if self.__writer is None:
+            self.__writer = BackgroundWriter(write)
+            atexit.register(self.close)
 
-    def reload(self):
-        """Deserializes the structured JSON data set to instances"""
+    @timed('storage.write')
+    def __write_shard(self, shard, entries):
+        """Writes the file of shard made of entries"""
+        if shard is not None:
+            os.makedirs(self.__shards_path, exist_ok=True)
+        atomic_write(self.__shard_path(shard),
+                     snapshot.iter_text(entries, self.__format), self.__sync)
+        if metrics.enabled:
+            metrics.count('storage.bytes_written',
+                          self.__size(self.__shard_path(shard)))
+        # the snapshot now holds every change the log did
+        if shard is None and os.path.isfile(self.__log_path):
+            self.__sync.flush()
+            os.remove(self.__log_path)
+            self.__log_records = 0
+
+    def __write_entries(self, items):
+        """Applies the (shard, key, entry) items to the copy of the entries
+        and writes the shards they changed, in the background writer
+
+        An item with no key is a new copy of the entries of its shard, an
+        item with no entry is a deletion. When another process changed the
+        file of a shard, the copy is read again from the file before the
+        changes are applied, and the instances are marked as stale for
+        refresh().
+        """
+        changes = {}
+        written = self.__written
+        for shard, key, entry in items:
+            if key is None:
+                self.__entries[shard] = entry
+            else:
+                changes.setdefault(shard, {})[key] = entry
+        if self.__layout == 'single':
+            changes.setdefault(None, {})
+        with self.__files_lock.hold():
+            for shard, shard_changes in changes.items():
+                # the copy of a shard starts from the files the instances
+                # were read from, then from the last write
+                stale = self.__stamp(shard) != written.get(
+                    shard, self.__stamps.get(shard))
+                if stale:
+                    self.__entries[shard] = {
+                        key: self.__entry(key, text) if text is not None
+                        else self.__entry(key, self.__codec.dumps(record))
+                        for key, record, text in self.__read(shard)}
+                entries = self.__entries[shard]
+                for key, entry in shard_changes.items():
+                    if entry is None:
+                        entries.pop(key, None)
+                    else:
+                        entries[key] = entry
+                self.__write_shard(shard, entries.values())
+                written[shard] = self.__stamp(shard)
+                self.__stamps[shard] = None if stale else written[shard]
+
+    @timed('storage.write')
+    def __write_log(self, records):
+        """Appends records to the log and compacts it when it is long"""
+        with self.__lock, self.__files_lock.hold():
+            synced = self.__stamp(None) == self.__stamps.get(None)
+            size = self.__size(self.__log_path) if metrics.enabled else 0
+            self.__log_records += write_ahead_log.append(
+                self.__log_path, records, self.__codec, self.__sync)
+            if metrics.enabled:
+                metrics.count('storage.bytes_written',
+                              self.__size(self.__log_path) - size)
+            if synced:
+                self.__stamps[None] = self.__stamp(None)
+        if self.__log_records > self.__log_threshold:
+            self.compact(background=True)
+
+    def compact(self, background=False):
+        """Folds the log into a new JSON snapshot
+
+        The log is renamed before it is compacted so that saves made while
+        the compaction runs go to a fresh log.
+
+        Args:
+            background (bool): run the compaction in a separate thread
+        """
+        with self.__lock, self.__files_lock.hold():
+            if self.__compactor is not None and self.__compactor.is_alive():
+                return
+            if not os.path.isfile(self.__log_path):
+                return
+            synced = self.__stamp(None) == self.__stamps.get(None)
+            os.replace(self.__log_path, self.__compacting_path)
+            if synced:
+                self.__stamps[None] = self.__stamp(None)
+            self.__log_records = 0
+            self.__compactor = threading.Thread(target=self.__compact_log,
+                                                daemon=True)
+            self.__compactor.start()
+        if not background:
+            self.__compactor.join()
+
+    def __compact_log(self):
+        """Folds the renamed log into the JSON file"""
+        with self.__files_lock.hold():
+            synced = self.__stamp(None) == self.__stamps.get(None)
+            write_ahead_log.compact(self.__file_path, self.__compacting_path,
+                                    self.__codec, self.__sync, self.__format)
+            if synced:
+                self.__stamps[None] = self.__stamp(None)
+
+    def flush(self):
+        """Waits until the saves made so far are written to the disk"""
+        if self.__writer is not None:
+            self.__writer.flush()
+        self.__sync.flush()
+
+    def close(self):
+        """Flushes the saves and stops the background writer
+
+        The changes that were not saved are not written. A save made after
+        close() starts a new writer.
+        """
+        if self.__writer is not None:
+            writer, self.__writer = self.__writer, None
+            atexit.unregister(self.close)
+            writer.close()
+        if self.__compactor is not None:
+            self.__compactor.join()
+        self.__sync.flush()
+
+    @property
+    def __files_lock(self):
+        """The lock of the directory of the files (see
+        models.engine.locking)"""
+        if self.__layout == 'sharded':
+            return directory_lock(self.__shards_path)
+        return directory_lock(os.path.dirname(
+            os.path.abspath(self.__file_path)))
+
+    @staticmethod
+    def __stat(path):
+        """Returns what identifies the version of the file at path"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # a file replaced by a rename is a new inode
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    @classmethod
+    def __size(cls, *paths):
+        """Returns the number of bytes of the files at paths"""
+        return sum(stat[1] for stat in map(cls.__stat, paths) if stat)
+
+    def __shard_paths(self, shard):
+        """Returns the paths of the files of shard"""
+        if shard is None:
+            return self.__file_path, self.__compacting_path, self.__log_path
+        return (self.__shard_path(shard),)
+
+    def __stamp(self, shard):
+        """Returns what identifies the version of the files of shard"""
+        if shard is None:
+            return (self.__stat(self.__file_path),
+                    self.__stat(self.__compacting_path),
+                    self.__stat(self.__log_path))
+        return self.__stat(self.__shard_path(shard))
+
+    def __log_changes(self):
+        """Returns the changes of the logs by key, obj and its JSON text or
+        None when deleted, and the number of records"""
+        changes = {}
+        count = 0
+        for path in (self.__compacting_path, self.__log_path):
+            for op, key, obj, text in write_ahead_log.iter_records(
+                    path, self.__codec):
+                changes[key] = (obj, text) if op == 'put' else None
+                count += 1
+        return changes, count
+
+    def __read(self, shard, changes=None):
+        """Yields the key, the decoded dictionary and the JSON text (None
+        when unknown) of every object of shard stored on disk
+
+        In the single layout, the changes of the logs are applied to the
+        entries of the JSON file as they are read, their puts take the
+        place of the entries they replace.
+
+        Raises:
+            ValueError: when the JSON file is not valid
+        """
+        if changes is None:
+            changes = self.__log_changes()[0] if shard is None else {}
+        else:
+            changes = dict(changes)
+        for key, record, text in snapshot.iter_entries(
+                self.__shard_path(shard), self.__codec, self.__format):
+            if key in changes:
+                change = changes.pop(key)
+                if change is None:
+                    continue
+                record, text = change
+            yield key, record, text
+        for key, change in changes.items():
+            if change is not None:
+                yield key, change[0], change[1]
+
+    def __forget(self, key):
+        """Removes the object stored under key, built or not"""
+        self.__remove(key)
+        self.__raw.get(key.split('.', 1)[0], {}).pop(key, None)
+        self.__fragments.pop(key, None)
+
+    @timed('storage.merge')
+    def __merge(self, shard):
+        """Makes the objects of shard match the files, except the ones with
+        unsaved changes
+
+        An object is only built again when its JSON text on disk is not
+        the text this storage last read or wrote. The caller holds the lock
+        of the files.
+        """
+        stamp = self.__stamp(shard)
+        self.__related.clear()
+        if metrics.enabled:
+            metrics.count('storage.bytes_read',
+                          self.__size(*self.__shard_paths(shard)))
+        if shard is None:
+            keys = list(self.__objects)
+            for records in self.__raw.values():
+                keys.extend(records)
+        else:
+            keys = list(self.__classes.get(shard, {}))
+            keys.extend(self.__raw.get(shard, {}))
+            if self.__loaded is not None:
+                self.__loaded.add(shard)
+        seen = set()
+        try:
+            for key, record, text in self.__read(shard):
+                seen.add(key)
+                if key in self.__journal:  # the unsaved change wins
+                    continue
+                if text is not None and self.__fragments.get(key) == text \
+                        and self.exists(*key.split('.', 1)):
+                    continue
+                self.__forget(key)
+                obj = self.__load(key, record, text)
+                if obj is not None:
+                    for index in self.__indexes.get(obj.__class__.__name__,
+                                                    {}).values():
+                        index.add(key, obj)
+        except ValueError as error:  # saved again by the next save()
+            snapshot.quarantine(self.__shard_path(shard), error)
+            self.__stamps[shard] = self.__stamp(shard)
+            return
+        for key in keys:
+            if key not in seen and key not in self.__journal:
+                self.__forget(key)
+        self.__stamps[shard] = stamp
+
+    def __disk_shards(self):
+        """Returns the shards whose files refresh() checks"""
+        if self.__layout == 'single':
+            return [None]
+        shards = set(self.__stamps)
+        if os.path.isdir(self.__shards_path):
+            shards.update(name[:-len('.json')]
+                          for name in os.listdir(self.__shards_path)
+                          if name.endswith('.json'))
+        if self.__loaded is not None:
+            shards &= self.__loaded
+        return sorted(shards)
+
+    @timed('storage.refresh')
+    def refresh(self):
+        """Loads the changes saved by other processes since this storage
+        last read or wrote the files
+
+        Checking costs a stat() of the files. Only the objects whose JSON
+        text changed are built again, the objects with unsaved changes are
+        kept as they are, and nothing is loaded during a batch. The saves
+        of the background writer are only waited for when the files
+        changed, so that they are not replaced by the older objects of the
+        files.
+
+        Return:
+            bool: True if the files had changed
+        """
+        if self.__undo is not None:
+            return False
+        if not self.__changed_shards():
+            return False
+        if self.__writer is not None:
+            self.__writer.flush()
+        with self.__files_lock.hold(exclusive=False):
+            # the files written by the writer meanwhile are not changes
+            changed = self.__changed_shards()
+            for shard in changed:
+                self.__merge(shard)
+        return bool(changed)
+
+    def __changed_shards(self):
+        """Returns the shards whose files changed since this storage last
+        read or wrote them"""
+        return [shard for shard in self.__disk_shards()
+                if self.__stamp(shard) != self.__stamps.get(shard)]
+
+    @timed('storage.reload')
+    def reload(self, classes=None):
+        """Deserializes the structured JSON data set to instances
+
+        Args:
+            classes (iterable): the classes, or class names, to load, by
+                default every class; only in the sharded layout
+        """
+        if classes is not None:
+            if self.__layout != 'sharded':
+                raise ValueError('reload(classes) needs the sharded layout')
+            classes = {self._class_name(cls) for cls in classes}
+        if self.__writer is not None:
+            self.__writer.flush()
+        if self.__compactor is not None:
+            self.__compactor.join()
+        # a compaction interrupted by a crash is finished before loading
+        if os.path.isfile(self.__compacting_path):
+            with self.__files_lock.hold():
+                self.__compact_log()
+        # and a record torn by a crash is cut from the log, so that the
+        # next appends do not extend it
+        if os.path.isfile(self.__log_path):
+            with self.__files_lock.hold():
+                write_ahead_log.repair(self.__log_path, self.__sync)
+        with self.__files_lock.hold(exclusive=False):
+            self.__reload(classes)
+
+    def __reload(self, classes):
+        changes = {}
+        if self.__layout == 'single':
+            if not os.path.isfile(self.__file_path) and \
+                    not os.path.isfile(self.__log_path):
+                self.__stamps[None] = self.__stamp(None)
+                return
+            shards = [None]
+            changes, self.__log_records = self.__log_changes()
+        else:
+            if not os.path.isdir(self.__shards_path):
+                return
+            shards = [name[:-len('.json')]
+                      for name in sorted(os.listdir(self.__shards_path))
+                      if name.endswith('.json') and
+                      (classes is None or name[:-len('.json')] in classes)]
+        self.__objects = {}
+        self.__classes = {}
+        self.__raw = {}
+        self.__journal = {}
+        self.__fragments = {}
+        self.__related = {}
+        self.__rendered = RenderCache()
+        self.__entries = {}
+        self.__mirrored = set()
+        self.__stamps = {}
+        self.__written = {}
+        self.__loaded = classes
+        for shard in shards:
+            stamp = self.__stamp(shard)
+            try:
+                for key, record, text in self.__read(shard, changes):
+                    self.__load(key, record, text)
+            except ValueError as error:  # the objects read are dropped
+                snapshot.quarantine(self.__shard_path(shard), error)
+                self.__reload(classes)
+                return
+            self.__stamps[shard] = stamp
+            if metrics.enabled:
+                metrics.count('storage.bytes_read',
+                              self.__size(*self.__shard_paths(shard)))
+        if metrics.enabled:
+            metrics.count('storage.objects_loaded', self.count())
+        for class_name, indexes in self.__indexes.items():
+            for index in indexes.values():
+                index.rebuild(self.__classes.get(class_name, {}).items())
+
+    def __load(self, key, record, text=None):
+        """Builds, or keeps in __raw when lazy, the object read from the
+        files and returns the instance, if it was built"""
         from models import classes
-        from os.path import isfile
-
-        if isfile(self.__file_path):
-            with open(self.__file_path, 'r', encoding='UTF-8') as file:
-                try:
-                    objs_dict = json.load(file)
-                    # convert dictionary to instance and update self.__objects
-                    self.__objects = {}
-                    for k, v in objs_dict.items():
-                        class_name = v['__class__']
-                        if class_name in classes:
-                            self.__objects[k] = classes[class_name](**v)
-                except json.JSONDecodeError:  # file is not in JSON format
-                    pass
+
+        class_name = record['__class__']
+        if class_name not in classes:
+            return None
+        if self.__lazy:
+            self.__raw.setdefault(class_name, {})[key] = record
+            if text is not None:
+                self.__fragments[key] = text
+            return None
+        return self.__build(key, record, text)
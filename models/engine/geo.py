@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""A module that defines the geospatial index kept by the storage engines
+
+A GeoIndex buckets the instances of a class by the cell of a grid of
+cell_size degrees their latitude and longitude fall in, so that the places
+near a point are found by looking at the few cells around it instead of
+computing the distance to every place:
+    within_radius(): the instances at most radius km away, nearest first
+    within_box(): the instances inside a latitude/longitude box
+    nearest(): the k nearest instances
+Distances are great-circle distances (haversine) in kilometers. When NumPy
+is installed, the distances of large sets of candidates are computed in
+one vectorized pass.
+
+Only the instances that set both coordinates themselves are indexed. The
+places left at the class defaults, latitude 0.0 and longitude 0.0, are
+never indexed, so Place.near(0, 0, r) and nearest() skip them; a place
+set to 0.0 and 0.0 explicitly is indexed like any other.
+
+Example:
+    >>> index = GeoIndex()
+    >>> index.rebuild(storage.all(Place).items())
+    >>> [place.name for _, place in index.within_radius(37.77, -122.41, 5)]
+"""
+from math import asin, ceil, cos, degrees, isfinite, pi, radians, sin, sqrt
+
+try:
+    import numpy
+except ImportError:  # optional, the distances are computed one by one
+    numpy = None
+
+# coordinates indexed by default, (latitude, longitude) by class name
+DEFAULT_GEO_INDEXES = {'Place': ('latitude', 'longitude')}
+
+EARTH_RADIUS = 6371.0088  # mean radius, in km
+
+# number of candidates from which the distances are computed with NumPy
+NUMPY_THRESHOLD = 1024
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points, in km"""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    a = sin((phi2 - phi1) / 2) ** 2 + \
+        cos(phi1) * cos(phi2) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def _distances(lat, lon, points):
+    """Returns the distances from (lat, lon) to the (lat, lon) points"""
+    if numpy is None or len(points) < NUMPY_THRESHOLD:
+        return [distance(lat, lon, plat, plon) for plat, plon in points]
+    coords = numpy.radians(numpy.array(points, dtype=float))
+    phi, lam = radians(lat), radians(lon)
+    a = numpy.sin((coords[:, 0] - phi) / 2) ** 2 + cos(phi) * \
+        numpy.cos(coords[:, 0]) * numpy.sin((coords[:, 1] - lam) / 2) ** 2
+    return (2 * EARTH_RADIUS *
+            numpy.arcsin(numpy.minimum(1.0, numpy.sqrt(a)))).tolist()
+
+
+def _point(lat, lon):
+    """Returns (lat, lon) if they are valid coordinates, None otherwise"""
+    for value in (lat, lon):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) \
+                or not isfinite(value):
+            return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return float(lat), float(lon)
+    return None
+
+
+def _wrap(lon):
+    """Returns lon brought back to [-180, 180)"""
+    return (lon + 180) % 360 - 180
+
+
+class GeoIndex:
+    """A grid index over the latitude and longitude of instances
+
+    Instances that do not set their coordinates (the 0.0 defaults of the
+    class are no location), or whose coordinates are not numbers within
+    [-90, 90] and [-180, 180], are not indexed.
+
+    Attributes:
+        attrs (tuple): the names of the latitude and longitude attributes
+        cell_size (float): the size of the cells of the grid, in degrees
+
+    Methods:
+        add(key, obj, **values): indexes obj at its coordinates, or at the
+            coordinates in values, by attribute name
+        discard(key): removes the object stored under key
+        rebuild(items): indexes the (key, obj) items from scratch
+        within_box(south, west, north, east): returns the objects in a box
+        within_radius(lat, lon, radius): returns the (distance, obj) of
+            the objects at most radius km away, nearest first
+        nearest(lat, lon, k): returns the (distance, obj) of the k nearest
+            objects, nearest first
+    """
+
+    def __init__(self, lat_attr='latitude', lon_attr='longitude',
+                 cell_size=0.1):
+        self.attrs = (lat_attr, lon_attr)
+        self.cell_size = cell_size
+        self.__rows = ceil(180 / cell_size)
+        self.__columns = ceil(360 / cell_size)
+        self.__cells = {}  # (row, column) -> {<obj class name>.id: point}
+        self.__points = {}  # <obj class name>.id -> (lat, lon)
+        self.__objects = {}  # <obj class name>.id -> obj
+
+    def __len__(self):
+        return len(self.__points)
+
+    def __row(self, lat):
+        return min(int((lat + 90) // self.cell_size), self.__rows - 1)
+
+    def __column(self, lon):
+        return min(int((lon + 180) // self.cell_size), self.__columns - 1)
+
+    def add(self, key, obj, **values):
+        """Indexes obj at its coordinates; values overrides some of them
+        by attribute name, for the values about to be set"""
+        self.discard(key)
+        lat_attr, lon_attr = self.attrs
+        attrs = obj.__dict__
+        point = _point(values[lat_attr] if lat_attr in values
+                       else attrs.get(lat_attr),
+                       values[lon_attr] if lon_attr in values
+                       else attrs.get(lon_attr))
+        if point is None:
+            return
+        self.__points[key] = point
+        self.__objects[key] = obj
+        cell = (self.__row(point[0]), self.__column(point[1]))
+        self.__cells.setdefault(cell, {})[key] = point
+
+    def rebuild(self, items):
+        """Replaces the content of the index with the (key, obj) items"""
+        self.clear()
+        lat_attr, lon_attr = self.attrs
+        points, objects, cells = self.__points, self.__objects, self.__cells
+        row, column = self.__row, self.__column
+        for key, obj in items:
+            attrs = obj.__dict__
+            point = _point(attrs.get(lat_attr), attrs.get(lon_attr))
+            if point is None:
+                continue
+            points[key] = point
+            objects[key] = obj
+            cell = (row(point[0]), column(point[1]))
+            bucket = cells.get(cell)
+            if bucket is None:
+                bucket = cells[cell] = {}
+            bucket[key] = point
+
+    def discard(self, key):
+        """Removes the object stored under key from the index"""
+        point = self.__points.pop(key, None)
+        if point is None:
+            return
+        del self.__objects[key]
+        cell = (self.__row(point[0]), self.__column(point[1]))
+        bucket = self.__cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.__cells[cell]
+
+    def clear(self):
+        """Removes every object from the index"""
+        self.__cells.clear()
+        self.__points.clear()
+        self.__objects.clear()
+
+    def __column_ranges(self, west, east):
+        """Returns the (first, last) column ranges from west to east"""
+        first, last = self.__column(west), self.__column(east)
+        if west > east:  # across the antimeridian
+            return [(first, self.__columns - 1), (0, last)]
+        return [(first, last)]
+
+    def __candidates(self, south, west, north, east):
+        """Yields the (key, point) of the cells overlapping the box"""
+        first_row, last_row = self.__row(south), self.__row(north)
+        ranges = self.__column_ranges(west, east)
+        cells = (last_row - first_row + 1) * \
+            sum(last - first + 1 for first, last in ranges)
+        if cells > len(self.__cells):  # fewer cells hold objects
+            for (row, column), bucket in self.__cells.items():
+                if first_row <= row <= last_row and \
+                        any(first <= column <= last
+                            for first, last in ranges):
+                    yield from bucket.items()
+            return
+        for row in range(first_row, last_row + 1):
+            for first, last in ranges:
+                for column in range(first, last + 1):
+                    bucket = self.__cells.get((row, column))
+                    if bucket:
+                        yield from bucket.items()
+
+    def within_box(self, south, west, north, east):
+        """Returns the objects inside the box, which goes east from west
+        to east (across the antimeridian when west > east)
+
+        Args:
+            south (float): the lowest latitude
+            west (float): the western longitude
+            north (float): the highest latitude
+            east (float): the eastern longitude
+
+        Return:
+            list: the objects in the box, in no particular order
+        """
+        if west <= east:
+            def inside(lon):
+                return west <= lon <= east
+        else:
+            def inside(lon):
+                return lon >= west or lon <= east
+        return [self.__objects[key]
+                for key, (lat, lon) in self.__candidates(south, west,
+                                                         north, east)
+                if south <= lat <= north and inside(lon)]
+
+    def within_radius(self, lat, lon, radius):
+        """Returns the objects at most radius km away from (lat, lon)
+
+        Return:
+            list: the (distance in km, obj) pairs, nearest first
+        """
+        angle = radius / EARTH_RADIUS
+        south, north = lat - degrees(angle), lat + degrees(angle)
+        if south <= -90 or north >= 90 or angle >= pi / 2 or \
+                sin(angle) >= cos(radians(lat)):
+            west, east = -180, 180  # the circle holds a pole
+        else:
+            spread = degrees(asin(sin(angle) / cos(radians(lat))))
+            west, east = _wrap(lon - spread), _wrap(lon + spread)
+        candidates = list(self.__candidates(max(south, -90), west,
+                                            min(north, 90), east))
+        distances = _distances(lat, lon, [point for _, point in candidates])
+        found = [(dist, key) for dist, (key, _) in zip(distances,
+                                                       candidates)
+                 if dist <= radius]
+        found.sort()
+        return [(dist, self.__objects[key]) for dist, key in found]
+
+    def nearest(self, lat, lon, k=1):
+        """Returns the k objects nearest to (lat, lon)
+
+        Return:
+            list: the (distance in km, obj) pairs, nearest first
+        """
+        if k <= 0 or not self.__points:
+            return []
+        radius = self.cell_size * pi / 180 * EARTH_RADIUS
+        while True:
+            found = self.within_radius(lat, lon, radius)
+            if len(found) >= k or radius >= pi * EARTH_RADIUS:
+                return found[:k]
+            radius *= 4
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""A module that defines the secondary indexes kept by the storage engines
+
+An index maps the value of one attribute of the instances of one class to
+the instances holding that value, so that looking up, for instance, all the
+cities of a state costs O(k) for the k cities instead of a scan of every
+stored object.
+
+A member index maps each item of one list attribute (Place.amenity_ids)
+to the instances whose list holds it, so that the places of an amenity
+also cost O(k).
+
+A sorted index keeps the values of one attribute in sorted arrays, so that
+it also answers range queries (places under a price, objects updated since
+a date) in O(log N + k) with bisect. Updating the value of one object costs
+O(log N) comparisons and the move of the items after it in the arrays.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from operator import itemgetter
+
+# attributes indexed by default, by class name; the list attributes get a
+# MemberIndex
+DEFAULT_INDEXES = {'City': ('state_id',),
+                   'Place': ('city_id', 'user_id', 'amenity_ids'),
+                   'Review': ('place_id', 'user_id'),
+                   'User': ('email',),
+                   }
+
+# attributes indexed in order by default, by class name; the ids give the
+# order of the pages of the console's all command
+DEFAULT_SORTED_INDEXES = {'Amenity': ('id',),
+                          'BaseModel': ('id',),
+                          'City': ('id',),
+                          'Place': ('price_by_night', 'number_rooms',
+                                    'max_guest', 'latitude', 'longitude',
+                                    'updated_at', 'id'),
+                          'Review': ('id',),
+                          'State': ('id',),
+                          'User': ('id',),
+                          }
+
+_CURRENT = object()  # index an object under its current attribute value
+
+
+class AttributeIndex:
+    """An equality index over one attribute
+
+    Attributes:
+        attr (str): the name of the indexed attribute
+
+    Methods:
+        add(key, obj, value): indexes obj under value, replacing the value
+            it was indexed under before
+        discard(key): removes the object stored under key
+        rebuild(items): indexes the (key, obj) items from scratch
+        find(value): returns the objects whose attribute equals value
+    """
+
+    def __init__(self, attr):
+        self.attr = attr
+        self.__buckets = {}  # value -> {<obj class name>.id: obj}
+        self.__values = {}  # <obj class name>.id -> value
+
+    def __len__(self):
+        return len(self.__values)
+
+    def add(self, key, obj, value=_CURRENT):
+        """Indexes obj under value, by default its current attribute"""
+        if value is _CURRENT:
+            value = getattr(obj, self.attr, None)
+        self.discard(key)
+        try:
+            self.__buckets.setdefault(value, {})[key] = obj
+        except TypeError:  # unhashable values are not indexed
+            return
+        self.__values[key] = value
+
+    def rebuild(self, items):
+        """Replaces the content of the index with the (key, obj) items"""
+        self.clear()
+        attr = self.attr
+        buckets = self.__buckets
+        values = self.__values
+        for key, obj in items:
+            value = getattr(obj, attr, None)
+            try:
+                bucket = buckets.get(value)
+                if bucket is None:
+                    bucket = buckets[value] = {}
+            except TypeError:  # unhashable values are not indexed
+                continue
+            bucket[key] = obj
+            values[key] = value
+
+    def discard(self, key):
+        """Removes the object stored under key from the index"""
+        if key in self.__values:
+            value = self.__values.pop(key)
+            bucket = self.__buckets[value]
+            del bucket[key]
+            if not bucket:
+                del self.__buckets[value]
+
+    def find(self, value):
+        """Returns the list of objects indexed under value"""
+        try:
+            return list(self.__buckets.get(value, {}).values())
+        except TypeError:
+            return []
+
+    def clear(self):
+        """Removes every object from the index"""
+        self.__buckets.clear()
+        self.__values.clear()
+
+
+class MemberIndex:
+    """An index over the items of one list attribute
+
+    Attributes:
+        attr (str): the name of the indexed attribute
+
+    Methods:
+        add(key, obj, value): indexes obj under the items of value,
+            replacing the items it was indexed under before
+        discard(key): removes the object stored under key
+        rebuild(items): indexes the (key, obj) items from scratch
+        find(item): returns the objects whose list holds item
+    """
+
+    def __init__(self, attr):
+        self.attr = attr
+        self.__buckets = {}  # item -> {<obj class name>.id: obj}
+        self.__items = {}  # <obj class name>.id -> items
+
+    def __len__(self):
+        return len(self.__items)
+
+    def add(self, key, obj, value=_CURRENT):
+        """Indexes obj under the items of value, by default its current
+        attribute; values that are not lists are not indexed"""
+        if value is _CURRENT:
+            value = getattr(obj, self.attr, None)
+        self.discard(key)
+        if not isinstance(value, (list, tuple)):
+            return
+        items = []
+        for item in value:
+            try:
+                self.__buckets.setdefault(item, {})[key] = obj
+            except TypeError:  # unhashable items are not indexed
+                continue
+            items.append(item)
+        self.__items[key] = items
+
+    def rebuild(self, items):
+        """Replaces the content of the index with the (key, obj) items"""
+        self.clear()
+        attr = self.attr
+        buckets = self.__buckets
+        members = self.__items
+        for key, obj in items:
+            value = getattr(obj, attr, None)
+            if not isinstance(value, (list, tuple)):
+                continue
+            indexed = []
+            for item in value:
+                try:
+                    bucket = buckets.get(item)
+                    if bucket is None:
+                        bucket = buckets[item] = {}
+                except TypeError:  # unhashable items are not indexed
+                    continue
+                bucket[key] = obj
+                indexed.append(item)
+            members[key] = indexed
+
+    def discard(self, key):
+        """Removes the object stored under key from the index"""
+        for item in self.__items.pop(key, ()):
+            bucket = self.__buckets.get(item)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.__buckets[item]
+
+    def find(self, item):
+        """Returns the list of objects whose list holds item"""
+        try:
+            return list(self.__buckets.get(item, {}).values())
+        except TypeError:
+            return []
+
+    def clear(self):
+        """Removes every object from the index"""
+        self.__buckets.clear()
+        self.__items.clear()
+
+
+def _family(value):
+    """Returns the family of the values that value can be compared with,
+    or None if it cannot be sorted"""
+    if isinstance(value, (int, float)):
+        return None if value != value else 0  # NaN is not sortable
+    if isinstance(value, str):
+        return 1
+    if isinstance(value, datetime):
+        return 2 if value.tzinfo is None else 3
+    return None
+
+
+# the family of the values of the most common types, see _family()
+_FAMILIES = {int: 0, float: 0, str: 1}
+
+
+class SortedIndex:
+    """An index over one attribute kept in order, for equality and range
+    lookups
+
+    The values are kept in one sorted array per family of comparable
+    values (numbers, strings, dates), with the keys in a parallel array.
+    Values that cannot be sorted (None, lists...) are only found by
+    find(), with a scan of the objects holding such values.
+
+    Attributes:
+        attr (str): the name of the indexed attribute
+
+    Methods:
+        add(key, obj, value): indexes obj under value, replacing the value
+            it was indexed under before
+        discard(key): removes the object stored under key
+        rebuild(items): indexes the (key, obj) items from scratch
+        find(value): returns the objects whose attribute equals value
+        range(low, high, include_low, include_high, reverse, limit):
+            returns the objects whose attribute is between low and high,
+            in order
+    """
+
+    def __init__(self, attr):
+        self.attr = attr
+        self.__arrays = {}  # family -> ([value...], [key...])
+        self.__values = {}  # <obj class name>.id -> value
+        self.__objects = {}  # <obj class name>.id -> obj
+        self.__others = {}  # <obj class name>.id -> unsortable value
+
+    def __len__(self):
+        return len(self.__values)
+
+    def add(self, key, obj, value=_CURRENT):
+        """Indexes obj under value, by default its current attribute"""
+        if value is _CURRENT:
+            value = getattr(obj, self.attr, None)
+        self.discard(key)
+        self.__values[key] = value
+        self.__objects[key] = obj
+        family = _family(value)
+        if family is None:
+            self.__others[key] = value
+            return
+        values, keys = self.__arrays.setdefault(family, ([], []))
+        i = bisect_right(values, value)
+        values.insert(i, value)
+        keys.insert(i, key)
+
+    def rebuild(self, items):
+        """Replaces the content of the index with the (key, obj) items"""
+        self.clear()
+        attr = self.attr
+        values, objects, others = self.__values, self.__objects, self.__others
+        pairs = {}
+        for key, obj in items:
+            value = getattr(obj, attr, None)
+            values[key] = value
+            objects[key] = obj
+            family = _FAMILIES.get(value.__class__)
+            if family is None or value != value:  # other types, NaN
+                family = _family(value)
+                if family is None:
+                    others[key] = value
+                    continue
+            entries = pairs.get(family)
+            if entries is None:
+                entries = pairs[family] = []
+            entries.append((value, key))
+        for family, entries in pairs.items():
+            # equal values stay in the order of items, like with add()
+            entries.sort(key=itemgetter(0))
+            self.__arrays[family] = ([value for value, _ in entries],
+                                     [key for _, key in entries])
+
+    def discard(self, key):
+        """Removes the object stored under key from the index"""
+        if key not in self.__values:
+            return
+        value = self.__values.pop(key)
+        del self.__objects[key]
+        if key in self.__others:
+            del self.__others[key]
+            return
+        values, keys = self.__arrays[_family(value)]
+        i = keys.index(key, bisect_left(values, value),
+                       bisect_right(values, value))
+        del values[i]
+        del keys[i]
+
+    def find(self, value):
+        """Returns the list of objects indexed under value"""
+        if _family(value) is None:
+            return [self.__objects[key]
+                    for key, other in self.__others.items()
+                    if other == value]
+        return self.range(value, value)
+
+    def range(self, low=None, high=None, include_low=True,
+              include_high=True, reverse=False, limit=None):
+        """Returns the objects whose attribute is between low and high, in
+        the order of the attribute
+
+        Args:
+            low: the lowest value, None for no lower bound
+            high: the highest value, None for no upper bound
+            include_low (bool): whether low itself is in the range
+            include_high (bool): whether high itself is in the range
+            reverse (bool): return the highest values first
+            limit (int): return the first limit objects only
+
+        Return:
+            list: the matching objects, sorted; every object whose value
+            can be sorted, family by family, when there is no bound
+        """
+        families = {_family(bound) for bound in (low, high)
+                    if bound is not None}
+        if not families:
+            families = sorted(self.__arrays, reverse=reverse)
+        elif len(families) > 1 or None in families:
+            return []  # bounds that cannot be compared match nothing
+        found = []
+        for family in families:
+            if limit is not None and len(found) >= limit:
+                break
+            values, keys = self.__arrays.get(family, ((), ()))
+            start, stop = 0, len(values)
+            if low is not None:
+                start = (bisect_left if include_low else bisect_right)(
+                    values, low)
+            if high is not None:
+                stop = (bisect_right if include_high else bisect_left)(
+                    values, high)
+            if limit is not None:
+                if reverse:
+                    start = max(start, stop - (limit - len(found)))
+                else:
+                    stop = min(stop, start + limit - len(found))
+            selected = keys[start:stop]
+            if reverse:
+                selected.reverse()
+            found.extend(self.__objects[key] for key in selected)
+        return found
+
+    def clear(self):
+        """Removes every object from the index"""
+        self.__arrays.clear()
+        self.__values.clear()
+        self.__objects.clear()
+        self.__others.clear()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Advisory locks that let several processes share the storage files
+
+FileStorage holds the lock of the directory of its files while it writes
+them (exclusive) or reads them (shared), with fcntl.flock(), so a process
+never reads a half-replaced set of files and two processes never write
+at the same time. The directory is locked instead of the files because
+the files are replaced by a rename at every save.
+
+flock() locks belong to an open file, so two locks of the same process
+on the same directory would wait for each other: there is a single
+DirectoryLock per directory in a process, it is reentrant and its threads
+take turns. A nested acquire keeps the mode of the outermost one.
+
+FileStorage also keeps the modification time, size and inode of the
+files its instances reflect. When another process wrote them since, a
+save first merges their objects (the objects changed here and not saved
+yet win, the others are replaced, added or removed like on disk), so it
+never overwrites the saves of the other process, and storage.refresh()
+does the same merge on demand; the console calls it before every command.
+
+On systems without fcntl (Windows), the locks only synchronize the
+threads of the process.
+
+Example:
+    >>> with directory_lock('storage').hold():
+    ...     pass  # no other process reads or writes the files of storage
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class DirectoryLock:
+    """A reentrant advisory lock on a directory
+
+    Methods:
+        acquire(exclusive): waits for the lock
+        release(): releases the lock
+        hold(exclusive): context manager of acquire() and release()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__rlock = threading.RLock()
+        self.__depth = 0
+        self.__fd = None
+
+    def __repr__(self):
+        return f'<DirectoryLock {self.path}>'
+
+    def acquire(self, exclusive=True):
+        """Waits until the lock is held by the calling thread
+
+        Args:
+            exclusive (bool): False lets other processes hold the lock in
+                shared mode too, for reading
+        """
+        self.__rlock.acquire()
+        if self.__depth == 0 and fcntl is not None:
+            os.makedirs(self.path, exist_ok=True)
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive
+                            else fcntl.LOCK_SH)
+            except BaseException:
+                os.close(fd)
+                self.__rlock.release()
+                raise
+            self.__fd = fd
+        self.__depth += 1
+
+    def release(self):
+        """Releases the lock held by the calling thread"""
+        self.__depth -= 1
+        if self.__depth == 0 and self.__fd is not None:
+            fd, self.__fd = self.__fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.__rlock.release()
+
+    @contextmanager
+    def hold(self, exclusive=True):
+        """Holds the lock for the block"""
+        self.acquire(exclusive)
+        try:
+            yield self
+        finally:
+            self.release()
+
+
+def directory_lock(path):
+    """Returns the DirectoryLock of the directory at path, the same one for
+    every caller of the process"""
+    path = os.path.abspath(path)
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = DirectoryLock(path)
+        return lock
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""Counters and latency histograms of the storage and the console
+
+FileStorage and HBNBCommand record in `registry` how often their
+operations run, how long they take and how many objects and bytes they
+move:
+    storage.save, storage.encode, storage.write, storage.reload,
+    storage.refresh, storage.merge, storage.hydrate, storage.new_many:
+    latencies
+    storage.objects_encoded, storage.objects_loaded,
+    storage.objects_hydrated, storage.objects_added, storage.bytes_written,
+    storage.bytes_read: counters
+    console.<command>, console.parse_line: latencies
+Recording is off by default, and then an instrumented operation only
+costs a check of `registry.enabled`. models/__init__.py turns it on when
+the HBNB_METRICS environment variable is set, the `stats` console command
+prints what was recorded.
+
+profile() runs a single function under cProfile or tracemalloc and
+returns the report of where its time or its memory went (the `profile`
+console command).
+
+Example:
+    >>> registry.enable()
+    >>> with registry.timer('storage.save'):
+    ...     storage.save()
+    >>> registry.count('storage.bytes_written', 512)
+    >>> registry.snapshot()['counters']
+    {'storage.bytes_written': 512}
+"""
+
+import atexit
+import io
+import json
+import sys
+import threading
+from functools import wraps
+from math import frexp
+from time import perf_counter
+
+# a power of two is split into 2 ** _SUB_BITS buckets, so a percentile
+# is at most 1 / 2 ** _SUB_BITS (12.5%) above the real one
+_SUB_BITS = 3
+_SUBS = 1 << _SUB_BITS
+
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram:
+    """The distribution of the durations of an operation
+
+    The durations are counted in buckets of exponentially growing sizes,
+    so the memory used does not depend on the number of durations and the
+    percentiles are estimated within 12.5%.
+
+    Attributes:
+        count (int): number of durations
+        total (float): sum of the durations, in seconds
+        min (float): shortest duration, in seconds
+        max (float): longest duration, in seconds
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.__buckets = {}  # bucket number -> number of durations
+
+    def observe(self, seconds):
+        """Counts a duration"""
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        mantissa, exponent = frexp(seconds)  # mantissa in [0.5, 1)
+        bucket = (exponent << _SUB_BITS) + int((mantissa - 0.5) * 2 * _SUBS)
+        self.__buckets[bucket] = self.__buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the percentile
+        percent of the durations, in seconds, None when there is none"""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.__buckets):
+            seen += self.__buckets[bucket]
+            if seen >= rank:
+                exponent, sub = divmod(bucket, _SUBS)
+                bound = 2.0 ** exponent * (0.5 + (sub + 1) / (2 * _SUBS))
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def snapshot(self):
+        """Returns the statistics of the durations, in milliseconds"""
+        if not self.count:
+            return {'count': 0}
+        stats = {'count': self.count,
+                 'total': self.total * 1000,
+                 'mean': self.total / self.count * 1000,
+                 'min': self.min * 1000}
+        for percent in PERCENTILES:
+            stats[f'p{percent}'] = self.percentile(percent) * 1000
+        stats['max'] = self.max * 1000
+        return stats
+
+
+class _Timer:
+    """Observes the duration of a with block in a histogram"""
+
+    __slots__ = ('__metrics', '__name', '__start')
+
+    def __init__(self, metrics, name):
+        self.__metrics = metrics
+        self.__name = name
+
+    def __enter__(self):
+        self.__start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__metrics.observe(self.__name, perf_counter() - self.__start)
+
+
+class _NullTimer:
+    """The timer of a disabled registry, which does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """A registry of counters and latency histograms by name
+
+    Attributes:
+        enabled (bool): whether count(), observe() and timer() record
+            anything, checked by the instrumented code before it measures
+
+    Methods:
+        enable(dump): starts recording
+        disable(): stops recording, keeps what was recorded
+        count(name, n): adds n to the counter name
+        observe(name, seconds): adds a duration to the histogram name
+        timer(name): a context manager observing its duration
+        reset(): forgets everything recorded
+        snapshot(): returns the counters and latency statistics
+        report(): returns the snapshot as a text table
+        dump(path): writes the snapshot as JSON to path
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.__lock = threading.Lock()  # the writer thread records too
+        self.__counters = {}
+        self.__histograms = {}
+
+    def enable(self, dump=None):
+        """Starts recording
+
+        Args:
+            dump (str): a file to write the snapshot to at exit, as JSON,
+                or '-' to print the report to stderr at exit
+        """
+        self.enabled = True
+        if dump:
+            atexit.register(self.dump, dump)
+
+    def disable(self):
+        """Stops recording, what was recorded is kept"""
+        self.enabled = False
+
+    def count(self, name, n=1):
+        """Adds n to the counter name"""
+        if self.enabled:
+            with self.__lock:
+                self.__counters[name] = self.__counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        """Adds a duration, in seconds, to the histogram name"""
+        if self.enabled:
+            with self.__lock:
+                histogram = self.__histograms.get(name)
+                if histogram is None:
+                    histogram = self.__histograms[name] = Histogram()
+                histogram.observe(seconds)
+
+    def timer(self, name):
+        """Returns a context manager observing the duration of its block
+        in the histogram name"""
+        if self.enabled:
+            return _Timer(self, name)
+        return _NULL_TIMER
+
+    def reset(self):
+        """Forgets every counter and histogram"""
+        with self.__lock:
+            self.__counters = {}
+            self.__histograms = {}
+
+    def snapshot(self):
+        """Returns the counters and the latency statistics, in
+        milliseconds, by name"""
+        with self.__lock:
+            return {'counters': dict(sorted(self.__counters.items())),
+                    'latency_ms': {name: histogram.snapshot()
+                                   for name, histogram
+                                   in sorted(self.__histograms.items())}}
+
+    def report(self):
+        """Returns the snapshot as a text table"""
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot['latency_ms']:
+            columns = ['count', 'mean', 'p50', 'p90', 'p99', 'max']
+            lines.append(f'{"operation (ms)":<24}' + ''.join(
+                f'{column:>10}' for column in columns))
+            for name, stats in snapshot['latency_ms'].items():
+                lines.append(f'{name:<24}{stats["count"]:>10}' + ''.join(
+                    f'{stats[column]:>10.3f}' for column in columns[1:]))
+        if snapshot['counters']:
+            if lines:
+                lines.append('')
+            lines.extend(f'{name:<24}{value:>10}'
+                         for name, value in snapshot['counters'].items())
+        return '\n'.join(lines) or 'no metrics recorded'
+
+    def dump(self, path):
+        """Writes the snapshot as JSON to the file path, or the report to
+        stderr when path is '-'"""
+        if path == '-':
+            print(self.report(), file=sys.stderr)
+            return
+        with open(path, 'w', encoding='UTF-8') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+
+registry = Metrics()
+
+
+def timed(name):
+    """Decorates a function to observe its duration in the histogram
+    name of the registry when it is enabled"""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                registry.observe(name, perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def profile(function, mode='cpu', limit=20):
+    """Runs function() under a profiler
+
+    Args:
+        function (callable): the function to run, without arguments
+        mode (str): 'cpu' for the functions it spent its time in
+            (cProfile), 'memory' for the lines that allocated the memory
+            it kept and its peak (tracemalloc)
+        limit (int): number of functions or lines reported
+
+    Return:
+        tuple: the result of function() and the report of the profiler
+
+    Raises:
+        ValueError: when mode is unknown
+    """
+    if mode == 'cpu':
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        result = profiler.runcall(function)
+        text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=text)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return result, text.getvalue().strip('\n')
+    if mode == 'memory':
+        import tracemalloc
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        try:
+            result = function()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+        # without the allocations of the profiling itself
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, __file__)]
+        after = after.filter_traces(ignored)
+        before = before.filter_traces(ignored)
+        lines = [f'peak {peak / 1024:.1f} KiB']
+        lines.extend(str(stat) for stat in
+                     after.compare_to(before, 'lineno')[:limit])
+        return result, '\n'.join(lines)
+    raise ValueError(f'unknown profile mode: {mode}')
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Converts the files of FileStorage between its layouts
+
+The single layout keeps every object in file.json, the sharded layout
+keeps the objects of each class in storage/<class name>.json (see
+FileStorage). The entries are copied as they are, without building the
+instances, and the files of the new layout are written atomically. The
+files of the old layout are kept unless --remove is given.
+
+Example:
+    `python3 -m models.engine.migrate sharded` splits file.json
+    `python3 -m models.engine.migrate single --remove` joins the class
+    files back into file.json and removes them
+"""
+import argparse
+import os
+
+from models.engine import snapshot, write_ahead_log
+from models.engine.codec import get_codec
+from models.engine.durability import atomic_write
+from models.engine.file_storage import FileStorage
+
+
+def to_sharded(file_path, shards_path, codec=get_codec(),
+               file_format='json'):
+    """Splits the file at file_path into one file per class in shards_path
+
+    A log left by the log mode is folded into the file first.
+
+    Return:
+        int: the number of objects copied
+    """
+    if os.path.isfile(file_path + '.log'):
+        write_ahead_log.compact(file_path, file_path + '.log', codec,
+                                file_format=file_format)
+    shards = {}
+    for key, record, text in snapshot.iter_entries(file_path, codec,
+                                                   file_format):
+        shards.setdefault(key.split('.', 1)[0], []).append(
+            snapshot.entry(key, text, codec, file_format))
+    os.makedirs(shards_path, exist_ok=True)
+    for class_name, entries in shards.items():
+        atomic_write(os.path.join(shards_path, f'{class_name}.json'),
+                     snapshot.iter_text(entries, file_format))
+    return sum(map(len, shards.values()))
+
+
+def shard_paths(shards_path):
+    """Returns the paths of the class files in shards_path"""
+    if not os.path.isdir(shards_path):
+        return []
+    return [os.path.join(shards_path, name)
+            for name in sorted(os.listdir(shards_path))
+            if name.endswith('.json')]
+
+
+def to_single(shards_path, file_path, codec=get_codec(), file_format='json'):
+    """Joins the class files of shards_path into the file at file_path
+
+    Return:
+        int: the number of objects copied
+    """
+    count = 0
+
+    def entries():
+        nonlocal count
+        for path in shard_paths(shards_path):
+            for key, _, text in snapshot.iter_entries(path, codec,
+                                                      file_format):
+                count += 1
+                yield snapshot.entry(key, text, codec, file_format)
+
+    atomic_write(file_path, snapshot.iter_text(entries(), file_format))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('layout', choices=FileStorage.layouts,
+                        help='the layout to convert the files to')
+    parser.add_argument('--format', choices=snapshot.FORMATS,
+                        default=os.getenv('HBNB_STORAGE_FORMAT', 'json'),
+                        help='format of the files')
+    parser.add_argument('--remove', action='store_true',
+                        help='remove the files of the old layout')
+    args = parser.parse_args()
+
+    storage = FileStorage(file_format=args.format)
+    file_path, shards_path = storage.file_path, storage.shards_path
+    codec = storage.codec
+    if args.layout == 'sharded':
+        count = to_sharded(file_path, shards_path, codec, args.format)
+        old_paths = [file_path]
+    else:
+        old_paths = shard_paths(shards_path)
+        count = to_single(shards_path, file_path, codec, args.format)
+    if args.remove:
+        for path in old_paths:
+            if os.path.isfile(path):
+                os.remove(path)
+    print(f'{count} objects copied to the {args.layout} layout')
+
+
+if __name__ == '__main__':
+    main()
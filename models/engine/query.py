@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""A module that defines the queries of the storage engines
+
+A Query selects the instances of one class with conditions on their
+attributes, in an order and by pages, without the caller scanning
+storage.all(). It is built by storage.query(cls) and does nothing until it
+is iterated, so it can be refined step by step:
+
+    >>> places = storage.query(Place).where(price_by_night__lt=100,
+    ...                                     city_id=city.id)
+    >>> for place in places.order_by('-updated_at').limit(20):
+    ...     print(place.name)
+
+A condition is attr=value or attr__<operator>=value (see OPERATORS). The
+instances are read from an index of the storage when a condition is an
+equality on an indexed attribute (storage.find()), a contains on an
+indexed list attribute (storage.find_containing()) or a range on an
+attribute with a sorted index (storage.find_range()), and from the
+instances of the class otherwise; the other conditions are checked on
+those instances only. A sorted index also spares sorting by its attribute.
+An attribute that an instance does not hold has the value of its class, or
+None.
+"""
+import operator
+from itertools import islice
+
+OPERATORS = {'eq': operator.eq,
+             'ne': operator.ne,
+             'lt': operator.lt,
+             'lte': operator.le,
+             'gt': operator.gt,
+             'gte': operator.ge,
+             'in': lambda value, values: value in values,
+             'contains': lambda value, item: item in value,
+             'startswith': lambda value, prefix: value.startswith(prefix),
+             }
+
+# the bound set by the range operators
+_BOUNDS = {'lt': 'high', 'lte': 'high', 'gt': 'low', 'gte': 'low'}
+
+
+def parse_condition(name, value):
+    """Returns the (attr, operator name, value) of the condition name=value
+
+    Raises:
+        ValueError: when the operator is unknown
+    """
+    attr, _, op = name.rpartition('__')
+    if not attr:
+        return name, 'eq', value
+    if op not in OPERATORS:
+        raise ValueError(f'unknown operator: {op}')
+    return attr, op, value
+
+
+class Query:
+    """A lazy selection of the instances of one class of a storage
+
+    Every method returns a new Query and leaves this one as it is.
+
+    Methods:
+        where(**conditions): keeps the instances meeting every condition
+        order_by(*attrs): sorts by attrs, '-attr' for descending order
+        limit(count): keeps the first count instances
+        offset(count): skips the first count instances
+        first(): returns the first instance, or None
+        count(): returns the number of instances
+        all(): returns the list of the instances
+    """
+
+    def __init__(self, storage, cls):
+        self.__storage = storage
+        self.__class_name = cls if isinstance(cls, str) else cls.__name__
+        self.__conditions = ()  # (attr, operator name, value)
+        self.__order = ()  # (attr, descending)
+        self.__limit = None
+        self.__offset = 0
+
+    def __repr__(self):
+        return f'<Query {self.__class_name} where {self.__conditions} ' \
+               f'order by {self.__order} [{self.__offset}:{self.__limit}]>'
+
+    def __copy(self, **changes):
+        query = Query(self.__storage, self.__class_name)
+        query.__conditions = self.__conditions
+        query.__order = self.__order
+        query.__limit = self.__limit
+        query.__offset = self.__offset
+        for name, value in changes.items():
+            setattr(query, f'_Query__{name}', value)
+        return query
+
+    def where(self, **conditions):
+        """Keeps the instances meeting every condition
+
+        Raises:
+            ValueError: when an operator is unknown
+        """
+        return self.__copy(conditions=self.__conditions + tuple(
+            parse_condition(name, value)
+            for name, value in conditions.items()))
+
+    def order_by(self, *attrs):
+        """Sorts the instances by attrs, '-attr' for descending order;
+        instances without a value come last"""
+        return self.__copy(order=tuple((attr.lstrip('-'),
+                                        attr.startswith('-'))
+                                       for attr in attrs))
+
+    def limit(self, count):
+        """Keeps the first count instances"""
+        if count < 0:
+            raise ValueError('the limit cannot be negative')
+        return self.__copy(limit=count)
+
+    def offset(self, count):
+        """Skips the first count instances"""
+        if count < 0:
+            raise ValueError('the offset cannot be negative')
+        return self.__copy(offset=count)
+
+    def first(self):
+        """Returns the first instance, or None if there is none"""
+        return next(iter(self.limit(1)), None)
+
+    def count(self):
+        """Returns the number of instances"""
+        if not self.__conditions and self.__limit is None:
+            return max(self.__storage.count(self.__class_name) -
+                       self.__offset, 0)
+        return sum(1 for _ in self)
+
+    def all(self):
+        """Returns the list of the instances"""
+        return list(self)
+
+    def __candidates(self):
+        """Returns the instances to check the conditions on, the
+        conditions left to check and whether the instances are already in
+        the order of the query"""
+        storage = self.__storage
+        class_name = self.__class_name
+        conditions = self.__conditions
+        order = self.__order
+        for condition in conditions:
+            attr, op, value = condition
+            if op == 'eq' and storage.indexed(class_name, attr):
+                return storage.find(class_name, attr, value), \
+                    [other for other in conditions
+                     if other is not condition], False
+            if op == 'contains' and storage.indexed(class_name, attr,
+                                                    members=True):
+                return storage.find_containing(class_name, attr, value), \
+                    [other for other in conditions
+                     if other is not condition], False
+        ranges = [condition for condition in conditions
+                  if condition[1] in _BOUNDS and condition[2] is not None
+                  and storage.indexed(class_name, condition[0],
+                                      ordered=True)]
+        if ranges:
+            attr = ranges[0][0]
+            bounds = {_BOUNDS[op]: (attr, op, value)
+                      for name, op, value in ranges if name == attr}
+            _, low_op, low = bounds.get('low', (None, None, None))
+            _, high_op, high = bounds.get('high', (None, None, None))
+            left = [condition for condition in conditions
+                    if condition not in bounds.values()]
+            in_order = order[:1] == ((attr, order[0][1]),) if order \
+                else False
+            return storage.find_range(
+                class_name, attr, low, high, low_op != 'gt', high_op != 'lt',
+                reverse=in_order and order[0][1]), left, \
+                in_order and len(order) == 1
+        if len(order) == 1 and storage.indexed(class_name, order[0][0],
+                                               ordered=True):
+            attr, descending = order[0]
+            limit = None
+            if not conditions and self.__limit is not None:
+                limit = self.__offset + self.__limit
+            objs = storage.find_range(class_name, attr, reverse=descending,
+                                      limit=limit)
+            # unless instances without a value to sort were left out
+            if len(objs) == limit or \
+                    len(objs) == storage.count(class_name):
+                return objs, conditions, True
+        return storage.all(class_name).values(), conditions, False
+
+    @staticmethod
+    def __predicate(conditions):
+        """Returns the function telling if an instance meets conditions"""
+        tests = [(attr, OPERATORS[op], value)
+                 for attr, op, value in conditions]
+
+        def matches(obj):
+            try:
+                for attr, test, value in tests:
+                    if not test(getattr(obj, attr, None), value):
+                        return False
+            except (TypeError, AttributeError):  # None < 1, 1 in 2...
+                return False
+            return True
+        return matches
+
+    @staticmethod
+    def __sort_key(attr, descending=False):
+        """Returns the sort key by attr, which puts the instances without
+        a value last in both directions"""
+        if descending:
+            def key(obj):
+                value = getattr(obj, attr, None)
+                return (value is not None, value)
+        else:
+            def key(obj):
+                value = getattr(obj, attr, None)
+                return (value is None, value)
+        return key
+
+    def __sorted(self, objs):
+        """Returns the list of objs sorted in the order of the query"""
+        order = self.__order
+        directions = {descending for _, descending in order}
+        if len(directions) == 1:
+            descending = directions.pop()
+            keys = [self.__sort_key(attr, descending) for attr, _ in order]
+            key = keys[0] if len(keys) == 1 else \
+                (lambda obj: tuple(key(obj) for key in keys))
+            # faster than heapq for a limit: the instances are often
+            # already in order (by id or by date), and timsort uses it
+            return sorted(objs, key=key, reverse=descending)
+        objs = list(objs)
+        # stable sorts from the last attribute to the first
+        for attr, descending in reversed(order):
+            objs.sort(key=self.__sort_key(attr, descending),
+                      reverse=descending)
+        return objs
+
+    def __iter__(self):
+        objs, conditions, in_order = self.__candidates()
+        if conditions:
+            objs = filter(self.__predicate(conditions), objs)
+        if self.__order and not in_order:
+            objs = self.__sorted(objs)
+        stop = None if self.__limit is None else \
+            self.__offset + self.__limit
+        return islice(objs, self.__offset, stop)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""A module that defines the relationships between the model classes
+
+The model classes only hold the ids of the instances they refer to
+(City.state_id, Place.amenity_ids...). A Relationship is a read-only
+property of a model class that follows those ids, through the storage, to
+the instances:
+    has_many(target, attr): the instances of target whose attribute attr
+        is the id of the instance (State.cities)
+    belongs_to(target, attr): the instance of target whose id is the
+        attribute attr of the instance (City.state)
+    has_ids(target, attr): the instances of target whose ids are listed
+        in the attribute attr of the instance (Place.amenities)
+    listed_in(target, attr): the instances of target whose list attribute
+        attr holds the id of the instance (Amenity.places)
+
+The storage answers every hop from its indexes, in O(k) for k related
+instances (see storage.related()). storage.prefetch(states,
+'cities.places.reviews') loads a whole subtree level by level, with one
+lookup for all the instances of a level, and keeps the results until the
+next change, so that rendering the subtree looks nothing up again.
+
+Example:
+    >>> for state in storage.prefetch(storage.all(State).values(),
+    ...                               'cities.places'):
+    ...     print(state.name, [city.places for city in state.cities])
+"""
+import models
+
+KINDS = ('has_many', 'belongs_to', 'has_ids', 'listed_in')
+
+
+class Relationship(property):
+    """A read-only property following ids to the related instances
+
+    Attributes:
+        kind (str): one of KINDS
+        target (str): the name of the class of the related instances
+        attr (str): the name of the attribute holding the ids
+        name (str): the name of the property
+    """
+
+    def __init__(self, kind, target, attr):
+        super().__init__(self.__related)
+        self.kind = kind
+        self.target = target
+        self.attr = attr
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __related(self, obj):
+        return models.storage.related(obj, self.name)
+
+    def __repr__(self):
+        return f'<Relationship {self.name}: {self.kind} {self.target} ' \
+               f'by {self.attr}>'
+
+
+def has_many(target, attr):
+    """Returns the relationship to the instances of target whose attribute
+    attr is the id of the instance"""
+    return Relationship('has_many', target, attr)
+
+
+def belongs_to(target, attr):
+    """Returns the relationship to the instance of target whose id is the
+    attribute attr of the instance"""
+    return Relationship('belongs_to', target, attr)
+
+
+def has_ids(target, attr):
+    """Returns the relationship to the instances of target whose ids are
+    listed in the attribute attr of the instance"""
+    return Relationship('has_ids', target, attr)
+
+
+def listed_in(target, attr):
+    """Returns the relationship to the instances of target whose list
+    attribute attr holds the id of the instance"""
+    return Relationship('listed_in', target, attr)
+
+
+def relationship(obj, name):
+    """Returns the Relationship name of the class of obj
+
+    Raises:
+        ValueError: when the class of obj has no such relationship
+    """
+    relation = getattr(type(obj), name, None)
+    if not isinstance(relation, Relationship):
+        raise ValueError(f'{type(obj).__name__} has no relationship {name}')
+    return relation
+
+
+def key(obj):
+    """Returns the key of obj in the storage, <obj class name>.id"""
+    return f'{obj.__class__.__name__}.{obj.id}'
+
+
+def ids(obj, relation):
+    """Returns the list of the ids obj refers to by a belongs_to or a
+    has_ids relation"""
+    value = getattr(obj, relation.attr, None)
+    if relation.kind == 'belongs_to':
+        return [value]
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+def prefetch(objs, paths, load):
+    """Follows the relationships of paths from objs, one level at a time
+
+    Args:
+        objs (iterable): the instances the paths start from
+        paths (iterable): the names of relationships, separated by dots
+            to follow them from the related instances ('cities.places')
+        load (callable): load(relation, objs) returns the related
+            instances of every instance of objs, by key
+
+    Return:
+        dict: the related instances, by (key, name of the relationship)
+    """
+    found = {}
+    for path in paths:
+        level = list(objs)
+        for name in path.split('.'):
+            by_class = {}
+            for obj in level:
+                by_class.setdefault(type(obj), {})[key(obj)] = obj
+            level = {}
+            for group in by_class.values():
+                relation = relationship(next(iter(group.values())), name)
+                missing = [obj for obj_key, obj in group.items()
+                           if (obj_key, name) not in found]
+                if missing:
+                    for obj_key, result in load(relation, missing).items():
+                        found[(obj_key, name)] = result
+                for obj_key in group:
+                    result = found[(obj_key, name)]
+                    if relation.kind == 'belongs_to':
+                        result = () if result is None else (result,)
+                    for related in result:
+                        level[key(related)] = related
+            level = list(level.values())
+    return found
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""The cache of the str() of the stored instances for the storage engines
+
+Printing an instance formats the repr of every value of its __dict__,
+which costs more than encoding it. storage.render(obj) formats a stored
+instance once and returns the same text until the instance changes: the
+engines discard its text when it is touched, stored again or deleted, and
+forget them all on reload(). Like the cached JSON text of the objects, an
+attribute changed behind the back of the instance (a list mutated in
+place) is only seen after new(obj) or obj.save().
+"""
+
+
+class RenderCache:
+    """The str() of instances by <obj class name>.id
+
+    Methods:
+        render(key, obj): returns str(obj), computed once
+        discard(key): forgets the text of the object stored under key
+        clear(): forgets every text
+    """
+
+    def __init__(self):
+        # <obj class name>.id -> (obj, str(obj)), the text is only valid
+        # for the instance it was computed from
+        self.__texts = {}
+
+    def __len__(self):
+        return len(self.__texts)
+
+    def render(self, key, obj):
+        """Returns str(obj), the text cached for obj under key if any"""
+        entry = self.__texts.get(key)
+        if entry is not None and entry[0] is obj:
+            return entry[1]
+        text = str(obj)
+        self.__texts[key] = (obj, text)
+        return text
+
+    def discard(self, key):
+        """Forgets the text of the object stored under key"""
+        self.__texts.pop(key, None)
+
+    def clear(self):
+        """Forgets every text"""
+        self.__texts.clear()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Streaming readers and writers of the snapshot file formats
+
+Two formats are supported:
+    json: the original format, a single JSON object of every to_dict()
+        by <obj class name>.id
+        {"User.<id>":{...},"Place.<id>":{...}}
+    ndjson: one to_dict() per line, the key is built from its __class__
+        and id
+        {"id":"<id>","__class__":"User",...}
+
+Both are read as a stream: iter_entries() reads the file by chunks and
+yields the objects one at a time, with the exact text they have in the
+file, so the whole text and the whole decoded dictionary are never in
+memory at once. The json format is parsed with the scanner of
+json.JSONDecoder one value at a time (the fastest codec only decodes whole
+documents, which is why ndjson reads faster), the ndjson format one line
+at a time with the codec of the storage. They are written as a stream
+too: iter_text() yields the text of a snapshot piece by piece as its
+entries are produced, and atomic_write() writes the pieces to the
+temporary file one at a time.
+
+Example:
+    >>> for key, record, text in iter_entries('file.json'):
+    ...     print(key, record['__class__'])
+"""
+
+import json
+import os
+import re
+import warnings
+from sys import intern
+
+from models.engine.codec import get_codec
+
+FORMATS = ('json', 'ndjson')
+
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_scan = json.JSONDecoder().scan_once
+
+
+class _JSONReader:
+    """Reads the entries of a json snapshot, one chunk of text at a time"""
+
+    def __init__(self, file, chunk_size):
+        self.__file = file
+        self.__chunk_size = chunk_size
+        self.__buf = ''
+        self.__pos = 0
+        self.__eof = False
+
+    def __more(self):
+        """Appends the next chunk to the buffer, False at the end of the
+        file"""
+        if self.__eof:
+            return False
+        chunk = self.__file.read(self.__chunk_size)
+        if not chunk:
+            self.__eof = True
+            return False
+        # drop what was already parsed before growing the buffer
+        self.__buf = self.__buf[self.__pos:] + chunk
+        self.__pos = 0
+        return True
+
+    def __peek(self):
+        """Returns the next character that is not whitespace, '' at the
+        end of the file"""
+        char = self.__buf[self.__pos:self.__pos + 1]
+        if char and char not in ' \t\n\r':  # compact files
+            return char
+        while True:
+            self.__pos = _WHITESPACE.match(self.__buf, self.__pos).end()
+            if self.__pos < len(self.__buf) or not self.__more():
+                return self.__buf[self.__pos:self.__pos + 1]
+
+    def __expect(self, chars):
+        """Consumes the next character, which must be one of chars"""
+        char = self.__peek()
+        if not char or char not in chars:
+            raise ValueError(f'expected one of {chars!r} at offset '
+                             f'{self.__pos}, found {char!r}')
+        self.__pos += 1
+        return char
+
+    def __decode(self):
+        """Decodes the next value, returns it with its text"""
+        self.__peek()
+        while True:
+            start = self.__pos
+            try:
+                value, end = _scan(self.__buf, start)
+            except (StopIteration, ValueError):
+                # the value may go on in the next chunk
+                if not self.__more():
+                    raise ValueError(f'invalid JSON value at offset '
+                                     f'{start}') from None
+                continue
+            if end == len(self.__buf) and self.__more():
+                continue  # a number cut by the end of the chunk
+            self.__pos = end
+            return value, self.__buf[start:end]
+
+    def __iter__(self):
+        if not self.__peek():  # an empty file has no entries
+            return
+        self.__expect('{')
+        if self.__peek() == '}':
+            self.__pos += 1
+            return
+        while True:
+            key, _ = self.__decode()
+            self.__expect(':')
+            record, text = self.__decode()
+            if isinstance(record, dict):
+                # json only shares the key strings inside one call, the
+                # attribute names of the instances would be copies
+                record = {intern(name): value
+                          for name, value in record.items()}
+            yield key, record, text
+            if self.__expect(',}') == '}':
+                return
+
+
+def _iter_ndjson(file, codec):
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line:
+            record = codec.loads(line)
+            try:
+                key = f"{record['__class__']}.{record['id']}"
+            except (KeyError, TypeError):  # not a to_dict(), a json file
+                raise ValueError(f'line {number} is not a dictionary with '
+                                 f'__class__ and id') from None
+            yield key, record, line
+
+
+def iter_entries(path, codec=get_codec(), file_format='json',
+                 chunk_size=CHUNK_SIZE):
+    """Yields the entries of the snapshot file at path
+
+    Args:
+        path (str): path of the snapshot, nothing is yielded if there is
+            no file
+        codec (Codec): the codec used to decode ndjson lines
+        file_format (str): one of FORMATS
+        chunk_size (int): number of characters read at a time (json)
+
+    Yields:
+        tuple: the key, the decoded dictionary and its JSON text
+
+    Raises:
+        ValueError: when the file is not in the format
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f'unknown snapshot format: {file_format}')
+    if not os.path.isfile(path):
+        return
+    with open(path, 'r', encoding='UTF-8') as file:
+        if file_format == 'ndjson':
+            yield from _iter_ndjson(file, codec)
+        else:
+            yield from _JSONReader(file, chunk_size)
+
+
+def entry(key, text, codec=get_codec(), file_format='json'):
+    """Returns the text of the object text stored under key in a snapshot
+    of file_format"""
+    if file_format == 'ndjson':
+        if '\n' in text:  # read from an indented json file
+            text = codec.dumps(codec.loads(text))
+        return text
+    return f'{codec.dumps(key)}:{text}'
+
+
+def iter_text(entries, file_format='json'):
+    """Yields the text of a snapshot made of entries (see entry()) piece
+    by piece, as the entries are produced, for atomic_write()"""
+    if file_format == 'ndjson':
+        for text in entries:
+            yield text
+            yield '\n'
+        return
+    separator = '{'
+    for text in entries:
+        yield separator
+        yield text
+        separator = ','
+    yield '{}' if separator == '{' else '}'
+
+
+def quarantine(path, error):
+    """Moves the snapshot at path, which cannot be read, to <path>.corrupt
+    with a warning, so that it is kept for recovery instead of being
+    overwritten by the next save"""
+    os.replace(path, path + '.corrupt')
+    warnings.warn(f'{path} is not valid ({error}), it was moved to '
+                  f'{path}.corrupt', RuntimeWarning, stacklevel=3)
+
+
+def load(path, codec=get_codec(), file_format='json'):
+    """Returns the dictionary of every entry of the snapshot at path, by
+    key, or an empty one if the file cannot be read (see quarantine())"""
+    try:
+        return {key: record for key, record, _ in
+                iter_entries(path, codec, file_format)}
+    except ValueError as error:
+        quarantine(path, error)
+        return {}
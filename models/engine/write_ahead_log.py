@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Append-only log of object changes used by FileStorage in 'log' mode.
+
+Each line of the log is a JSON record describing a single change:
+
+    {"op":"put","key":"User.<id>","obj":{...to_dict()...}}
+    {"op":"delete","key":"User.<id>"}
+
+Replaying the records, in order, on top of a snapshot (the regular
+`file.json`, see models.engine.snapshot) gives the current state of the
+data set. FileStorage appends the objects changed since the previous save
+on every save, replays the log on reload() and, once the log holds more
+than log_threshold records, folds it into a new snapshot with compact()
+in a background thread.
+
+A crash in the middle of an append leaves a last line without its
+newline. repair() cuts it before the log is read again, append() starts
+on a new line if it is still there, and iter_records() skips it, so the
+records appended after a crash are never lost.
+
+Every function takes the SyncPolicy of the storage (see
+models.engine.durability) that sets when the written data is flushed to
+the disk.
+"""
+
+import os
+
+from models.engine import snapshot
+from models.engine.codec import get_codec
+from models.engine.durability import NO_SYNC, atomic_write
+
+
+def append(path, records, codec=get_codec(), sync=NO_SYNC):
+    """Appends the records to the log file at path
+
+    Args:
+        path (str): path of the log file, created if it does not exist.
+        records (iterable): (op, key, obj) tuples where obj is the JSON
+            text of the object, or None for deletes.
+        codec (Codec): the codec used to encode the keys
+        sync (SyncPolicy): when the records are flushed to the disk
+
+    Return:
+        int: the number of records written
+    """
+    lines = []
+    for op, key, obj in records:
+        if obj is None:
+            lines.append(f'{{"op":"{op}","key":{codec.dumps(key)}}}\n')
+        else:
+            lines.append(f'{{"op":"{op}","key":{codec.dumps(key)},'
+                         f'"obj":{obj}}}\n')
+    if lines:
+        new_entry = not os.path.isfile(path)
+        with open(path, 'a+b') as file:
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':  # torn by a crash
+                    lines.insert(0, '\n')
+            file.write(''.join(lines).encode('UTF-8'))
+            sync.sync_file(file)
+        sync.written(path, new_entry)
+    return len(lines)
+
+
+def repair(path, sync=NO_SYNC):
+    """Cuts the log file at path after its last complete record, the
+    last line ending with a newline
+
+    Return:
+        int: the number of bytes removed
+    """
+    if not os.path.isfile(path):
+        return 0
+    with open(path, 'r+b') as file:
+        size = end = file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 4096)
+            file.seek(start)
+            block = file.read(end - start)
+            if end == size and block.endswith(b'\n'):
+                return 0
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        file.truncate(end)
+        sync.sync_file(file)
+    return size - end
+
+
+def iter_records(path, codec=get_codec()):
+    """Yields the records of the log file at path, in order
+
+    A line torn by a crash in the middle of an append is skipped.
+
+    Yields:
+        tuple: (op, key, obj, text) where obj is the decoded object and
+        text its JSON text as written by append(), both None for deletes
+    """
+    if not os.path.isfile(path):
+        return
+    with open(path, 'r', encoding='UTF-8') as file:
+        for line in file:
+            try:
+                record = codec.loads(line)
+            except ValueError:  # torn by a crash
+                continue
+            obj = text = record.get('obj')
+            if obj is not None:
+                prefix = f'{{"op":"put","key":{codec.dumps(record["key"])},' \
+                         '"obj":'
+                line = line.rstrip('\n')
+                text = line[len(prefix):-1] \
+                    if line.startswith(prefix) else None
+            yield record['op'], record['key'], obj, text
+
+
+def replay(path, objs_dict, codec=get_codec()):
+    """Applies the records of the log file at path to objs_dict
+
+    Return:
+        int: the number of records applied
+    """
+    count = 0
+    for op, key, obj, _ in iter_records(path, codec):
+        if op == 'put':
+            objs_dict[key] = obj
+        else:
+            objs_dict.pop(key, None)
+        count += 1
+    return count
+
+
+def compact(snapshot_path, log_path, codec=get_codec(), sync=NO_SYNC,
+            file_format='json'):
+    """Folds the log at log_path into the snapshot and removes the log
+
+    The new snapshot is written atomically, so a crash leaves either the
+    old or the new snapshot, and the log is only removed once its records
+    are part of the snapshot.
+    """
+    objs_dict = snapshot.load(snapshot_path, codec, file_format)
+    replay(log_path, objs_dict, codec)
+    entries = (snapshot.entry(key, codec.dumps(obj), codec, file_format)
+               for key, obj in objs_dict.items())
+    atomic_write(snapshot_path, snapshot.iter_text(entries, file_format), sync)
+    sync.flush()  # the snapshot reaches the disk before the log is removed
+    if os.path.isfile(log_path):
+        os.remove(log_path)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Background writer used by FileStorage when async_save is set
+
+save() only encodes the changed objects and hands them to the writer;
+the file is written by a daemon thread. The changes submitted while the
+thread is busy are written together by its next write, so a burst of
+saves becomes a single write of the file.
+
+In snapshot mode the thread keeps its own copy of the entries of the JSON
+file, so a save costs O(k) for k changed objects whatever the number of
+stored objects, except the first one after reload() which copies every
+entry. storage.flush() waits for the saves to be written, and
+storage.close(), called at exit, also stops the thread.
+
+Example:
+    >>> writer = BackgroundWriter(print)
+    >>> writer.submit(['a'])
+    >>> writer.flush()  # returns once write(['a']) is done
+    ['a']
+    >>> writer.close()
+"""
+
+import threading
+
+
+class BackgroundWriter:
+    """Runs a write function in a daemon thread
+
+    Methods:
+        submit(changes): queues changes and returns at once
+        flush(): waits for the changes submitted so far to be written
+        close(): flushes and stops the thread
+    """
+
+    def __init__(self, write, name='hbnb-writer'):
+        """Starts the thread
+
+        Args:
+            write (callable): write(changes) writes the list of every
+                change submitted since the previous call, in order
+            name (str): name of the thread
+        """
+        self.__write = write
+        self.__cond = threading.Condition()
+        self.__pending = []
+        self.__submitted = 0  # number of submit() calls
+        self.__written = 0  # number of submit() calls written
+        self.__error = None
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run, name=name,
+                                         daemon=True)
+        self.__thread.start()
+
+    def __raise(self):
+        """Raises the error of the last failed write, once"""
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def submit(self, changes):
+        """Queues changes for the next write
+
+        Raises:
+            Exception: the error of a previous write that failed
+        """
+        with self.__cond:
+            if self.__closed:
+                raise RuntimeError('the writer is closed')
+            self.__raise()
+            self.__pending.extend(changes)
+            self.__submitted += 1
+            self.__cond.notify_all()
+
+    def flush(self):
+        """Waits until the changes submitted so far are written
+
+        Raises:
+            Exception: the error of the write that failed
+        """
+        with self.__cond:
+            target = self.__submitted
+            self.__cond.wait_for(lambda: self.__written >= target)
+            self.__raise()
+
+    def close(self):
+        """Writes the pending changes and stops the thread"""
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+        self.__thread.join()
+        with self.__cond:
+            self.__raise()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                self.__cond.wait_for(
+                    lambda: self.__written < self.__submitted or
+                    self.__closed)
+                if self.__written == self.__submitted:  # closed
+                    return
+                changes, self.__pending = self.__pending, []
+                target = self.__submitted
+            try:
+                self.__write(changes)
+            except Exception as error:
+                with self.__cond:
+                    # retried by the next write, reported by flush()
+                    self.__pending[:0] = changes
+                    self.__error = error
+            with self.__cond:
+                self.__written = target
+                self.__cond.notify_all()
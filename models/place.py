@@ -2,6 +2,7 @@
 """A module that defines a class called Place."""
 
 from models.base_model import BaseModel
+from models.engine.relations import belongs_to, has_ids, has_many
 
 
 class Place(BaseModel):
@@ -19,6 +20,12 @@ class Place(BaseModel):
     longitude: float - 0.0
     amenity_ids: list of string - empty list:
     it will be the list of Amenity.id later
+
+    Relationships:
+    city: the City of city_id
+    user: the User of user_id
+    reviews: the reviews of the place
+    amenities: the amenities of amenity_ids
     """
 
     city_id = ""
@@ -32,3 +39,8 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    city = belongs_to('City', 'city_id')
+    user = belongs_to('User', 'user_id')
+    reviews = has_many('Review', 'place_id')
+    amenities = has_ids('Amenity', 'amenity_ids')
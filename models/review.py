@@ -2,6 +2,7 @@
 """A module that defines a class called Place."""
 
 from models.base_model import BaseModel
+from models.engine.relations import belongs_to
 
 
 class Review(BaseModel):
@@ -11,8 +12,15 @@ class Review(BaseModel):
     place_id(str): empty string: it will be the Place.id
     user_id(str): empty string: it will be the User.id
     text(str): empty string
+
+    Relationships:
+    place: the Place of place_id
+    user: the User of user_id
     """
 
     place_id = ""  # Place.id
     user_id = ""  # User.id
     text = ""
+
+    place = belongs_to('Place', 'place_id')
+    user = belongs_to('User', 'user_id')
@@ -2,6 +2,7 @@
 """A module that defines a class called State."""
 
 from .base_model import BaseModel
+from .engine.relations import has_many
 
 
 class State(BaseModel):
@@ -9,6 +10,11 @@ class State(BaseModel):
 
     Public attributes:
     name(str): the name of the state, default to empty string
+
+    Relationships:
+    cities: the cities of the state
     """
 
     name = ""
+
+    cities = has_many('City', 'state_id')
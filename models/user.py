@@ -2,6 +2,7 @@
 """A module that defines a class called User."""
 
 from .base_model import BaseModel
+from .engine.relations import has_many
 
 
 class User(BaseModel):
@@ -13,9 +14,16 @@ class User(BaseModel):
         first_name (str): The first name of the user,
         default to an empty string.
         last_name (str): last name of the user, default to an empty string.
+
+    Relationships:
+        places (list): the places of the user.
+        reviews (list): the reviews written by the user.
     """
 
     email = ""
     password = ""
     first_name = ""
     last_name = ""
+
+    places = has_many('Place', 'user_id')
+    reviews = has_many('Review', 'user_id')
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Unit Test for the HBNBCommand class
+
+Module: test_console
+Class: TestHBNBCommand
+Example:
+    `python3 -m unittest tests/test_console.py`
+"""
+
+# standard library imports
+import json
+import os
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+# local imports
+import models
+from console import HBNBCommand
+from models.engine.file_storage import FileStorage
+from models.engine.metrics import registry
+
+
+class TestHBNBCommand(TestCase):
+    """Test the commands of the console"""
+
+    def setUp(self):
+        """Run every test against an empty storage and file, with the
+        metrics off and empty whatever HBNB_METRICS turned on at import"""
+        self.file_path = FileStorage._FileStorage__file_path
+        FileStorage._FileStorage__file_path = 'test_console.json'
+        self.storage = models.storage
+        models.storage = FileStorage()
+        for patcher in (patch.dict(os.environ, HBNB_METRICS='0'),
+                        patch.object(registry, 'enabled', False)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        registry.reset()
+
+    def tearDown(self):
+        FileStorage._FileStorage__file_path = self.file_path
+        models.storage = self.storage
+        if os.path.isfile('test_console.json'):
+            os.remove('test_console.json')
+
+    def run_command(self, line):
+        """Runs line in the console and returns what it printed"""
+        with patch('sys.stdout', new=StringIO()) as output:
+            HBNBCommand().onecmd(line)
+        return output.getvalue().strip()
+
+    def test_create_and_show(self):
+        """Test that a created instance can be shown"""
+        obj_id = self.run_command('create User')
+        self.assertIn(f'User.{obj_id}', models.storage.all())
+        self.assertTrue(self.run_command(f'show User {obj_id}')
+                        .startswith(f'[User] ({obj_id})'))
+
+    def test_create_count(self):
+        """Test that create with a count creates the instances at once"""
+        ids = self.run_command('create Review 3').split('\n')
+        self.assertEqual(len(set(ids)), 3)
+        storage = FileStorage()
+        storage.reload()
+        self.assertCountEqual(storage.all(), [f'Review.{id}' for id in ids])
+        self.assertEqual(self.run_command('create Review 0'),
+                         '** invalid count **')
+        self.assertEqual(self.run_command('create Review many'),
+                         '** invalid count **')
+
+    def test_all(self):
+        """Test that all only prints the instances of the class"""
+        user_id = self.run_command('create User')
+        state_id = self.run_command('create State')
+        output = self.run_command('all User')
+        self.assertIn(user_id, output)
+        self.assertNotIn(state_id, output)
+        self.assertIn(state_id, self.run_command('all'))
+        self.assertEqual(self.run_command('all Nope'),
+                         "** class doesn't exist **")
+
+    def test_all_pages(self):
+        """Test that all prints the list of print() one instance at a time,
+        by pages in the order of the ids and as NDJSON"""
+        ids = self.run_command('create City 5').split('\n')
+        self.run_command(f'update City {ids[1]} name "Lagos"')
+        objs = list(models.storage.all('City').values())
+        self.assertEqual(self.run_command('all City'),
+                         str([str(obj) for obj in objs]))
+        objs.sort(key=lambda obj: obj.id)
+        ids = [obj.id for obj in objs]
+        self.assertEqual(self.run_command('all City limit 2 offset 1'),
+                         str([str(obj) for obj in objs[1:3]]))
+        self.assertEqual(self.run_command(f'all City after {ids[2]}'),
+                         str([str(obj) for obj in objs[3:]]))
+        self.assertEqual(self.run_command(f'all after {ids[4]}'), '')
+        lines = self.run_command(f'all City ndjson limit 2 after {ids[0]}')
+        self.assertEqual([json.loads(line) for line in lines.split('\n')],
+                         [obj.to_dict() for obj in objs[1:3]])
+        user_id = self.run_command('create User')
+        user = models.storage.get('User', user_id)
+        self.assertEqual(self.run_command(f'all limit 3 after {ids[2]}'),
+                         str([str(obj) for obj in objs[3:] + [user]]))
+        self.assertEqual(self.run_command('all offset 5'), str([str(user)]))
+        self.assertIn("'name': 'Lagos'", self.run_command('all City'))
+        self.run_command(f'update City {ids[1]} name "Abuja"')
+        self.assertIn("'name': 'Abuja'", self.run_command('all City'))
+        self.assertEqual(self.run_command('all City limit x'),
+                         '** invalid limit **')
+        self.assertEqual(self.run_command('all City after'),
+                         '** invalid after **')
+        self.assertEqual(self.run_command('all City after nope'),
+                         '** no instance found **')
+        self.assertEqual(self.run_command('all City first 2'),
+                         '** unknown option: first **')
+
+    def test_count(self):
+        """Test that <class name>.count() prints the number of instances"""
+        self.run_command('create City')
+        self.run_command('create City')
+        self.run_command('create User')
+        self.assertEqual(self.run_command('City.count()'), '2')
+        self.assertEqual(self.run_command('Place.count()'), '0')
+
+    def test_where(self):
+        """Test that <class name>.where() prints the instances of a
+        query"""
+        cheap = self.run_command('create Place')
+        expensive = self.run_command('create Place')
+        self.run_command(f'update Place {cheap} price_by_night 50')
+        self.run_command(f'update Place {expensive} price_by_night 300')
+        output = self.run_command('Place.where(price_by_night__lt=100)')
+        self.assertIn(cheap, output)
+        self.assertNotIn(expensive, output)
+        output = self.run_command(
+            'Place.where().order_by("-price_by_night").limit(1)')
+        self.assertIn(expensive, output)
+        self.assertNotIn(cheap, output)
+        self.assertEqual(self.run_command('User.where(id="x")'), '')
+        self.assertEqual(
+            self.run_command('Place.where(price_by_night__x=1)'),
+            '** invalid query: unknown operator: x **')
+        self.assertEqual(self.run_command('Place.where().save()'),
+                         '** invalid query: unknown method save **')
+
+    def test_near(self):
+        """Test that <class name>.near() and nearest() print the places
+        near a point"""
+        near = self.run_command('create Place')
+        far = self.run_command('create Place')
+        nowhere = self.run_command('create Place')
+        self.run_command(f'update Place {near} latitude 37.77')
+        self.run_command(f'update Place {near} longitude -122.41')
+        self.run_command(f'update Place {far} latitude 0.5')
+        self.run_command(f'update Place {far} longitude 0.5')
+        output = self.run_command('Place.near(37.78, -122.42, 10)')
+        self.assertIn(near, output)
+        self.assertNotIn(far, output)
+        output = self.run_command('Place.nearest(0, 0, 1)')
+        self.assertIn(far, output)
+        self.assertNotIn(near, output)
+        self.assertNotIn(nowhere, self.run_command('Place.nearest(0, 0, 3)'))
+        self.assertTrue(self.run_command('Place.near(1)')
+                        .startswith('** invalid query'))
+
+    def test_aggregate(self):
+        """Test that aggregate and <class name>.aggregate() print an
+        aggregate of the instances of a class"""
+        for city_id, price in (('a', 50), ('a', 150), ('b', 300)):
+            obj_id = self.run_command('create Place')
+            self.run_command(f'update Place {obj_id} city_id {city_id}')
+            self.run_command(f'update Place {obj_id} price_by_night {price}')
+        self.assertEqual(self.run_command('aggregate Place count'), '3')
+        self.assertEqual(
+            self.run_command('aggregate Place mean price_by_night by city_id'),
+            "{'a': 100.0, 'b': 300.0}")
+        self.assertEqual(
+            self.run_command('Place.aggregate("max", "price_by_night")'),
+            '300.0')
+        self.assertEqual(
+            self.run_command('Place.aggregate("count", by="city_id")'),
+            "{'a': 2, 'b': 1}")
+        self.assertEqual(self.run_command('aggregate Place'),
+                         '** function missing **')
+        self.assertEqual(
+            self.run_command('aggregate Place median price_by_night'),
+            '** invalid aggregate: unknown function: median **')
+
+    def test_stats(self):
+        """Test that stats prints the metrics of the commands run after
+        stats on"""
+        self.assertIn('metrics are off', self.run_command('stats'))
+        self.run_command('stats on')
+        try:
+            self.run_command('create Place')
+            self.run_command('Place.count()')
+            self.run_command('count Place')
+            report = self.run_command('stats')
+            snapshot = json.loads(self.run_command('stats json'))
+        finally:
+            self.run_command('stats off')
+            self.run_command('stats reset')
+        self.assertIn('console.create', report)
+        self.assertEqual(snapshot['latency_ms']['console.count']['count'], 1)
+        self.assertEqual(snapshot['latency_ms']['console.other']['count'], 1)
+        self.assertEqual(snapshot['counters']['storage.objects_encoded'], 1)
+        self.assertEqual(json.loads(self.run_command('stats json')),
+                         {'counters': {}, 'latency_ms': {}})
+        self.assertEqual(self.run_command('stats all'),
+                         '** unknown option: all **')
+
+    def test_profile(self):
+        """Test that profile runs a command and prints a report"""
+        output = self.run_command('profile create User')
+        self.assertEqual(models.storage.count('User'), 1)
+        self.assertIn('function calls', output)
+        output = self.run_command('profile memory User.count()')
+        self.assertTrue(output.startswith('1\npeak '))
+        self.assertEqual(self.run_command('profile memory'),
+                         '** command missing **')
+
+    def test_dot_syntax(self):
+        """Test that the arguments of <class name>.<method>(...) are
+        passed as they are quoted"""
+        obj_id = self.run_command('create User')
+        self.run_command(f'User.update("{obj_id}", "first_name", '
+                         f'"Betty Holberton")')
+        obj = models.storage.get('User', obj_id)
+        self.assertEqual(obj.first_name, 'Betty Holberton')
+        self.run_command(f'User.update("{obj_id}", {{"last_name": "B"}})')
+        self.assertEqual(obj.last_name, 'B')
+        self.assertEqual(self.run_command(f'User.show({obj_id})'), str(obj))
+        self.assertEqual(self.run_command('User.show("nope")'),
+                         '** no instance found **')
+        self.assertEqual(self.run_command('User.fly()'),
+                         '*** Unknown syntax: User.fly()')
+        self.assertEqual(self.run_command('show User "nope'),
+                         '** invalid syntax: No closing quotation **')
+
+    def test_update_and_destroy(self):
+        """Test that update sets an attribute and destroy removes it"""
+        obj_id = self.run_command('create Place')
+        self.run_command(f'update Place {obj_id} max_guest 4')
+        obj = models.storage.all()[f'Place.{obj_id}']
+        self.assertEqual(obj.max_guest, 4)
+        self.run_command(f"Place.update('{obj_id}', {{'name': 'Loft'}})")
+        self.assertEqual(obj.name, 'Loft')
+        self.run_command(f'destroy Place {obj_id}')
+        self.assertEqual(models.storage.count('Place'), 0)
+        self.assertEqual(self.run_command(f'show Place {obj_id}'),
+                         '** no instance found **')
+
+    def test_commands_in_batch(self):
+        """Test that commands run in a batch are saved once at the end"""
+        with models.storage.batch():
+            obj_id = self.run_command('create User')
+            self.run_command(f'update User {obj_id} first_name Betty')
+            self.assertFalse(os.path.isfile('test_console.json'))
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(storage.get('User', obj_id).first_name, 'Betty')
+
+    def test_run_script(self):
+        """Test that a script is saved once at the end"""
+        saved = []
+
+        def lines():
+            for _ in range(5):
+                yield 'create User\n'
+                saved.append(os.path.isfile('test_console.json'))
+            yield '\n'
+
+        with patch('sys.stdout', new=StringIO()):
+            count = HBNBCommand().run_script(lines())
+        self.assertEqual(count, 5)
+        self.assertEqual(saved, [False] * 5)
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(storage.count('User'), 5)
+
+    def test_run_script_flush_every(self):
+        """Test that a script is saved every flush_every commands, and
+        stops at quit"""
+        saved = []
+
+        def lines():
+            for _ in range(5):
+                yield 'create User'
+                storage = FileStorage()
+                storage.reload()
+                saved.append(storage.count())
+            yield 'quit'
+            yield 'create User'
+
+        with patch('sys.stdout', new=StringIO()):
+            count = HBNBCommand().run_script(lines(), flush_every=2)
+        self.assertEqual(count, 6)
+        self.assertEqual(saved, [0, 2, 2, 4, 4])
+        self.assertEqual(models.storage.count(), 5)
+
+    def test_quit_flushes_storage(self):
+        """Test that quit and EOF wait for the pending saves"""
+        models.storage = FileStorage(async_save=True)
+        for command in ('quit', 'EOF'):
+            with self.subTest(command=command):
+                with patch('sys.stdout', new=StringIO()):
+                    HBNBCommand().onecmd('create User')
+                    self.assertTrue(HBNBCommand().onecmd(command))
+                storage = FileStorage()
+                storage.reload()
+                self.assertEqual(storage.count('User'),
+                                 models.storage.count('User'))
+        models.storage.close()
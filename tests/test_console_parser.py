@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Unit Test for the parser of the console command lines
+
+Module: test_console_parser
+Class: TestConsoleParser
+Example:
+    `python3 -m unittest tests/test_console_parser.py`
+"""
+import shlex
+from unittest import TestCase
+import console_parser
+from console_parser import Call, parse_call, parse_query, tokenize
+
+
+class TestConsoleParser(TestCase):
+    """Test the functions of console_parser"""
+
+    def setUp(self):
+        console_parser.cache_clear()
+
+    def test_tokenize(self):
+        """Test that tokenize splits like shlex.split"""
+        for line in ('show Place 1', '  all  ', '', 'update Place 1 name '
+                     '"Betty Holberton"', "update Place 1 name 'a\"b'",
+                     r'update Place 1 name a\ b'):
+            self.assertEqual(tokenize(line), tuple(shlex.split(line)))
+        with self.assertRaises(ValueError):
+            tokenize('show Place "1')
+
+    def test_parse_call(self):
+        """Test the class, method and arguments of a call"""
+        self.assertEqual(parse_call('Place.show("1")'),
+                         Call('Place', 'show', 'show("1")', ('1',)))
+        self.assertEqual(parse_call('Place.all()').args, ())
+        self.assertEqual(parse_call(
+            "User.update('1', \"first_name\", Betty Holberton)").args,
+            ('1', 'first_name', 'Betty Holberton'))
+        self.assertEqual(parse_call('User.show("a,b", 2, )').args,
+                         ('a,b', '2'))
+        self.assertEqual(parse_call(
+            'Place.update("1", {"name": "Loft", "rooms": 2})').args,
+            ('1', {'name': 'Loft', 'rooms': 2}))
+        call = parse_call('Place.where(max_guest__gte=2).limit(3)')
+        self.assertEqual((call.method, call.expression, call.args),
+                         ('where', 'where(max_guest__gte=2).limit(3)', None))
+        self.assertIsNone(parse_call('all Place'))
+        self.assertIsNone(parse_call('Place.show'))
+
+    def test_cache(self):
+        """Test that a line is parsed once and that the values that can be
+        changed are not shared"""
+        line = 'Place.update("1", {"amenity_ids": []})'
+        first = parse_call(line)
+        first.args[1]['amenity_ids'].append('x')
+        self.assertEqual(parse_call(line).args[1], {'amenity_ids': []})
+        self.assertEqual(console_parser._parse_call.cache_info().hits, 1)
+        calls = parse_query('where(city_id__in=["a"])')
+        calls[0][2]['city_id__in'].append('b')
+        self.assertEqual(parse_query('where(city_id__in=["a"])'),
+                         [('where', [], {'city_id__in': ['a']})])
+        with self.assertRaises(ValueError):
+            parse_query('limit(2)')
+
+    def test_shapes(self):
+        """Test that the lines differing by their ids and quoted strings
+        share one parse, with their own values put back"""
+        ids = ('eaa3243e-b076-484c-af44-71c3525eeb07',
+               '0f1e2d3c-4b5a-4978-8695-a4b3c2d1e0f9')
+        for obj_id in ids:
+            self.assertEqual(tokenize(f'update Place {obj_id} name '
+                                      f'"Loft {obj_id[0]}"'),
+                             ('update', 'Place', obj_id, 'name',
+                              f'Loft {obj_id[0]}'))
+            self.assertEqual(parse_call(f'Place.show({obj_id})'),
+                             Call('Place', 'show', f'show({obj_id})',
+                                  (obj_id,)))
+            self.assertEqual(parse_call(
+                f"Place.update(\"{obj_id}\", {{'name': 'a,{obj_id[0]}'}})"
+            ).args, (obj_id, {'name': f'a,{obj_id[0]}'}))
+            self.assertEqual(parse_query(f'where(city_id="{obj_id}", '
+                                         f'name__in=["x", "{obj_id[0]}"])'),
+                             [('where', [], {'city_id': obj_id,
+                                             'name__in': ['x', obj_id[0]]})])
+        for function in (console_parser._tokenize,
+                         console_parser._parse_call,
+                         console_parser._parse_query):
+            self.assertEqual(function.cache_info().currsize,
+                             2 if function is console_parser._parse_call
+                             else 1)
+            self.assertGreaterEqual(function.cache_info().hits, 1)
+
+    def test_unshaped(self):
+        """Test the lines that are parsed as they are: backslashes,
+        strings glued to a word, bare ids in a query, and errors"""
+        for line in (r'update Place 1 name "a\"b"', "update Place 1 it's",
+                     'update Place 1 name ab"c d"'):
+            with self.subTest(line=line):
+                try:
+                    expected = tuple(shlex.split(line))
+                except ValueError:
+                    with self.assertRaises(ValueError):
+                        tokenize(line)
+                else:
+                    self.assertEqual(tokenize(line), expected)
+        self.assertEqual(parse_query('where(name=b"x")'),
+                         [('where', [], {'name': b'x'})])
+        with self.assertRaisesRegex(ValueError, 'malformed'):
+            parse_query('where(id=00000000-0000-0000-0000-000000000000)')
+        with self.assertRaisesRegex(SyntaxError, 'invalid'):
+            parse_query('where(name="x" "y" +)')
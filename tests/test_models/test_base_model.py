@@ -1,30 +1,30 @@
 #!/usr/bin/env python3
+import os
 from unittest import TestCase
+from unittest.mock import patch
+import models
 from models.base_model import BaseModel
-#from models.engine.file_storage import FileStorage
+from models.engine.file_storage import FileStorage
 from datetime import datetime
 
 
-# FileStorage._FileStorage__file_path = 'test_file.json'
-
-
 class TestBaseModel(TestCase):
     """Unittest testing for the BaseModel class"""
 
-    # def setUp(self):
-    #     """Create new instance of FileStorage for each test and reset
-    #     __objects attribute to an empty dictionary
-    #     """
-    #     self.storage = FileStorage()
-    #     self.storage._FileStorage__objects = {}
-
-    # def tearDown(self):
-    #     """Delete the JSON file that is created by a test"""
-    #     from os import path, remove
+    def setUp(self):
+        """Save the instances of each test to a new FileStorage over a
+        test file
+        """
+        for patcher in (patch.object(FileStorage, '_FileStorage__file_path',
+                                     'test_file.json'),
+                        patch.object(models, 'storage', FileStorage())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
 
-    #     json_file = self.storage._FileStorage__file_path
-    #     if path.isfile(json_file):
-    #         remove(json_file)
+    def tearDown(self):
+        """Delete the JSON file that is created by a test"""
+        if os.path.isfile('test_file.json'):
+            os.remove('test_file.json')
 
     def test_uuid(self):
         """Test if uuid is a string and also unique"""
@@ -94,3 +94,25 @@ class TestBaseModel(TestCase):
         bm.save()
         self.assertNotEqual(bm.updated_at, old_updated_at)
         self.assertGreater(bm.updated_at, old_updated_at)
+
+    def test_setattr_marks_changed(self):
+        """Verify that setting an attribute lets the storage know that the
+        instance has to be serialized again"""
+        bm = BaseModel()
+        models.storage.save()
+        bm.name = "changed"
+        journal = getattr(models.storage,
+                          f'_{type(models.storage).__name__}__journal')
+        self.assertEqual(journal.get(f'BaseModel.{bm.id}'), 'put')
+
+    def test_save_after_delete(self):
+        """Verify that saving a destroyed instance does not store it again"""
+        bm = BaseModel()
+        bm.save()
+        models.storage.delete(bm)
+        bm.save()
+        self.assertNotIn(f'BaseModel.{bm.id}', models.storage.all())
+        self.assertEqual(models.storage.find_range(BaseModel, 'id'), [])
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(storage.count(BaseModel), 0)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Module: test_compact
+
+Unit test for the compact variants of the model classes.
+"""
+import os
+import pickle
+import subprocess
+import sys
+from unittest import TestCase
+from models.base_model import BaseModel
+from models.compact import compact, declared_attributes
+from models.place import Place
+from models.user import User
+
+
+class TestCompact(TestCase):
+    """Test the classes built by compact()"""
+
+    def setUp(self):
+        self.CompactPlace = compact(Place)
+
+    def test_class(self):
+        """Test that the compact class stands in for the regular one"""
+        place = self.CompactPlace()
+        self.assertEqual(self.CompactPlace.__name__, 'Place')
+        self.assertIsInstance(place, Place)
+        self.assertEqual(str(place)[:8], '[Place] ')
+        with self.assertRaises(TypeError):
+            compact(dict)
+
+    def test_declared_attributes(self):
+        """Test that the declared attributes become slots"""
+        self.assertEqual(declared_attributes(User),
+                         ('id', 'created_at', 'updated_at', 'email',
+                          'password', 'first_name', 'last_name'))
+        self.assertIn('price_by_night', self.CompactPlace.__slots__)
+
+    def test_defaults(self):
+        """Test that unset declared attributes read as the class default"""
+        place = self.CompactPlace()
+        self.assertEqual(place.city_id, '')
+        self.assertEqual(place.max_guest, 0)
+        self.assertNotIn('max_guest', place.__dict__)
+        with self.assertRaises(AttributeError):
+            place.nope
+
+    def test_class_default(self):
+        """Test that class_default returns the default the slot hides"""
+        self.assertEqual(self.CompactPlace.class_default('max_guest'), 0)
+        self.assertEqual(self.CompactPlace.class_default('amenity_ids'), [])
+        self.assertIsNone(self.CompactPlace.class_default('id'))
+        self.assertEqual(self.CompactPlace.class_default('nope', 1), 1)
+        self.assertEqual(Place.class_default('max_guest'), 0)
+
+    def test_pickle(self):
+        """Test that the class shows the module of the model and that its
+        instances can be pickled"""
+        self.assertIs(compact(Place), self.CompactPlace)
+        self.assertEqual(self.CompactPlace.__module__, 'models.place')
+        place = self.CompactPlace()
+        place.name = 'Loft'
+        place.pool = True
+        copy = pickle.loads(pickle.dumps(place))
+        self.assertIs(copy.__class__, self.CompactPlace)
+        self.assertEqual(copy.to_dict(), place.to_dict())
+
+    def test_storage_suites(self):
+        """Test that the tests of the storage engines pass with compact
+        instances"""
+        env = dict(os.environ, HBNB_COMPACT='1')
+        result = subprocess.run(
+            [sys.executable, '-m', 'unittest', '-q',
+             'tests.test_models.test_engine.test_file_storage',
+             'tests.test_models.test_engine.test_db_storage',
+             'tests.test_console'],
+            env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+
+    def test_dynamic_attributes(self):
+        """Test that undeclared attributes go to the overflow dictionary"""
+        place = self.CompactPlace()
+        place.max_guest = 4
+        place.pool = True
+        self.assertEqual(place.pool, True)
+        self.assertEqual(place.__dict__['max_guest'], 4)
+        self.assertEqual(place.__dict__['pool'], True)
+        del place.pool
+        self.assertNotIn('pool', place.__dict__)
+
+    def test_dict_update(self):
+        """Test that updating __dict__ sets the attributes"""
+        place = self.CompactPlace()
+        place.__dict__.update({'name': 'Loft', 'wifi': 'yes'})
+        self.assertEqual(place.name, 'Loft')
+        self.assertEqual(place.wifi, 'yes')
+
+    def test_to_dict_round_trip(self):
+        """Test that to_dict and the kwargs constructor agree"""
+        place = self.CompactPlace()
+        place.name = 'Loft'
+        place.pool = True
+        place_dict = place.to_dict()
+        self.assertEqual(place_dict['name'], 'Loft')
+        self.assertEqual(place_dict['pool'], True)
+        self.assertEqual(place_dict['__class__'], 'Place')
+        copy = self.CompactPlace(**place_dict)
+        self.assertEqual(copy.to_dict(), place_dict)
+        self.assertEqual(Place(**place_dict).to_dict(), place_dict)
+
+    def test_base_model(self):
+        """Test that BaseModel itself can be made compact"""
+        bm = compact(BaseModel)()
+        self.assertEqual(set(bm.__dict__),
+                         {'id', 'created_at', 'updated_at'})
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""Tests shared by every storage engine
+
+Module: storage_tests
+Class: StorageContract
+
+The test cases of each engine inherit from StorageContract and set the
+engine class and the file it uses for the tests; every test runs against
+an empty engine, self.storage.
+"""
+import os
+from unittest.mock import patch
+from uuid import UUID
+
+import models
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+
+
+class StorageContract:
+    """Tests of the interface that console.py and the models rely on
+
+    Attributes:
+        engine (type): the storage class under test
+        file_path (str): the file of the engine during the tests
+    """
+    engine = None
+    file_path = None
+
+    def setUp(self):
+        """Run every test against an empty engine over self.file_path"""
+        patcher = patch.object(self.engine,
+                               f'_{self.engine.__name__}__file_path',
+                               self.file_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storages = []
+        self.storage = self.make_storage()
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+        for path in (self.file_path, self.file_path + '.log',
+                     self.file_path + '.log.compacting'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def make_storage(self):
+        """Returns a new storage over the same data as self.storage"""
+        storage = self.engine()
+        storage.reload()
+        self.storages.append(storage)
+        return storage
+
+    def test_all(self):
+        """Test that all returns a dictionary of the stored objects"""
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.assertIsInstance(self.storage.all(), dict)
+        self.assertIs(self.storage.all()[f'BaseModel.{bm.id}'], bm)
+
+    def test_new(self):
+        """Ensure that it correctly set __objects to the obj instance or
+        dictionary, with a key <obj class name>.id
+        """
+        bm = BaseModel()
+
+        self.storage.new(bm)  # store the object
+        key = f'{bm.__class__.__name__}.{bm.id}'
+        self.assertTrue(self.storage.all().__contains__(key))
+        self.assertEqual(self.storage.all()[key], bm)
+
+    def test_save(self):
+        """Test ensures that it saves the data set in the file"""
+        bm1 = BaseModel()
+
+        self.storage.new(bm1)
+        self.storage.save()
+
+        self.assertTrue(os.path.exists(self.file_path))
+        self.assertTrue(os.path.getsize(self.file_path) > 0)
+
+    def test_reload(self):
+        """Test if it correctly deserializes the file to __objects"""
+
+        bm1 = BaseModel()
+        self.storage.new(bm1)  # __objects is changed to it previous state
+
+        obj_prev_state = self.storage.all().copy()
+        self.storage.save()  # write the object to the file
+
+        bm2 = BaseModel()
+        self.storage.new(bm2)
+        self.storage.reload()  # override
+
+        self.assertEqual(obj_prev_state.keys(), self.storage.all().keys())
+        self.assertIsInstance(self.storage.all(), dict)
+
+    def test_delete(self):
+        """Test that delete removes the object from __objects"""
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.delete(bm)
+        self.assertNotIn(f'BaseModel.{bm.id}', self.storage.all())
+        self.storage.delete(None)  # nothing to delete
+
+    def test_all_by_class(self):
+        """Test that all(cls) only returns the objects of cls"""
+        user = User()
+        self.storage.new(user)
+        self.storage.new(State())
+        self.assertEqual(self.storage.all(User), {f'User.{user.id}': user})
+        self.assertEqual(self.storage.all('City'), {})
+
+    def test_count(self):
+        """Test that count follows new and delete"""
+        users = [User() for _ in range(3)]
+        for user in users:
+            self.storage.new(user)
+        self.storage.delete(users[0])
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertEqual(self.storage.count('State'), 0)
+
+    def test_get_and_exists(self):
+        """Test that get and exists find an instance by class and id"""
+        user = User()
+        self.storage.new(user)
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.assertIsNone(self.storage.get(State, user.id))
+        self.assertTrue(self.storage.exists('User', user.id))
+        self.assertFalse(self.storage.exists(User, 'nope'))
+
+    def test_save_and_reload(self):
+        """Test that saved objects are read back by another storage"""
+        user = User()
+        user.email = 'hbnb@example.com'
+        state = State()
+        self.storage.new(user)
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.save()
+
+        storage = self.make_storage()
+        self.assertEqual(storage.count(), 1)
+        self.assertEqual(storage.get(User, user.id).to_dict(),
+                         user.to_dict())
+
+    def test_reload_discards_unsaved(self):
+        """Test that reload forgets the changes that were not saved"""
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        self.storage.new(BaseModel())
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), [f'BaseModel.{bm.id}'])
+
+    def test_touch(self):
+        """Test that a touched object is saved again"""
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        self.storage.touch(user, 'first_name', 'Betty')
+        user.__dict__['first_name'] = 'Betty'
+        self.storage.save()
+        self.assertEqual(self.make_storage().get(User, user.id).first_name,
+                         'Betty')
+
+    def test_render(self):
+        """Test that render returns str(obj), formatted again once obj
+        changed"""
+        user = User()
+        self.assertEqual(self.storage.render(user), str(user))
+        self.storage.new(user)
+        text = self.storage.render(user)
+        self.assertIs(self.storage.render(user), text)
+        self.storage.touch(user, 'first_name', 'Betty')
+        user.__dict__['first_name'] = 'Betty'
+        self.assertEqual(self.storage.render(user), str(user))
+        self.assertIn('Betty', self.storage.render(user))
+        self.storage.delete(user)
+        user.__dict__['first_name'] = 'Ada'
+        self.assertIn('Ada', self.storage.render(user))
+
+    def test_to_json(self):
+        """Test that to_json returns the JSON of obj.to_dict(), also once
+        obj changed after a save"""
+        user = User()
+        self.storage.new(user)
+        self.assertEqual(self.storage.codec.loads(self.storage.to_json(user)),
+                         user.to_dict())
+        self.storage.save()
+        self.storage.touch(user, 'first_name', 'Betty')
+        user.__dict__['first_name'] = 'Betty'
+        self.assertEqual(self.storage.codec.loads(self.storage.to_json(user)),
+                         user.to_dict())
+
+    def test_find_follows_changes(self):
+        """Test that find follows new, attribute updates and delete"""
+        state = State()
+        city1 = City()
+        city2 = City()
+        city1.state_id = state.id
+        self.storage.new(city1)
+        self.storage.new(city2)
+        self.assertEqual(self.storage.find(City, 'state_id', state.id),
+                         [city1])
+
+        self.storage.new(state)
+        city2.state_id = state.id  # touches the global storage
+        self.storage.touch(city2, 'state_id', state.id)
+        self.assertCountEqual(self.storage.find('City', 'state_id', state.id),
+                              [city1, city2])
+
+        self.storage.delete(city1)
+        self.assertEqual(self.storage.find(City, 'state_id', state.id),
+                         [city2])
+        # attributes without index are scanned
+        self.assertEqual(self.storage.find(State, 'id', state.id), [state])
+
+    def test_find_after_reload(self):
+        """Test that the indexes are rebuilt by reload"""
+        user = User()
+        user.email = 'hbnb@example.com'
+        self.storage.new(user)
+        self.storage.save()
+        self.storage.reload()
+
+        found = self.storage.find(User, 'email', 'hbnb@example.com')
+        self.assertEqual([obj.id for obj in found], [user.id])
+        self.assertIsNot(found[0], user)
+
+    def test_find(self):
+        """Test that find returns the objects holding a value"""
+        state = State()
+        cities = [City(), City(), City()]
+        cities[0].state_id = cities[1].state_id = state.id
+        for city in cities:
+            self.storage.new(city)
+        self.assertCountEqual(self.storage.find(City, 'state_id', state.id),
+                              cities[:2])
+        self.assertEqual(self.storage.find(City, 'state_id', ''),
+                         cities[2:])
+        self.storage.delete(cities[0])
+        self.assertEqual(self.storage.find('City', 'state_id', state.id),
+                         cities[1:2])
+
+    def test_new_many(self):
+        """Test that new_many stores the instances like new(), for the
+        searches and the saves"""
+        city = City()
+        city.state_id = 'a'
+        self.storage.new(city)
+        users = [User() for _ in range(3)]
+        cities = [City() for _ in range(2)]
+        for obj in cities:
+            obj.state_id = 'a'
+        self.assertEqual(self.storage.new_many(users + cities), 5)
+        self.assertEqual(self.storage.count(User), 3)
+        self.assertCountEqual(self.storage.find(City, 'state_id', 'a'),
+                              cities + [city])
+        self.storage.save()
+        storage = self.make_storage()
+        self.assertEqual(storage.count(), 6)
+        self.assertEqual(storage.get(User, users[2].id).to_dict(),
+                         users[2].to_dict())
+
+    def test_bulk_create(self):
+        """Test that bulk_create stores and saves instances with their own
+        ids, a shared timestamp and their own copy of the attributes"""
+        with patch.object(models, 'storage', self.storage):
+            places = Place.bulk_create(100, city_id='a', amenity_ids=['x'])
+        self.assertEqual(len(self.storage.find(Place, 'city_id', 'a')), 100)
+        storage = self.make_storage()
+        self.assertEqual(storage.count(Place), 100)
+        self.assertEqual(len({place.id for place in places}), 100)
+        self.assertTrue(all(str(UUID(place.id, version=4)) == place.id
+                            for place in places))
+        self.assertEqual({place.created_at for place in places},
+                         {places[0].updated_at})
+        places[0].amenity_ids.append('y')
+        self.assertEqual(places[1].amenity_ids, ['x'])
+        self.assertEqual(storage.get(Place, places[0].id).to_dict(),
+                         {**places[1].to_dict(), 'id': places[0].id})
+
+    def make_places(self):
+        """Stores four places of two cities, priced 50 to 200"""
+        places = []
+        for city_id, price in (('a', 200), ('b', 50), ('a', 100),
+                               ('a', 50)):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = price
+            self.storage.new(place)
+            places.append(place)
+        return places
+
+    def test_query(self):
+        """Test that a query filters, sorts and pages the instances"""
+        places = self.make_places()
+        self.storage.new(City())
+        query = self.storage.query(Place).where(price_by_night__lt=150,
+                                                city_id='a')
+        self.assertCountEqual(query.all(), places[2:])
+        self.assertEqual(query.order_by('price_by_night').all(),
+                         [places[3], places[2]])
+        self.assertEqual(self.storage.query('Place')
+                         .order_by('-price_by_night', 'city_id')
+                         .offset(1).limit(2).all(), [places[2], places[3]])
+        self.assertEqual(query.count(), 2)
+        self.assertEqual(self.storage.query(Place).count(), 4)
+        self.assertIsNone(query.where(name__startswith='x').first())
+        self.assertEqual(self.storage.query(Place).where(
+            city_id__in=['b', 'c']).all(), places[1:2])
+
+    def test_find_range(self):
+        """Test that find_range returns the objects in a range, in
+        order"""
+        places = self.make_places()
+        place = Place()  # holds the class default, 0
+        self.storage.new(place)
+        self.assertEqual(self.storage.find_range(Place, 'price_by_night',
+                                                 60, 200),
+                         [places[2], places[0]])
+        self.assertEqual(self.storage.find_range(
+            'Place', 'price_by_night', high=50, include_high=False),
+            [place])
+        self.assertEqual(self.storage.find_range(
+            Place, 'price_by_night', low=100, reverse=True, limit=1),
+            places[:1])
+        self.assertEqual(self.storage.find_range(
+            Place, 'updated_at', low=places[3].updated_at),
+            [places[3], place])
+        self.assertEqual(self.storage.find_range(Place, 'name', 'a', 'z'),
+                         [])
+
+    def test_ids_indexed(self):
+        """Test that the ids of every class are indexed in order, for the
+        pages of the console, from the start"""
+        for class_name in models.classes:
+            self.assertTrue(self.storage.indexed(class_name, 'id',
+                                                 ordered=True))
+
+    def test_find_range_page(self):
+        """Test that find_range with string bounds and a limit returns the
+        first strings of the range only"""
+        users = sorted((User() for _ in range(6)), key=lambda obj: obj.id)
+        users[5].id = 7  # not a string, never in a range of strings
+        for user in users:
+            self.storage.new(user)
+        self.assertEqual(self.storage.find_range(
+            User, 'id', low=users[1].id, include_low=False, limit=2),
+            users[2:4])
+        self.assertEqual(self.storage.find_range(
+            User, 'id', high=users[3].id, reverse=True, limit=3),
+            users[1:4][::-1])
+        self.assertEqual(self.storage.find_range(
+            User, 'id', low=users[2].id, limit=10), users[2:5])
+
+    def test_query_ranges(self):
+        """Test that a query on ranges and order gives the results of a
+        scan"""
+        places = self.make_places()
+        self.assertEqual(self.storage.query(Place).where(
+            price_by_night__gt=50, price_by_night__lte=200)
+            .order_by('-price_by_night').all(), [places[0], places[2]])
+        self.assertEqual(self.storage.query(Place).where(
+            updated_at__gte=places[2].updated_at).order_by('updated_at')
+            .all(), places[2:])
+        self.assertEqual(self.storage.query(Place).order_by('-updated_at')
+                         .limit(2).all(), [places[3], places[2]])
+
+    def test_find_near(self):
+        """Test the searches on the coordinates of places"""
+        coords = ((37.7749, -122.4194), (37.8044, -122.2712),
+                  (34.0522, -118.2437))
+        places = []
+        for lat, lon in coords:
+            place = Place()
+            place.latitude = lat
+            place.longitude = lon
+            self.storage.new(place)
+            places.append(place)
+        self.storage.new(Place())  # at the default 0.0, 0.0: no location
+        self.assertEqual(self.storage.find_within(Place, 37.78, -122.41,
+                                                  20), places[:2])
+        self.assertEqual(self.storage.find_nearest('Place', 35, -119, 2),
+                         [places[2], places[1]])
+        self.assertCountEqual(self.storage.find_in_box(
+            Place, 37, -123, 38, -122), places[:2])
+        self.assertEqual(self.storage.find_within(Place, 0, 0, 10), [])
+        self.assertCountEqual(self.storage.find_nearest(Place, 0, 0, 4),
+                              places)
+
+    def test_aggregate(self):
+        """Test the aggregates of the attributes of places, by group"""
+        places = self.make_places()
+        places[1].latitude = True  # not a number
+        self.storage.new(places[1])
+        self.assertEqual(self.storage.aggregate(Place, 'count'), 4)
+        self.assertEqual(self.storage.aggregate(Place, 'sum',
+                                                'price_by_night'), 400.0)
+        self.assertEqual(self.storage.aggregate(
+            Place, 'mean', 'price_by_night', by='city_id'),
+            {'a': 350 / 3, 'b': 50.0})
+        self.assertEqual(self.storage.aggregate(
+            'Place', 'count', 'latitude', by='city_id'), {'a': 3})
+        self.assertIsNone(self.storage.aggregate(Place, 'min', 'name'))
+        places[0].price_by_night = 20
+        self.storage.new(places[0])
+        self.storage.delete(places[1])
+        self.assertEqual(self.storage.aggregate(
+            Place, 'min', 'price_by_night', by='city_id'), {'a': 20.0})
+        self.assertEqual(self.storage.aggregate(
+            Place, 'max', 'price_by_night', 'name'), {'': 100.0})
+        with self.assertRaises(ValueError):
+            self.storage.aggregate(Place, 'median', 'price_by_night')
+
+    def test_related(self):
+        """Test that the relationships and their prefetch follow the ids,
+        and the changes made after the prefetch"""
+        state = State()
+        city = City()
+        city.state_id = state.id
+        places = []
+        for _ in range(2):
+            place = Place()
+            place.city_id = city.id
+            places.append(place)
+        amenity = Amenity()
+        places[0].amenity_ids = [amenity.id]
+        for obj in [state, city, amenity] + places:
+            self.storage.new(obj)
+        self.assertEqual(self.storage.related(state, 'cities'), [city])
+        self.assertEqual(self.storage.related(city, 'state'), state)
+        self.assertEqual(self.storage.related(places[0], 'amenities'),
+                         [amenity])
+        self.assertEqual(self.storage.related(amenity, 'places'),
+                         places[:1])
+        self.assertEqual(self.storage.find_containing(Place, 'amenity_ids',
+                                                      amenity.id),
+                         places[:1])
+        self.assertEqual(self.storage.prefetch([state],
+                                               'cities.places.amenities'),
+                         [state])
+        self.assertCountEqual(self.storage.related(city, 'places'), places)
+        self.storage.delete(places[1])
+        self.assertEqual(self.storage.related(city, 'places'), places[:1])
+        self.assertEqual(self.storage.related(places[1], 'reviews'), [])
+        with self.assertRaises(ValueError):
+            self.storage.prefetch([state], 'cities.name')
+
+    def test_query_is_lazy(self):
+        """Test that a query reads the storage when it is iterated"""
+        query = self.storage.query(Place).where(city_id='a')
+        self.assertEqual(query.all(), [])
+        places = self.make_places()
+        self.assertCountEqual(query, [places[0], places[2], places[3]])
+        with self.assertRaises(ValueError):
+            query.where(price_by_night__near=1)
+
+    def test_batch(self):
+        """Test that a batch saves once, at the end of the block"""
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        with self.storage.batch():
+            state = State()
+            self.storage.new(state)
+            self.storage.save()
+            with self.storage.batch():  # nested blocks join the outer one
+                self.storage.delete(user)
+            self.assertEqual(self.make_storage().count(), 1)
+            self.assertTrue(self.make_storage().exists(User, user.id))
+        storage = self.make_storage()
+        self.assertEqual(list(storage.all()), [f'State.{state.id}'])
+
+    def test_batch_rollback(self):
+        """Test that a block that raises leaves the objects as they were"""
+        user = User()
+        user.__dict__['first_name'] = 'Betty'
+        kept = State()
+        self.storage.new(user)
+        self.storage.new(kept)
+        self.storage.save()
+        with self.assertRaises(KeyError):
+            with self.storage.batch():
+                self.storage.touch(user, 'first_name', 'Holberton')
+                user.__dict__['first_name'] = 'Holberton'
+                user.__dict__['last_name'] = 'School'
+                self.storage.delete(kept)
+                self.storage.new(City())
+                self.storage.count()  # writes the changes so far
+                raise KeyError('abort')
+
+        self.assertEqual(user.first_name, 'Betty')
+        self.assertNotIn('last_name', user.__dict__)
+        self.assertIs(self.storage.get(State, kept.id), kept)
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.count(City), 0)
+        self.storage.save()
+        storage = self.make_storage()
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.get(User, user.id).first_name, 'Betty')
+
+    def test_batch_rollback_in_place(self):
+        """Test that a block that raises restores the lists changed in
+        place"""
+        place = Place()
+        place.__dict__['amenity_ids'] = ['a']
+        self.storage.new(place)
+        self.storage.save()
+        with self.assertRaises(KeyError):
+            with self.storage.batch():
+                self.storage.touch(place, 'name', 'Loft')
+                place.__dict__['name'] = 'Loft'
+                place.amenity_ids.append('b')
+                raise KeyError('abort')
+        self.assertEqual(place.amenity_ids, ['a'])
+        self.assertEqual(place.name, '')
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Unit Test for the JSON codecs
+
+Module: test_codec
+Class: TestCodec
+"""
+import json
+from datetime import datetime
+from unittest import TestCase
+from models.engine.codec import CODECS, get_codec
+from models.place import Place
+
+
+class TestCodec(TestCase):
+    """Test every codec available in the environment"""
+
+    def test_default_codec(self):
+        """Test that the fastest installed codec is the default"""
+        for name in ('orjson', 'ujson', 'json'):
+            if name in CODECS:
+                self.assertIs(get_codec(), CODECS[name])
+                break
+
+    def test_unknown_codec(self):
+        """Test that asking for an unknown codec raises ValueError"""
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_compact_output(self):
+        """Test that the output has no whitespace between tokens"""
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(codec.dumps({'a': [1, 2], 'b': 'c'}),
+                                 '{"a":[1,2],"b":"c"}')
+
+    def test_datetime(self):
+        """Test that datetimes are encoded like datetime.isoformat()"""
+        values = [datetime(2024, 5, 13, 11, 56, 30, 92401),
+                  datetime(2024, 5, 13, 11, 56, 30)]
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(codec.loads(codec.dumps(values)),
+                                 [value.isoformat() for value in values])
+
+    def test_dumps_instance(self):
+        """Test that dumps_instance encodes the to_dict() form"""
+        place = Place()
+        place.amenity_ids = ['a', 'b']
+        place.price_by_night = 100
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                text = codec.dumps_instance(place)
+                self.assertEqual(json.loads(text), place.to_dict())
+                self.assertEqual(codec.loads(text), place.to_dict())
+
+    def test_big_integers(self):
+        """Test that integers over 64 bits are still encoded"""
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(json.loads(codec.dumps([2 ** 70])),
+                                 [2 ** 70])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Unit Test for the ColumnStore class
+
+Module: test_columnar
+Class: TestColumnStore
+"""
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+from math import isnan
+from models.engine import columnar
+from models.engine.columnar import ColumnStore
+from models.place import Place
+
+
+class TestColumnStore(TestCase):
+    """Test ColumnStore class"""
+
+    def setUp(self):
+        self.places = []
+        for city_id, price, guests in (('a', 200, 2), ('b', 50, 4),
+                                       ('a', 100, 4), ('c', 'free', 1)):
+            place = Place()
+            place.__dict__.update(city_id=city_id, price_by_night=price,
+                                  max_guest=guests)
+            self.places.append(place)
+        self.columns = ColumnStore(self.items(self.places))
+
+    @staticmethod
+    def items(places):
+        return [(f'Place.{place.id}', place) for place in places]
+
+    def test_columns(self):
+        """Test the number and dictionary columns"""
+        numbers = list(self.columns.numbers('price_by_night'))
+        self.assertEqual(numbers[:3], [200.0, 50.0, 100.0])
+        self.assertTrue(isnan(numbers[3]))
+        codes, values = self.columns.labels('city_id')
+        self.assertEqual(list(codes), [0, 1, 0, 2])
+        self.assertEqual(values, ['a', 'b', 'c'])
+        self.assertEqual(len(self.columns), 4)
+
+    def test_aggregate(self):
+        """Test the functions, with and without groups"""
+        columns = self.columns
+        self.assertEqual(columns.aggregate('count'), 4)
+        self.assertEqual(columns.aggregate('count', 'price_by_night'), 3)
+        self.assertEqual(columns.aggregate('sum', 'price_by_night'), 350.0)
+        self.assertEqual(columns.aggregate('mean', 'price_by_night',
+                                           by='city_id'),
+                         {'a': 150.0, 'b': 50.0})
+        self.assertEqual(columns.aggregate('max', 'price_by_night',
+                                           by='max_guest'),
+                         {2: 200.0, 4: 100.0})
+        self.assertEqual(columns.aggregate('count', by='max_guest'),
+                         {2: 1, 4: 2, 1: 1})
+        self.assertIsNone(columns.aggregate('mean', 'name'))
+        with self.assertRaises(ValueError):
+            columns.aggregate('sum')
+
+    def test_changes(self):
+        """Test that the rows of the changed instances are read again, and
+        that deleted rows are replaced by the last one"""
+        self.columns.aggregate('sum', 'price_by_night', by='city_id')
+        first, second = self.places[:2]
+        first.__dict__['price_by_night'] = 10
+        self.columns.add(f'Place.{first.id}', first)
+        self.columns.discard(f'Place.{second.id}')
+        place = Place()
+        place.__dict__.update(city_id='d', price_by_night=5)
+        self.columns.add(f'Place.{place.id}', place)
+        self.assertEqual(self.columns.aggregate('sum', 'price_by_night',
+                                                by='city_id'),
+                         {'a': 110.0, 'd': 5.0})
+        codes, values = self.columns.labels('city_id')
+        self.assertEqual([values[code] for code in codes],
+                         ['a', 'c', 'a', 'd'])
+        self.columns.clear()
+        self.assertEqual(self.columns.aggregate('count'), 0)
+
+    def test_without_numpy(self):
+        """Test that the aggregations run without NumPy"""
+        expected = {function: self.columns.aggregate(
+            function, 'price_by_night', by='city_id')
+            for function in columnar.FUNCTIONS}
+        with patch.object(columnar, 'numpy', None):
+            for function, results in expected.items():
+                self.assertEqual(self.columns.aggregate(
+                    function, 'price_by_night', by='city_id'), results)
+            self.assertEqual(self.columns.aggregate('count'), 4)
+
+    @skipUnless(columnar.numpy, 'NumPy is not installed')
+    def test_numpy_matches_python(self):
+        """Test that the NumPy aggregations give the results of the Python
+        ones, with missing and non-numeric values"""
+        for place, score in zip(self.places, (4.5, None, True)):
+            place.__dict__['score'] = score  # the fourth has no score
+        self.columns.rebuild(self.items(self.places))
+        queries = [(function, attr, by) for function in columnar.FUNCTIONS
+                   for attr in ('price_by_night', 'score', 'name')
+                   for by in (None, 'city_id', 'max_guest')]
+        queries += [('count', None, None), ('count', None, 'city_id')]
+        results = [self.columns.aggregate(*query) for query in queries]
+        with patch.object(columnar, 'numpy', None):
+            expected = [self.columns.aggregate(*query) for query in queries]
+        for query, result, value in zip(queries, results, expected):
+            with self.subTest(query=query):
+                self.assertEqual(result, value)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Unit Test for DBStorage class
+
+Module: test_db_storage
+Class: TestDBStorage
+Example:
+    `python3 -m unittest tests/test_models/test_engine/test_db_storage.py`
+"""
+
+# related third party imports
+from unittest import TestCase
+from unittest.mock import patch
+# local imports
+from models.city import City
+from models.engine.db_storage import DBStorage
+from models.place import Place
+from models.state import State
+from tests.test_models.test_engine.storage_tests import StorageContract
+
+
+class TestDBStorage(StorageContract, TestCase):
+    """Run the storage tests against DBStorage"""
+    engine = DBStorage
+    file_path = 'test_file.db'
+
+    def test_find_uses_index(self):
+        """Test that find on an indexed attribute does not scan the table"""
+        conn = self.storage._DBStorage__conn
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT key, data FROM objects WHERE "
+            "class = 'City' AND json_extract(data, '$.state_id') = ?",
+            ('x',)).fetchall()
+        self.assertIn('ix_City_state_id', str(plan))
+
+    def test_find_range_reads_page(self):
+        """Test that find_range with a limit only builds the rows of the
+        page, with or without a bound"""
+        cities = sorted((City() for _ in range(20)), key=lambda obj: obj.id)
+        for city in cities:
+            self.storage.new(city)
+        self.storage.save()
+        storage = self.make_storage()
+        load = storage._DBStorage__load
+        for low, page in ((None, cities[:3]), (cities[9].id, cities[10:13])):
+            with self.subTest(low=low), \
+                    patch.object(storage, '_DBStorage__load',
+                                 side_effect=load) as loads:
+                found = storage.find_range(City, 'id', low=low,
+                                           include_low=False, limit=3)
+                self.assertEqual([obj.id for obj in found],
+                                 [obj.id for obj in page])
+                self.assertEqual(loads.call_count, 3)
+
+    def test_invalid_names(self):
+        """Test that names that are not identifiers are rejected"""
+        with self.assertRaises(ValueError):
+            self.storage.find(City, "state_id') OR 1 --", 'x')
+        with self.assertRaises(ValueError):
+            self.storage.add_index('City; DROP TABLE objects', 'name')
+
+    def test_prefetch_queries_by_level(self):
+        """Test that prefetch reads each level of the subtree with one
+        query, and related() answers from it afterwards"""
+        states = [State(), State()]
+        for state in states:
+            self.storage.new(state)
+            for _ in range(3):
+                city = City()
+                city.state_id = state.id
+                self.storage.new(city)
+                place = Place()
+                place.city_id = city.id
+                self.storage.new(place)
+        rows = self.storage._DBStorage__rows
+        with patch.object(self.storage, '_DBStorage__rows',
+                          side_effect=rows) as queries:
+            self.storage.prefetch(states, 'cities.places')
+            self.assertEqual(queries.call_count, 2)
+            for state in states:
+                for city in self.storage.related(state, 'cities'):
+                    self.assertEqual(len(self.storage.related(city,
+                                                              'places')), 1)
+            self.assertEqual(queries.call_count, 2)
+
+    def test_reads_leave_no_transaction(self):
+        """Test that a read sees the changes not saved yet without
+        leaving a transaction open"""
+        city = City()
+        city.name = 'Tulsa'
+        self.storage.new(city)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertEqual(self.storage.find(City, 'name', 'Tulsa'), [city])
+        self.assertFalse(self.storage._DBStorage__conn.in_transaction)
+        other = self.make_storage()
+        other.new(State())
+        other.save()
+        self.assertTrue(self.storage.refresh())
+        self.storage.save()
+        self.assertEqual(self.make_storage().count(), 2)
+
+    def test_refresh(self):
+        """Test that refresh reads again the objects changed by another
+        connection"""
+        city = City()
+        self.storage.new(city)
+        self.storage.save()
+        self.assertFalse(self.storage.refresh())
+        other = self.make_storage()
+        copy = other.get(City, city.id)
+        copy.name = 'Tulsa'
+        other.new(copy)
+        other.save()
+
+        self.assertTrue(self.storage.refresh())
+        self.assertEqual(self.storage.get(City, city.id).name, 'Tulsa')
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Unit Test for the crash-safe writes
+
+Module: test_durability
+Class: TestDurability
+"""
+import os
+from unittest import TestCase
+from unittest.mock import patch
+from models.engine.durability import SyncPolicy, atomic_write
+
+
+class TestDurability(TestCase):
+    """Test atomic_write() with every fsync policy"""
+
+    path = 'test_durability.json'
+
+    def tearDown(self):
+        for path in (self.path, self.path + '.tmp'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def test_unknown_policy(self):
+        """Test that an unknown policy raises ValueError"""
+        with self.assertRaises(ValueError):
+            SyncPolicy('sometimes')
+
+    def test_atomic_write(self):
+        """Test that the file is replaced without a leftover temp file"""
+        atomic_write(self.path, '{"a":1}')
+        atomic_write(self.path, '{}')
+        with open(self.path, encoding='UTF-8') as file:
+            self.assertEqual(file.read(), '{}')
+        self.assertFalse(os.path.isfile(self.path + '.tmp'))
+
+    def test_crash_keeps_old_file(self):
+        """Test that a write that fails before the rename leaves the old
+        content"""
+        atomic_write(self.path, '{"a":1}')
+        with patch('models.engine.durability.os.replace',
+                   side_effect=OSError('crash')):
+            with self.assertRaises(OSError):
+                atomic_write(self.path, '{}')
+        with open(self.path, encoding='UTF-8') as file:
+            self.assertEqual(file.read(), '{"a":1}')
+
+    def test_pieces(self):
+        """Test that the content can be written piece by piece, and that a
+        failing producer leaves the old content and no temp file"""
+        written = []
+
+        def pieces():
+            for piece in ('{', '"a":1', '}'):
+                written.append(os.path.getsize(self.path + '.tmp'))
+                yield piece
+            raise OSError('crash')
+
+        atomic_write(self.path, iter(('{"a"', ':1}')))
+        with self.assertRaises(OSError):
+            atomic_write(self.path, pieces())
+        self.assertEqual(len(written), 3)
+        with open(self.path, encoding='UTF-8') as file:
+            self.assertEqual(file.read(), '{"a":1}')
+        self.assertFalse(os.path.isfile(self.path + '.tmp'))
+
+    def test_policies(self):
+        """Test the number of fsync() calls of every policy"""
+        for policy, count in (('none', 0), ('always', 2), ('group', 0)):
+            with self.subTest(policy=policy), \
+                    patch('models.engine.durability.os.fsync') as fsync:
+                atomic_write(self.path, '{}', SyncPolicy(policy))
+                self.assertEqual(fsync.call_count, count)
+
+    def test_group_flush(self):
+        """Test that the group policy flushes the file and its directory
+        on flush()"""
+        sync = SyncPolicy('group', interval=60000)
+        with patch('models.engine.durability.os.fsync') as fsync:
+            atomic_write(self.path, '{}', sync)
+            atomic_write(self.path, '{"a":1}', sync)
+            sync.flush()
+            self.assertEqual(fsync.call_count, 2)
+            sync.flush()  # nothing left to flush
+            self.assertEqual(fsync.call_count, 2)
+
+    def test_group_timer(self):
+        """Test that the group policy flushes after its interval"""
+        sync = SyncPolicy('group', interval=1)
+        with patch('models.engine.durability.os.fsync') as fsync:
+            atomic_write(self.path, '{}', sync)
+            sync._SyncPolicy__timer.join()
+            self.assertEqual(fsync.call_count, 2)
@@ -9,15 +9,36 @@ Example:
 """
 
 # standard library imports
+import json
 import os
+import shutil
+import subprocess
+import sys
+import threading
 # related third party imports
 from unittest import TestCase
+from unittest.mock import patch
 # local imports
+import models
 from models.base_model import BaseModel
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+from models.engine.durability import atomic_write
 from models.engine.file_storage import FileStorage
+from models.engine.index import AttributeIndex
+from models.engine.metrics import registry
+from tests.test_models.test_engine.storage_tests import StorageContract
 
 
-FileStorage._FileStorage__file_path = 'test_file.json'
+def use_test_paths(test):
+    """Points FileStorage at the files of the tests until test ends"""
+    for name, path in (('_FileStorage__file_path', 'test_file.json'),
+                       ('_FileStorage__shards_path', 'test_storage')):
+        patcher = patch.object(FileStorage, name, path)
+        patcher.start()
+        test.addCleanup(patcher.stop)
 
 
 class TestFileStorage(TestCase):
@@ -25,54 +46,893 @@ class TestFileStorage(TestCase):
         """Create new instance of FileStorage for each test and reset
         __objects attribute to an empty dictionary
         """
+        use_test_paths(self)
         self.storage = FileStorage()
         self.storage._FileStorage__objects = {}
 
     def tearDown(self):
         """Delete the JSON file that is created by a test"""
         json_file = self.storage._FileStorage__file_path
-        if os.path.isfile(json_file):
-            os.remove(json_file)
+        for path in (json_file, json_file + '.log',
+                     json_file + '.log.compacting'):
+            if os.path.isfile(path):
+                os.remove(path)
 
-    def test_all(self):
-        """Test vefies that all returns a dictionary of __objects"""
-        self.assertIsInstance(FileStorage().all(), dict)
+    def test_save_only_encodes_changed_objects(self):
+        """Test that save re-serializes only the objects that changed"""
+        bm1 = BaseModel()
+        bm2 = BaseModel()
+        self.storage.new(bm1)
+        self.storage.new(bm2)
+        self.storage.save()
 
-    def test_new(self):
-        """Ensure that it correctly set __objects to the obj instance or
-        dictionary, with a key <obj class name>.id
-        """
+        codec = self.storage.codec
+        with patch.object(codec, 'dumps_instance',
+                          side_effect=codec.dumps_instance) as dumps:
+            self.storage.save()
+            self.assertEqual(dumps.call_count, 0)
+            self.storage.new(bm1)
+            self.storage.save()
+            self.assertEqual(dumps.call_count, 1)
+
+        with open(self.storage._FileStorage__file_path,
+                  encoding='UTF-8') as file:
+            self.assertEqual(json.load(file),
+                             {f'BaseModel.{bm1.id}': bm1.to_dict(),
+                              f'BaseModel.{bm2.id}': bm2.to_dict()})
+
+    def test_touch(self):
+        """Test that setting an attribute marks the object as changed"""
         bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        self.assertEqual(self.storage._FileStorage__journal, {})
 
-        self.storage.new(bm)  # store the object
-        key = f'{bm.__class__.__name__}.{bm.id}'
-        self.assertTrue(self.storage.all().__contains__(key))
-        self.assertEqual(self.storage.all()[key], bm)
+        self.storage.touch(bm, 'name', 'Lagos')
+        self.assertEqual(self.storage._FileStorage__journal,
+                         {f'BaseModel.{bm.id}': 'put'})
+        # objects that are not stored are ignored
+        self.storage.touch(BaseModel(), 'name', 'Lagos')
+        self.assertEqual(len(self.storage._FileStorage__journal), 1)
 
-    def test_save(self):
-        """Test ensures that it saves the data set in the JSON file"""
-        bm1 = BaseModel()
+    def test_query_uses_index(self):
+        """Test that a query on an indexed attribute does not scan the
+        instances of the class"""
+        state = State()
+        city = City()
+        city.state_id = state.id
+        self.storage.new(city)
+        self.storage.new(City())
+        self.assertTrue(self.storage.indexed(City, 'state_id'))
+        self.assertFalse(self.storage.indexed(City, 'name'))
+        with patch.object(self.storage, 'all') as all_objects:
+            found = self.storage.query(City).where(state_id=state.id,
+                                                   name='').all()
+        all_objects.assert_not_called()
+        self.assertEqual(found, [city])
 
-        self.storage.new(bm1)
+    def test_query_uses_sorted_index(self):
+        """Test that ranges and orders on attributes with a sorted index
+        do not scan the instances of the class"""
+        places = []
+        for price in (300, 100, 200):
+            place = Place()
+            place.price_by_night = price
+            self.storage.new(place)
+            places.append(place)
+        self.assertTrue(self.storage.indexed(Place, 'price_by_night',
+                                             ordered=True))
+        self.assertFalse(self.storage.indexed(Place, 'city_id',
+                                              ordered=True))
+        with patch.object(self.storage, 'all') as all_objects:
+            cheap = self.storage.query(Place).where(
+                price_by_night__lt=250).order_by('-price_by_night').all()
+            latest = self.storage.query(Place).order_by('-updated_at') \
+                .limit(1).all()
+        all_objects.assert_not_called()
+        self.assertEqual(cheap, [places[2], places[1]])
+        self.assertEqual(latest, places[2:])
+
+    def test_geo_index_follows_touch(self):
+        """Test that the geospatial index follows new coordinates"""
+        place = Place()
+        self.storage.new(place)
+        self.assertEqual(self.storage.find_within(Place, 10, 20, 1), [])
+        self.storage.touch(place, 'latitude', 10.0)
+        place.__dict__['latitude'] = 10.0
+        self.storage.touch(place, 'longitude', 20.0)
+        place.__dict__['longitude'] = 20.0
+        with patch.object(self.storage, 'all') as all_objects:
+            self.assertEqual(self.storage.find_within(Place, 10, 20, 1),
+                             [place])
+        all_objects.assert_not_called()
+        self.storage.delete(place)
+        self.assertEqual(self.storage.find_nearest(Place, 10, 20), [])
+
+    def test_query_uses_member_index(self):
+        """Test that a contains condition on amenity_ids reads its index"""
+        place = Place()
+        self.storage.new(place)
+        self.storage.touch(place, 'amenity_ids', ['wifi'])
+        place.__dict__['amenity_ids'] = ['wifi']
+        self.assertTrue(self.storage.indexed(Place, 'amenity_ids',
+                                             members=True))
+        self.assertFalse(self.storage.indexed(Place, 'amenity_ids'))
+        with patch.object(self.storage, 'all') as all_objects:
+            self.assertEqual(self.storage.query(Place).where(
+                amenity_ids__contains='wifi').all(), [place])
+        all_objects.assert_not_called()
+
+    def test_prefetch_scans_once(self):
+        """Test that prefetch scans the cities once for every state when
+        state_id is not indexed, and related() answers from it until a
+        change"""
+        storage = FileStorage(indexes=None)
+        states = [State(), State()]
+        cities = []
+        for state in states:
+            storage.new(state)
+            city = City()
+            city.state_id = state.id
+            storage.new(city)
+            cities.append(city)
+        with patch.object(storage, 'all') as all_objects, \
+                patch.object(AttributeIndex, 'rebuild', autospec=True,
+                             side_effect=AttributeIndex.rebuild) as index:
+            storage.prefetch(states, 'cities')
+            self.assertEqual(index.call_count, 1)
+            self.assertEqual([storage.related(state, 'cities')
+                              for state in states],
+                             [[city] for city in cities])
+            self.assertEqual(index.call_count, 1)
+        all_objects.assert_not_called()
+        storage.touch(cities[0], 'state_id', states[1].id)
+        cities[0].__dict__['state_id'] = states[1].id
+        self.assertCountEqual(storage.related(states[1], 'cities'), cities)
+
+    def test_metrics(self):
+        """Test that save and reload record their latencies, objects and
+        bytes when the metrics are enabled"""
+        self.storage.new(User())
+        self.storage.new(State())
+        registry.reset()
+        registry.enable()
+        try:
+            self.storage.save()
+            FileStorage().reload()
+            snapshot = registry.snapshot()
+        finally:
+            registry.disable()
+            registry.reset()
+        size = os.path.getsize(self.storage._FileStorage__file_path)
+        self.assertEqual(snapshot['counters'], {
+            'storage.bytes_read': size, 'storage.bytes_written': size,
+            'storage.objects_encoded': 2, 'storage.objects_loaded': 2})
+        for name in ('storage.save', 'storage.encode', 'storage.write',
+                     'storage.reload'):
+            self.assertEqual(snapshot['latency_ms'][name]['count'], 1)
+
+    def test_new_many_indexes(self):
+        """Test that new_many keeps the sorted indexes in order, whether
+        it rebuilds them or adds to them, and that a batch undoes it"""
+        places = []
+        for price in (30, 10, 20, 60, 50, 40, 0):
+            place = Place()
+            place.price_by_night = price
+            places.append(place)
+        self.storage.new_many(places[:3])  # rebuilt
+        self.storage.new_many(places[3:4])  # added
+        self.storage.new_many(places[4:])  # rebuilt
+        self.assertEqual([place.price_by_night for place in
+                          self.storage.find_range(Place, 'price_by_night')],
+                         [0, 10, 20, 30, 40, 50, 60])
+        with self.assertRaises(KeyError):
+            with self.storage.batch():
+                self.storage.new_many([Place(), Place()])
+                raise KeyError('abort')
+        self.assertEqual(self.storage.count(Place), 7)
+        self.assertEqual(len(self.storage.find_range(Place, 'updated_at')),
+                         7)
+
+    def test_columns_follow_touch(self):
+        """Test that the columns of a class follow the changes made after
+        they are built"""
+        place = Place()
+        self.storage.new(place)
+        columns = self.storage.columns(Place)
+        self.assertEqual(self.storage.aggregate(Place, 'sum',
+                                                'max_guest'), 0)
+        self.storage.touch(place, 'max_guest', 3)
+        place.__dict__['max_guest'] = 3
+        with patch.object(self.storage, 'all') as all_objects:
+            self.assertEqual(self.storage.aggregate(Place, 'sum',
+                                                    'max_guest'), 3)
+        all_objects.assert_not_called()
+        self.assertIs(self.storage.columns(Place), columns)
         self.storage.save()
+        self.storage.reload()
+        self.assertEqual(self.storage.aggregate(Place, 'count'), 1)
+        self.assertEqual(len(columns), 1)
 
-        file = self.storage._FileStorage__file_path
-        self.assertTrue(os.path.exists(file))
-        self.assertTrue(os.path.getsize(file) > 0)
+    def test_add_index(self):
+        """Test that add_index indexes the objects already stored"""
+        storage = FileStorage(indexes=None)
+        storage._FileStorage__objects = {}
+        user = User()
+        user.first_name = 'Betty'
+        storage.new(user)
+        storage.add_index(User, 'first_name')
+        self.assertEqual(storage.find(User, 'first_name', 'Betty'), [user])
+
+    def test_save_is_atomic(self):
+        """Test that a save that fails keeps the previous file"""
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        self.storage.new(BaseModel())
+        with patch('models.engine.durability.os.replace',
+                   side_effect=OSError('crash')):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        os.remove(self.storage._FileStorage__file_path + '.tmp')
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(list(storage.all()), [f'BaseModel.{bm.id}'])
+
+    def test_reload_corrupt_file(self):
+        """Test that a corrupt file is kept aside with a warning"""
+        json_file = self.storage._FileStorage__file_path
+        with open(json_file, 'w', encoding='UTF-8') as file:
+            file.write('{"BaseModel.1": {"id": ')
+        with self.assertWarns(RuntimeWarning):
+            self.storage.reload()
+        self.assertEqual(self.storage.all(), {})
+        self.assertFalse(os.path.isfile(json_file))
+        with open(json_file + '.corrupt', encoding='UTF-8') as file:
+            self.assertEqual(file.read(), '{"BaseModel.1": {"id": ')
+        os.remove(json_file + '.corrupt')
+
+    def test_fsync_always(self):
+        """Test that the 'always' policy flushes every save"""
+        storage = FileStorage(fsync='always')
+        self.assertEqual(storage.fsync, 'always')
+        storage.new(BaseModel())
+        with patch('models.engine.durability.os.fsync') as fsync:
+            storage.save()
+        self.assertEqual(fsync.call_count, 2)
+
+
+class TestFileStorageContract(StorageContract, TestCase):
+    """Run the storage tests shared with the other engines"""
+    engine = FileStorage
+    file_path = 'test_file.json'
+
+
+class TestFileStorageLazy(TestCase):
+    """Tests for the lazy loading of FileStorage"""
+
+    def setUp(self):
+        use_test_paths(self)
+        self.json_file = FileStorage._FileStorage__file_path
+        writer = FileStorage()
+        self.users = [User() for _ in range(3)]
+        self.city = City()
+        self.city.state_id = 'ca'
+        for obj in self.users + [self.city]:
+            writer.new(obj)
+        writer.save()
+        self.storage = FileStorage(lazy=True)
+        self.storage.reload()
+
+    def tearDown(self):
+        if os.path.isfile(self.json_file):
+            os.remove(self.json_file)
+
+    def test_reload_builds_nothing(self):
+        """Test that reload keeps the dictionaries but builds nothing"""
+        self.assertEqual(len(self.storage._FileStorage__objects), 0)
+        self.assertEqual(self.storage.count(), 4)
+        self.assertEqual(self.storage.count(User), 3)
+        self.assertTrue(self.storage.exists(City, self.city.id))
+        self.assertEqual(len(self.storage._FileStorage__objects), 0)
+
+    def test_get_builds_one(self):
+        """Test that get only builds the instance it returns"""
+        user = self.storage.get(User, self.users[0].id)
+        self.assertEqual(user.to_dict(), self.users[0].to_dict())
+        self.assertIs(self.storage.get(User, user.id), user)
+        self.assertEqual(len(self.storage._FileStorage__objects), 1)
+        self.assertEqual(self.storage.count(User), 3)
+
+    def test_all_builds_class(self):
+        """Test that all(cls) only builds the instances of cls"""
+        self.assertEqual(len(self.storage.all(User)), 3)
+        self.assertEqual(len(self.storage._FileStorage__objects), 3)
+        self.assertEqual(len(self.storage.all()), 4)
+
+    def test_find(self):
+        """Test that find builds and indexes the class it looks into"""
+        found = self.storage.find(City, 'state_id', 'ca')
+        self.assertEqual([city.id for city in found], [self.city.id])
+
+    def test_save_keeps_unbuilt(self):
+        """Test that save writes the instances that were never built"""
+        user = self.storage.get(User, self.users[0].id)
+        user.first_name = 'Betty'
+        self.storage.new(user)
+        self.storage.save()
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(storage.count(), 4)
+        self.assertEqual(storage.get(User, self.users[0].id).first_name,
+                         'Betty')
 
-    def test_reload(self):
-        """Test if it correctly deserializes the JSON file to __objects"""
 
+class TestFileStorageFormats(TestCase):
+    """Tests for the file formats and the streaming reload"""
+
+    def setUp(self):
+        use_test_paths(self)
+        self.json_file = FileStorage._FileStorage__file_path
+        self.users = [User() for _ in range(3)]
+
+    def tearDown(self):
+        for path in (self.json_file, self.json_file + '.log'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def test_unknown_format(self):
+        """Test that an unknown format is rejected"""
+        with self.assertRaises(ValueError):
+            FileStorage(file_format='xml')
+
+    def test_ndjson(self):
+        """Test that ndjson files have one object per line"""
+        storage = FileStorage(file_format='ndjson')
+        for user in self.users:
+            storage.new(user)
+        storage.save()
+        with open(self.json_file, encoding='UTF-8') as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(lines, [user.to_dict() for user in self.users])
+
+        storage = FileStorage(file_format='ndjson')
+        storage.reload()
+        self.assertEqual(list(storage.all()),
+                         [f'User.{user.id}' for user in self.users])
+
+    def test_ndjson_over_json(self):
+        """Test that a json file read as ndjson, by reload() or by the merge
+        of save(), is kept aside with a warning"""
+        self.addCleanup(os.remove, self.json_file + '.corrupt')
+        for read in ('reload', 'save'):
+            with self.subTest(read=read):
+                storage = FileStorage()
+                storage.new(self.users[0])
+                storage.save()
+                storage = FileStorage(file_format='ndjson')
+                storage.new(self.users[1])
+                with self.assertWarns(RuntimeWarning):
+                    getattr(storage, read)()
+                self.assertTrue(os.path.isfile(self.json_file + '.corrupt'))
+
+    def test_ndjson_log_mode(self):
+        """Test that the log is compacted into an ndjson file"""
+        storage = FileStorage(mode='log', file_format='ndjson')
+        for user in self.users:
+            storage.new(user)
+        storage.save()
+        storage.delete(self.users[0])
+        storage.save()
+        storage.compact()
+        storage = FileStorage(file_format='ndjson')
+        storage.reload()
+        self.assertEqual(list(storage.all()),
+                         [f'User.{user.id}' for user in self.users[1:]])
+
+    def test_reload_keeps_file_text(self):
+        """Test that the text read by reload is reused by save instead of
+        encoding the objects again"""
+        with open(self.json_file, 'w', encoding='UTF-8') as file:
+            json.dump({f'User.{user.id}': user.to_dict()
+                       for user in self.users}, file, indent=2)
+        storage = FileStorage()
+        storage.reload()
+        with patch.object(storage.codec, 'dumps_instance') as dumps:
+            storage.save()
+        dumps.assert_not_called()
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(len(storage.all()), 3)
+
+    def test_reload_applies_log_in_place(self):
+        """Test that the log replaces the entries of the file where they
+        are"""
+        storage = FileStorage(mode='log')
+        for user in self.users:
+            storage.new(user)
+        storage.save()
+        storage.compact()
+        self.users[0].first_name = 'Betty'
+        storage.new(self.users[0])
+        storage.delete(self.users[1])
+        storage.save()
+        storage = FileStorage(mode='log')
+        storage.reload()
+        self.assertEqual(list(storage.all()),
+                         [f'User.{user.id}' for user in
+                          (self.users[0], self.users[2])])
+        self.assertEqual(storage.find(User, 'first_name', 'Betty'),
+                         [storage.get(User, self.users[0].id)])
+
+
+class TestFileStorageSharded(TestCase):
+    """Tests for the sharded layout, a file per class"""
+
+    def setUp(self):
+        use_test_paths(self)
+        self.storage = FileStorage(layout='sharded')
+        self.shards_path = self.storage.shards_path
+        self.user = User()
+        self.state = State()
+        self.storage.new(self.user)
+        self.storage.new(self.state)
+        self.storage.save()
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.shards_path, ignore_errors=True)
+
+    def inodes(self):
+        # files are replaced by a rename, a rewritten file is a new inode
+        return {name: os.stat(os.path.join(self.shards_path, name)).st_ino
+                for name in os.listdir(self.shards_path)}
+
+    def test_log_mode(self):
+        """Test that the sharded layout needs the snapshot mode"""
+        with self.assertRaises(ValueError):
+            FileStorage(mode='log', layout='sharded')
+
+    def test_file_per_class(self):
+        """Test that every class has its own file"""
+        self.assertEqual(sorted(os.listdir(self.shards_path)),
+                         ['State.json', 'User.json'])
+        with open(os.path.join(self.shards_path, 'User.json'),
+                  encoding='UTF-8') as file:
+            self.assertEqual(list(json.load(file)), [f'User.{self.user.id}'])
+
+    def test_save_rewrites_dirty_shards(self):
+        """Test that save only rewrites the files of the changed classes"""
+        before = self.inodes()
+        self.storage.delete(self.user)
+        self.storage.new(City())
+        self.storage.save()
+        after = self.inodes()
+        self.assertEqual(after['State.json'], before['State.json'])
+        self.assertNotEqual(after['User.json'], before['User.json'])
+        self.assertIn('City.json', after)
+
+        storage = FileStorage(layout='sharded')
+        storage.reload()
+        self.assertEqual(storage.count(User), 0)
+        self.assertEqual(storage.count(City), 1)
+        self.assertEqual(storage.count(State), 1)
+
+    def test_reload_classes(self):
+        """Test that reload can load some classes only and that the others
+        are kept by the next saves"""
+        storage = FileStorage(layout='sharded')
+        storage.reload(classes=[User])
+        self.assertEqual(list(storage.all()), [f'User.{self.user.id}'])
+        state = State()
+        storage.new(state)
+        storage.save()  # the State file keeps the state it did not load
+        storage = FileStorage(layout='sharded')
+        storage.reload(classes=['State'])
+        self.assertEqual(set(storage.all()), {f'State.{self.state.id}',
+                                              f'State.{state.id}'})
+
+    def test_reload_classes_single(self):
+        """Test that the single layout can only reload every class"""
+        with self.assertRaises(ValueError):
+            FileStorage().reload(classes=[User])
+
+    def test_async(self):
+        """Test that the background writer only rewrites dirty shards"""
+        storage = FileStorage(layout='sharded', async_save=True)
+        storage.reload()
+        before = self.inodes()
+        city = City()
+        storage.new(city)
+        storage.save()
+        storage.delete(storage.get(User, self.user.id))
+        storage.save()
+        storage.close()
+        after = self.inodes()
+        self.assertEqual(after['State.json'], before['State.json'])
+        storage = FileStorage(layout='sharded')
+        storage.reload()
+        self.assertEqual(set(storage.all()), {f'State.{self.state.id}',
+                                              f'City.{city.id}'})
+
+
+class TestFileStorageAsync(TestCase):
+    """Tests for the saves written by the background writer"""
+
+    def setUp(self):
+        use_test_paths(self)
+        self.storage = FileStorage(async_save=True)
+        self.json_file = self.storage._FileStorage__file_path
+
+    def tearDown(self):
+        self.storage.close()
+        for path in (self.json_file, self.json_file + '.log'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def read(self):
+        with open(self.json_file, encoding='UTF-8') as file:
+            return json.load(file)
+
+    def test_flush(self):
+        """Test that the saves are in the file after flush"""
+        bms = [BaseModel() for _ in range(3)]
+        for bm in bms:
+            self.storage.new(bm)
+            self.storage.save()
+        bms[0].name = 'updated'
+        self.storage.new(bms[0])
+        self.storage.delete(bms[1])
+        self.storage.save()
+        self.storage.flush()
+
+        snapshot = self.read()
+        self.assertEqual(list(snapshot), [f'BaseModel.{bm.id}'
+                                          for bm in (bms[0], bms[2])])
+        self.assertEqual(snapshot[f'BaseModel.{bms[0].id}']['name'],
+                         'updated')
+
+    def test_saves_are_coalesced(self):
+        """Test that the saves made during a write are written at once"""
+        busy = threading.Event()
+        writes = []
+
+        def write(path, text, sync):
+            writes.append((path, ''.join(text)))
+            busy.wait()
+
+        with patch('models.engine.file_storage.atomic_write',
+                   side_effect=write):
+            for _ in range(5):
+                self.storage.new(BaseModel())
+                self.storage.save()
+            busy.set()
+            self.storage.flush()
+        self.assertLessEqual(len(writes), 2)
+        self.assertEqual(len(json.loads(writes[-1][1])), 5)
+
+    def test_refresh_waits_for_changes(self):
+        """Test that refresh only waits for the writer when another process
+        changed the file"""
+        busy = threading.Event()
+
+        def write(*args):
+            busy.wait()
+            atomic_write(*args)
+
+        self.storage.reload()
+        with patch('models.engine.file_storage.atomic_write',
+                   side_effect=write):
+            self.storage.new(BaseModel())
+            self.storage.save()
+            refresh = threading.Thread(target=self.storage.refresh)
+            refresh.start()
+            refresh.join(5)
+            busy.set()
+            self.assertFalse(refresh.is_alive())
+        other = FileStorage()
+        other.new(User())
+        other.save()
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.assertTrue(self.storage.refresh())
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(len(self.read()), 3)
+
+    def test_write_error(self):
+        """Test that a failed write is raised by flush and retried"""
+        self.storage.new(BaseModel())
+        with patch('models.engine.file_storage.atomic_write',
+                   side_effect=OSError('disk full')):
+            self.storage.save()
+            with self.assertRaises(OSError):
+                self.storage.flush()
+        self.storage.save()
+        self.storage.flush()
+        self.assertEqual(len(self.read()), 1)
+
+    def test_close_and_reload(self):
+        """Test that close writes the pending saves and that the storage
+        can be used after it"""
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        self.storage.close()
+        self.assertIn(f'BaseModel.{bm.id}', self.read())
+
+        self.storage.reload()
+        self.storage.delete(self.storage.get(BaseModel, bm.id))
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.read(), {})
+
+    def test_log_mode(self):
+        """Test that the log appends are written by the writer"""
+        storage = FileStorage(mode='log', async_save=True)
+        bm = BaseModel()
+        storage.new(bm)
+        storage.save()
+        storage.close()
+        storage = FileStorage(mode='log')
+        storage.reload()
+        self.assertIn(f'BaseModel.{bm.id}', storage.all())
+
+
+class TestFileStorageLogMode(TestCase):
+    """Tests for the append-only log mode of FileStorage"""
+
+    def setUp(self):
+        use_test_paths(self)
+        self.storage = FileStorage(mode='log', log_threshold=100)
+        self.storage._FileStorage__objects = {}
+        self.json_file = self.storage._FileStorage__file_path
+        self.log_file = self.json_file + '.log'
+
+    def tearDown(self):
+        for path in (self.json_file, self.log_file,
+                     self.json_file + '.log.compacting'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def test_unknown_mode(self):
+        """Test that an unknown mode is rejected"""
+        with self.assertRaises(ValueError):
+            FileStorage(mode='unknown')
+
+    def test_save_appends(self):
+        """Test that save only appends the changed objects to the log"""
         bm1 = BaseModel()
-        self.storage.new(bm1)  # __objects is changed to it previous state
+        self.storage.new(bm1)
+        self.storage.save()
+        bm2 = BaseModel()
+        self.storage.new(bm2)
+        self.storage.save()
+        self.storage.save()  # nothing changed, nothing appended
 
-        obj_prev_state = self.storage.all().copy()
-        self.storage.save()  # write the object to the file
+        self.assertFalse(os.path.isfile(self.json_file))
+        with open(self.log_file, encoding='UTF-8') as file:
+            self.assertEqual(len(file.readlines()), 2)
 
+    def test_reload_replays_log(self):
+        """Test that reload rebuilds __objects from the log"""
+        bm1 = BaseModel()
         bm2 = BaseModel()
+        self.storage.new(bm1)
         self.storage.new(bm2)
-        self.storage.reload()  # override
+        self.storage.save()
+        bm1.name = 'updated'
+        self.storage.new(bm1)
+        self.storage.delete(bm2)
+        self.storage.save()
+
+        self.storage.reload()
+        objs = self.storage.all()
+        self.assertEqual(list(objs.keys()), [f'BaseModel.{bm1.id}'])
+        self.assertEqual(objs[f'BaseModel.{bm1.id}'].name, 'updated')
+
+    def test_append_after_crash(self):
+        """Test that the records appended after a crash in the middle of
+        an append are read back"""
+        self.storage.new(User())
+        self.storage.save()
+        with open(self.log_file, 'a', encoding='UTF-8') as file:
+            file.write('{"op":"put","key":"User.torn","obj":{"id"')
+        size = os.path.getsize(self.log_file)
+        self.storage.reload()  # cuts the torn record
+        self.assertLess(os.path.getsize(self.log_file), size)
+        self.storage.new(User())
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(self.storage.count(User), 2)
+
+        # appended before a reload cut it
+        with open(self.log_file, 'a', encoding='UTF-8') as file:
+            file.write('{"op":"put","key":"User.torn"')
+        self.storage.new(User())
+        self.storage.save()
+        storage = FileStorage(mode='log')
+        storage.reload()
+        self.assertEqual(storage.count(User), 3)
+
+    def test_compact(self):
+        """Test that compaction writes a snapshot and removes the log"""
+        bms = [BaseModel() for _ in range(3)]
+        for bm in bms:
+            self.storage.new(bm)
+        self.storage.save()
+        self.storage.delete(bms[0])
+        self.storage.save()
+        self.storage.compact()
+
+        self.assertFalse(os.path.isfile(self.log_file))
+        with open(self.json_file, encoding='UTF-8') as file:
+            snapshot = json.load(file)
+        self.assertEqual(set(snapshot), {f'BaseModel.{bm.id}'
+                                         for bm in bms[1:]})
+
+    def test_compact_when_threshold_exceeded(self):
+        """Test that save compacts the log once it passes the threshold"""
+        for _ in range(101):
+            self.storage.new(BaseModel())
+        self.storage.save()
+        self.storage.reload()  # waits for the background compaction
+
+        self.assertFalse(os.path.isfile(self.log_file))
+        self.assertEqual(len(self.storage.all()), 101)
+
+    def test_snapshot_save_folds_log(self):
+        """Test that a snapshot save makes the log redundant"""
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        snapshot_storage = FileStorage()
+        snapshot_storage._FileStorage__objects = {}
+        snapshot_storage.reload()
+        self.assertIn(f'BaseModel.{bm.id}', snapshot_storage.all())
+        snapshot_storage.save()
+        self.assertFalse(os.path.isfile(self.log_file))
+
+    def test_fsync_always(self):
+        """Test that the 'always' policy flushes every append"""
+        storage = FileStorage(mode='log', fsync='always')
+        storage.new(BaseModel())
+        with patch('models.engine.durability.os.fsync') as fsync:
+            storage.save()  # the log file and its new directory entry
+            self.assertEqual(fsync.call_count, 2)
+            storage.new(BaseModel())
+            storage.save()
+            self.assertEqual(fsync.call_count, 3)
+
+
+class TestFileStorageProcesses(TestCase):
+    """Tests for storages of several processes sharing the same files,
+    played by several instances"""
+
+    def setUp(self):
+        use_test_paths(self)
+        self.storage = FileStorage()
+        self.user = User()
+        self.state = State()
+        self.storage.new(self.user)
+        self.storage.new(self.state)
+        self.storage.save()
+        self.other = FileStorage()
+        self.other.reload()
+
+    def tearDown(self):
+        json_file = self.storage.file_path
+        for path in (json_file, json_file + '.log',
+                     json_file + '.log.compacting'):
+            if os.path.isfile(path):
+                os.remove(path)
+        shutil.rmtree(self.storage.shards_path, ignore_errors=True)
+
+    def test_refresh_unchanged(self):
+        """Test that refresh does nothing when the files did not change"""
+        self.assertFalse(self.other.refresh())
+
+    def test_refresh(self):
+        """Test that refresh loads the objects changed, created and deleted
+        by another storage"""
+        user = self.other.get(User, self.user.id)
+        user.first_name = 'Betty'
+        self.other.new(user)
+        self.other.delete(self.other.get(State, self.state.id))
+        city = City()
+        self.other.new(city)
+        self.other.save()
+
+        self.assertTrue(self.storage.refresh())
+        self.assertEqual(set(self.storage.all()), {f'User.{self.user.id}',
+                                                   f'City.{city.id}'})
+        self.assertEqual(self.storage.get(User, self.user.id).first_name,
+                         'Betty')
+        self.assertEqual([obj.id for obj in
+                          self.storage.find(City, 'state_id', '')],
+                         [city.id])
+        self.assertFalse(self.storage.refresh())
+
+    def test_refresh_keeps_unsaved_changes(self):
+        """Test that the objects changed and not saved yet are kept"""
+        user = self.other.get(User, self.user.id)
+        user.first_name = 'Betty'
+        self.other.new(user)
+        self.other.save()
+        self.user.first_name = 'Holberton'
+        self.storage.new(self.user)
+
+        self.storage.refresh()
+        self.assertIs(self.storage.get(User, self.user.id), self.user)
+        self.assertEqual(self.user.first_name, 'Holberton')
+
+    def test_save_merges(self):
+        """Test that a save does not overwrite the saves of another
+        storage"""
+        city = City()
+        self.other.new(city)
+        self.other.save()
+        state = State()
+        self.storage.new(state)
+        self.storage.save()
+
+        storage = FileStorage()
+        storage.reload()
+        self.assertEqual(set(storage.all()), {
+            f'User.{self.user.id}', f'State.{self.state.id}',
+            f'City.{city.id}', f'State.{state.id}'})
+
+    def test_log_mode(self):
+        """Test that refresh replays the records appended by another
+        storage in log mode"""
+        storage = FileStorage(mode='log')
+        storage.reload()
+        other = FileStorage(mode='log')
+        other.reload()
+        city = City()
+        other.new(city)
+        other.delete(other.get(User, self.user.id))
+        other.save()
+
+        self.assertTrue(storage.refresh())
+        self.assertEqual(set(storage.all()), {f'State.{self.state.id}',
+                                              f'City.{city.id}'})
+
+    def test_sharded(self):
+        """Test that refresh only reads the class files that changed"""
+        storage = FileStorage(layout='sharded')
+        storage.new(self.user)
+        storage.new(self.state)
+        storage.save()
+        other = FileStorage(layout='sharded')
+        other.reload()
+        city = City()
+        other.new(city)
+        other.save()
 
-        self.assertEqual(obj_prev_state.keys(), self.storage.all().keys())
-        self.assertIsInstance(self.storage.all(), dict)
+        with patch.object(storage, '_FileStorage__merge',
+                          wraps=storage._FileStorage__merge) as merge:
+            self.assertTrue(storage.refresh())
+        merge.assert_called_once_with('City')
+        self.assertIs(storage.get(City, city.id).__class__,
+                      models.classes['City'])
+        self.assertEqual(storage.count(), 3)
 
+    def test_processes(self):
+        """Test that processes saving at the same time keep every object"""
+        script = (
+            'from models.base_model import BaseModel\n'
+            'from models.engine.file_storage import FileStorage\n'
+            f'FileStorage._FileStorage__file_path = '
+            f'{self.storage.file_path!r}\n'
+            'storage = FileStorage()\n'
+            'storage.reload()\n'
+            'for _ in range(20):\n'
+            '    storage.new(BaseModel())\n'
+            '    storage.save()\n'
+        )
+        processes = [subprocess.Popen([sys.executable, '-c', script])
+                     for _ in range(2)]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+        self.other.refresh()
+        self.assertEqual(self.other.count(BaseModel), 40)
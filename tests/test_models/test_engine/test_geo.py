@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Unit Test for the GeoIndex class
+
+Module: test_geo
+Class: TestGeoIndex
+"""
+from unittest import TestCase
+from unittest.mock import patch
+from models.engine import geo
+from models.engine.geo import GeoIndex, distance
+from models.place import Place
+
+
+class TestGeoIndex(TestCase):
+    """Test GeoIndex class"""
+
+    def setUp(self):
+        self.index = GeoIndex()
+        self.places = {}
+        for name, lat, lon in (('sf', 37.7749, -122.4194),
+                               ('oakland', 37.8044, -122.2712),
+                               ('la', 34.0522, -118.2437),
+                               ('fiji', -17.7134, 178.0650),
+                               ('samoa', -13.7590, -172.1046)):
+            place = Place()
+            place.__dict__.update(name=name, latitude=lat, longitude=lon)
+            self.places[name] = place
+        self.index.rebuild((f'Place.{place.id}', place)
+                           for place in self.places.values())
+
+    def names(self, found):
+        return [obj.name for obj in found]
+
+    def test_distance(self):
+        """Test the great-circle distance"""
+        self.assertAlmostEqual(distance(37.7749, -122.4194, 34.0522,
+                                        -118.2437), 559, delta=1)
+        self.assertEqual(distance(10, 10, 10, 10), 0)
+
+    def test_within_radius(self):
+        """Test that a radius search returns the places nearest first"""
+        found = self.index.within_radius(37.7749, -122.4194, 20)
+        self.assertEqual(self.names(obj for _, obj in found),
+                         ['sf', 'oakland'])
+        self.assertEqual(found[0][0], 0)
+        self.assertEqual(self.names(obj for _, obj in
+                                    self.index.within_radius(37.7749,
+                                                             -122.4194,
+                                                             600)),
+                         ['sf', 'oakland', 'la'])
+
+    def test_antimeridian(self):
+        """Test that searches go across the 180th meridian"""
+        found = self.index.within_radius(-15, 179.9, 1200)
+        self.assertCountEqual(self.names(obj for _, obj in found),
+                              ['fiji', 'samoa'])
+        self.assertCountEqual(self.names(self.index.within_box(
+            -20, 170, -10, -170)), ['fiji', 'samoa'])
+        self.assertEqual(self.names(self.index.within_box(
+            -20, -170, -10, 170)), [])
+
+    def test_within_box(self):
+        """Test that a box search returns the places inside the box"""
+        self.assertCountEqual(self.names(self.index.within_box(
+            30, -125, 40, -115)), ['sf', 'oakland', 'la'])
+        self.assertEqual(self.names(self.index.within_box(
+            35, -125, 40, -122.3)), ['sf'])
+
+    def test_nearest(self):
+        """Test that the nearest places are found at any distance"""
+        self.assertEqual(self.names(obj for _, obj in
+                                    self.index.nearest(36, -120, 2)),
+                         ['la', 'oakland'])
+        self.assertEqual(len(self.index.nearest(0, 0, 10)), 5)
+        self.assertEqual(self.index.nearest(0, 0, 0), [])
+
+    def test_add_moves_object(self):
+        """Test that new coordinates move the place and that invalid ones
+        are not indexed"""
+        place = self.places['la']
+        key = f'Place.{place.id}'
+        self.index.add(key, place, latitude=37.78, longitude=-122.42)
+        self.assertIn('la', self.names(
+            obj for _, obj in self.index.within_radius(37.7749, -122.4194,
+                                                       5)))
+        self.index.add(key, place, latitude=None)
+        self.assertEqual(len(self.index), 4)
+        self.index.add(key, place, latitude=91.0)
+        self.assertEqual(len(self.index), 4)
+        self.index.discard(key)
+        self.index.discard(key)
+        self.assertEqual(len(self.index), 4)
+
+    def test_default_coordinates(self):
+        """Test that places left at the default coordinates are not found
+        near (0, 0), unlike places set there"""
+        unset, half_set, null_island = Place(), Place(), Place()
+        half_set.latitude = 0.5
+        null_island.__dict__.update(latitude=0.0, longitude=0.0)
+        for place in (unset, half_set, null_island):
+            self.index.add(f'Place.{place.id}', place)
+        self.assertEqual([obj for _, obj in self.index.within_radius(0, 0,
+                                                                     100)],
+                         [null_island])
+        self.index.rebuild((f'Place.{place.id}', place)
+                           for place in (unset, half_set))
+        self.assertEqual(self.index.nearest(0, 0), [])
+        self.index.add(f'Place.{unset.id}', unset, latitude=1.0,
+                       longitude=1.0)
+        self.assertEqual(len(self.index), 1)
+
+    def test_numpy_distances(self):
+        """Test that the vectorized pass, when NumPy is installed, finds
+        the same places"""
+        if geo.numpy is None:
+            self.skipTest('NumPy is not installed')
+        with patch.object(geo, 'NUMPY_THRESHOLD', 1):
+            found = self.index.within_radius(37.7749, -122.4194, 600)
+        self.assertEqual(self.names(obj for _, obj in found),
+                         ['sf', 'oakland', 'la'])
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Unit Test for the AttributeIndex class
+
+Module: test_index
+Classes: TestAttributeIndex, TestMemberIndex, TestSortedIndex
+"""
+from datetime import datetime
+from unittest import TestCase
+from models.city import City
+from models.engine.index import AttributeIndex, MemberIndex, SortedIndex
+from models.place import Place
+
+
+class TestAttributeIndex(TestCase):
+    """Test AttributeIndex class"""
+
+    def setUp(self):
+        self.index = AttributeIndex('state_id')
+        self.city = City()
+        self.city.state_id = 'ca'
+        self.key = f'City.{self.city.id}'
+
+    def test_add_and_find(self):
+        """Test that an object is found under its attribute value"""
+        self.index.add(self.key, self.city)
+        self.assertEqual(self.index.find('ca'), [self.city])
+        self.assertEqual(self.index.find('ny'), [])
+        self.assertEqual(len(self.index), 1)
+
+    def test_add_moves_object(self):
+        """Test that adding an object again moves it to the new value"""
+        self.index.add(self.key, self.city)
+        self.index.add(self.key, self.city, 'ny')
+        self.assertEqual(self.index.find('ca'), [])
+        self.assertEqual(self.index.find('ny'), [self.city])
+        self.index.add(self.key, self.city, None)
+        self.assertEqual(self.index.find(None), [self.city])
+
+    def test_discard(self):
+        """Test that a discarded object is no longer found"""
+        self.index.add(self.key, self.city)
+        self.index.discard(self.key)
+        self.index.discard(self.key)  # discarding twice is harmless
+        self.assertEqual(self.index.find('ca'), [])
+        self.assertEqual(len(self.index), 0)
+
+    def test_unhashable_value(self):
+        """Test that unhashable values are ignored"""
+        self.index.add(self.key, self.city, ['ca'])
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.find(['ca']), [])
+
+
+class TestMemberIndex(TestCase):
+    """Test MemberIndex class"""
+
+    def setUp(self):
+        self.index = MemberIndex('amenity_ids')
+        self.place = Place()
+        self.place.__dict__['amenity_ids'] = ['wifi', 'pool']
+        self.key = f'Place.{self.place.id}'
+
+    def test_add_and_find(self):
+        """Test that an object is found under every item of its list"""
+        self.index.add(self.key, self.place)
+        self.assertEqual(self.index.find('wifi'), [self.place])
+        self.assertEqual(self.index.find('pool'), [self.place])
+        self.assertEqual(self.index.find('gym'), [])
+        self.index.add(self.key, self.place, ['gym', ['unhashable']])
+        self.assertEqual(self.index.find('wifi'), [])
+        self.assertEqual(self.index.find('gym'), [self.place])
+
+    def test_discard(self):
+        """Test that a discarded object, or one without a list, is no
+        longer found"""
+        self.index.add(self.key, self.place)
+        self.index.discard(self.key)
+        self.assertEqual(self.index.find('wifi'), [])
+        self.index.add(self.key, self.place, 'wifi')
+        self.assertEqual(self.index.find('wifi'), [])
+        self.assertEqual(len(self.index), 0)
+
+
+class TestSortedIndex(TestCase):
+    """Test SortedIndex class"""
+
+    def setUp(self):
+        self.index = SortedIndex('price_by_night')
+        self.places = {}
+        for price in (50, 200, 100, 50, 150):
+            place = Place()
+            place.price_by_night = price
+            self.places[f'Place.{place.id}'] = place
+        self.index.rebuild(self.places.items())
+
+    def prices(self, places):
+        return [place.price_by_night for place in places]
+
+    def test_range(self):
+        """Test that a range returns the objects in order"""
+        self.assertEqual(self.prices(self.index.range(50, 150)),
+                         [50, 50, 100, 150])
+        self.assertEqual(self.prices(self.index.range(
+            50, 150, include_low=False, include_high=False)), [100])
+        self.assertEqual(self.prices(self.index.range(high=99)), [50, 50])
+        self.assertEqual(self.prices(self.index.range(low=101)),
+                         [150, 200])
+        self.assertEqual(self.prices(self.index.range()),
+                         [50, 50, 100, 150, 200])
+        self.assertEqual(self.index.range(300, 400), [])
+
+    def test_reverse_and_limit(self):
+        """Test that a range can start with the highest values and stop
+        early"""
+        self.assertEqual(self.prices(self.index.range(reverse=True,
+                                                      limit=2)), [200, 150])
+        self.assertEqual(self.prices(self.index.range(high=100, limit=2)),
+                         [50, 50])
+        self.assertEqual(self.prices(self.index.range(
+            low=60, reverse=True)), [200, 150, 100])
+
+    def test_add_moves_object(self):
+        """Test that adding an object again moves it in the order"""
+        key, place = next(iter(self.places.items()))
+        self.index.add(key, place, 500)
+        self.assertEqual(self.prices(self.index.range(low=400)), [50])
+        self.assertEqual(len(self.index), 5)
+        self.index.discard(key)
+        self.assertEqual(self.index.range(low=400), [])
+        self.assertEqual(len(self.index), 4)
+
+    def test_find(self):
+        """Test that find returns the objects holding a value"""
+        self.assertEqual(self.prices(self.index.find(50)), [50, 50])
+        self.assertEqual(self.index.find(75), [])
+
+    def test_values_of_other_types(self):
+        """Test that values that cannot be compared with each other are
+        kept apart"""
+        index = SortedIndex('updated_at')
+        dated, named, empty = Place(), Place(), Place()
+        index.add('dated', dated, datetime(2024, 1, 1))
+        index.add('named', named, 'x')
+        index.add('empty', empty, None)
+        self.assertEqual(index.range(low=datetime(2023, 1, 1)), [dated])
+        self.assertEqual(index.range(low='a'), [named])
+        self.assertEqual(index.range(low=1, high='z'), [])
+        self.assertEqual(index.find(None), [empty])
+        self.assertEqual(len(index), 3)
+        index.discard('empty')
+        self.assertEqual(index.find(None), [])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Unit Test for the metrics registry
+
+Module: test_metrics
+Classes: TestHistogram, TestMetrics
+"""
+import json
+import os
+import tempfile
+from unittest import TestCase
+from models.engine import metrics
+from models.engine.metrics import Histogram, Metrics, profile
+
+
+class TestHistogram(TestCase):
+    """Test Histogram class"""
+
+    def test_percentiles(self):
+        """Test that the percentiles are within a bucket of the exact
+        ones"""
+        histogram = Histogram()
+        durations = [i / 10000 for i in range(1, 1001)]
+        for seconds in reversed(durations):
+            histogram.observe(seconds)
+        for percent in (50, 90, 99):
+            exact = durations[percent * 10 - 1]
+            self.assertGreaterEqual(histogram.percentile(percent), exact)
+            self.assertLessEqual(histogram.percentile(percent),
+                                 exact * 1.125)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        stats = histogram.snapshot()
+        self.assertEqual(stats['count'], 1000)
+        self.assertAlmostEqual(stats['mean'], 50.05)
+        self.assertEqual((stats['min'], stats['max']), (0.1, 100.0))
+        self.assertIsNone(Histogram().percentile(50))
+
+
+class TestMetrics(TestCase):
+    """Test Metrics class"""
+
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_disabled(self):
+        """Test that a disabled registry records nothing"""
+        self.metrics.count('calls')
+        self.metrics.observe('op', 0.1)
+        with self.metrics.timer('op'):
+            pass
+        self.assertEqual(self.metrics.snapshot(),
+                         {'counters': {}, 'latency_ms': {}})
+        self.assertEqual(self.metrics.report(), 'no metrics recorded')
+
+    def test_record(self):
+        """Test the counters and timers of an enabled registry"""
+        self.metrics.enable()
+        self.metrics.count('bytes', 10)
+        self.metrics.count('bytes', 5)
+        with self.metrics.timer('op'):
+            pass
+        self.metrics.observe('op', 0.002)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['counters'], {'bytes': 15})
+        self.assertEqual(snapshot['latency_ms']['op']['count'], 2)
+        self.assertEqual(snapshot['latency_ms']['op']['max'], 2.0)
+        self.assertIn('op', self.metrics.report())
+        self.metrics.disable()
+        self.metrics.count('bytes')
+        self.assertEqual(self.metrics.snapshot()['counters'], {'bytes': 15})
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot()['counters'], {})
+
+    def test_timed(self):
+        """Test that timed functions are observed by the registry when it
+        is enabled"""
+        @metrics.timed('test.function')
+        def function(value):
+            return value * 2
+
+        enabled = metrics.registry.enabled
+        try:
+            metrics.registry.enabled = False
+            self.assertEqual(function(2), 4)
+            self.assertNotIn('test.function',
+                             metrics.registry.snapshot()['latency_ms'])
+            metrics.registry.enabled = True
+            self.assertEqual(function(3), 6)
+            self.assertEqual(metrics.registry.snapshot()['latency_ms']
+                             ['test.function']['count'], 1)
+        finally:
+            metrics.registry.enabled = enabled
+            metrics.registry.reset()
+
+    def test_dump(self):
+        """Test that dump writes the snapshot as JSON"""
+        self.metrics.enable()
+        self.metrics.count('calls')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'metrics.json')
+            self.metrics.dump(path)
+            with open(path, encoding='UTF-8') as file:
+                self.assertEqual(json.load(file),
+                                 self.metrics.snapshot())
+
+    def test_profile(self):
+        """Test that profile returns the result and a report"""
+        result, report = profile(lambda: sorted(range(1000)))
+        self.assertEqual(result, list(range(1000)))
+        self.assertIn('function calls', report)
+        result, report = profile(lambda: [str(i) for i in range(1000)],
+                                 'memory', limit=5)
+        self.assertEqual(len(result), 1000)
+        self.assertTrue(report.startswith('peak '))
+        self.assertLessEqual(len(report.splitlines()), 6)
+        with self.assertRaises(ValueError):
+            profile(list, 'disk')
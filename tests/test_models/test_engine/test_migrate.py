@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Unit Test for the migration between the storage layouts
+
+Module: test_migrate
+Class: TestMigrate
+"""
+import os
+import shutil
+from unittest import TestCase
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.engine.migrate import to_sharded, to_single
+from models.user import User
+
+
+class TestMigrate(TestCase):
+    """Test the round trip between the single and the sharded layouts"""
+
+    file_path = 'test_migrate.json'
+    shards_path = 'test_migrate'
+
+    def setUp(self):
+        self.paths = (FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__shards_path)
+        FileStorage._FileStorage__file_path = self.file_path
+        FileStorage._FileStorage__shards_path = self.shards_path
+
+    def tearDown(self):
+        (FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__shards_path) = self.paths
+        for path in (self.file_path, self.file_path + '.log'):
+            if os.path.isfile(path):
+                os.remove(path)
+        shutil.rmtree(self.shards_path, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Test that the objects survive both conversions"""
+        for mode in FileStorage.modes:
+            with self.subTest(mode=mode):
+                storage = FileStorage(mode=mode)
+                objs = [User(), User(), City()]
+                for obj in objs:
+                    storage.new(obj)
+                storage.save()
+                keys = {f'{type(obj).__name__}.{obj.id}' for obj in objs}
+
+                self.assertEqual(to_sharded(self.file_path,
+                                            self.shards_path), 3)
+                self.assertEqual(sorted(os.listdir(self.shards_path)),
+                                 ['City.json', 'User.json'])
+                storage = FileStorage(layout='sharded')
+                storage.reload()
+                self.assertEqual(set(storage.all()), keys)
+
+                os.remove(self.file_path)
+                self.assertEqual(to_single(self.shards_path,
+                                           self.file_path), 3)
+                storage = FileStorage()
+                storage.reload()
+                self.assertEqual(set(storage.all()), keys)
+                shutil.rmtree(self.shards_path)
+                os.remove(self.file_path)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Unit Test for the snapshot file formats
+
+Module: test_snapshot
+Class: TestSnapshot
+"""
+import json
+import os
+from unittest import TestCase
+from models.engine.codec import get_codec
+from models.engine.snapshot import entry, iter_entries, iter_text, load
+
+
+class TestSnapshot(TestCase):
+    """Test the streaming readers and the writers of every format"""
+
+    path = 'test_snapshot.json'
+    objs = {f'User.{i}': {'id': str(i), '__class__': 'User',
+                          'name': 'é' * i, 'numbers': [i, i / 2]}
+            for i in range(20)}
+
+    def tearDown(self):
+        for path in (self.path, self.path + '.corrupt'):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def write(self, text):
+        with open(self.path, 'w', encoding='UTF-8') as file:
+            file.write(text)
+
+    def test_json_chunks(self):
+        """Test that entries cut by the end of a chunk are read, with
+        their exact text, whatever the whitespace"""
+        for indent in (None, 4):
+            self.write(json.dumps(self.objs, indent=indent))
+            for chunk_size in (1, 7, 4096):
+                with self.subTest(indent=indent, chunk_size=chunk_size):
+                    entries = list(iter_entries(self.path,
+                                                chunk_size=chunk_size))
+                    self.assertEqual({k: r for k, r, _ in entries},
+                                     self.objs)
+                    for key, record, text in entries:
+                        self.assertEqual(json.loads(text), record)
+
+    def test_empty(self):
+        """Test that empty files and objects have no entries"""
+        for text in ('', '  \n', '{}', ' { } '):
+            with self.subTest(text=text):
+                self.write(text)
+                self.assertEqual(list(iter_entries(self.path)), [])
+        self.assertEqual(list(iter_entries('no_such_file.json')), [])
+
+    def test_invalid(self):
+        """Test that truncated or invalid files raise ValueError"""
+        text = json.dumps(self.objs)
+        for bad in (text[:-1], text[:len(text) // 2], '[]', '{"a" 1}'):
+            with self.subTest(text=bad[-10:]):
+                self.write(bad)
+                with self.assertRaises(ValueError):
+                    list(iter_entries(self.path, chunk_size=16))
+
+    def test_invalid_ndjson(self):
+        """Test that lines which are not to_dict() raise ValueError, like a
+        json file read as ndjson"""
+        for bad in (json.dumps(self.objs), '{"id": "1"}', '[1, 2]', '{"a"'):
+            with self.subTest(text=bad[:10]):
+                self.write(bad + '\n')
+                with self.assertRaises(ValueError):
+                    list(iter_entries(self.path, file_format='ndjson'))
+
+    def test_load_quarantines(self):
+        """Test that load moves an invalid file aside with a warning"""
+        self.write('{"User.1": ')
+        with self.assertWarns(RuntimeWarning):
+            self.assertEqual(load(self.path), {})
+        self.assertTrue(os.path.isfile(self.path + '.corrupt'))
+
+    def test_round_trip(self):
+        """Test that iter_text writes what iter_entries reads, in order"""
+        codec = get_codec()
+        for file_format in ('json', 'ndjson'):
+            with self.subTest(file_format=file_format):
+                self.write(''.join(iter_text(
+                    (entry(key, codec.dumps(obj), codec, file_format)
+                     for key, obj in self.objs.items()), file_format)))
+                entries = list(iter_entries(self.path, codec, file_format))
+                self.assertEqual([(k, r) for k, r, _ in entries],
+                                 list(self.objs.items()))
+
+    def test_ndjson_lines(self):
+        """Test that ndjson entries are single lines"""
+        codec = get_codec()
+        text = json.dumps(self.objs['User.1'], indent=4)
+        line = entry('User.1', text, codec, 'ndjson')
+        self.assertNotIn('\n', line)
+        self.assertEqual(json.loads(line), self.objs['User.1'])
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Unit Test for the background writer
+
+Module: test_writer
+Class: TestBackgroundWriter
+"""
+import threading
+from unittest import TestCase
+from models.engine.writer import BackgroundWriter
+
+
+class TestBackgroundWriter(TestCase):
+    """Test the coalescing and error handling of BackgroundWriter"""
+
+    def test_flush(self):
+        """Test that flush returns once the changes are written"""
+        writes = []
+        writer = BackgroundWriter(writes.append)
+        writer.submit([1])
+        writer.flush()
+        self.assertEqual(writes, [[1]])
+        writer.close()
+
+    def test_coalesce(self):
+        """Test that the changes submitted during a write are written
+        together by the next one"""
+        writes = []
+        busy = threading.Event()
+
+        def write(changes):
+            writes.append(changes)
+            busy.wait()
+
+        writer = BackgroundWriter(write)
+        writer.submit([1])
+        for change in range(2, 5):
+            writer.submit([change])
+        busy.set()
+        writer.close()
+        self.assertEqual(sum(writes, []), [1, 2, 3, 4])
+        self.assertLessEqual(len(writes), 2)
+
+    def test_error(self):
+        """Test that a failed write is reported and retried"""
+        writes = []
+
+        def write(changes):
+            if not writes:
+                writes.append(None)
+                raise OSError('disk full')
+            writes.append(changes)
+
+        writer = BackgroundWriter(write)
+        writer.submit([1])
+        with self.assertRaises(OSError):
+            writer.flush()
+        writer.submit([2])
+        writer.flush()
+        self.assertEqual(writes, [None, [1, 2]])
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.submit([3])
@@ -5,7 +5,9 @@ Module: test_place
 Unit test for the Place class.
 """
 from unittest import TestCase
+from models.amenity import Amenity
 from models.place import Place
+from models.review import Review
 
 
 class TestPlace(TestCase):
@@ -35,3 +37,16 @@ class TestPlace(TestCase):
         self.assertEqual(place.latitude, 10.5)
         self.assertEqual(place.longitude, 20.5)
         self.assertEqual(place.amenity_ids, [])
+
+    def test_relationships(self):
+        """Test that the relationships follow the ids of the place"""
+        place = Place()
+        review = Review()
+        review.place_id = place.id
+        wifi = Amenity()
+        place.amenity_ids = [wifi.id, 'missing']
+        self.assertEqual(place.reviews, [review])
+        self.assertIs(review.place, place)
+        self.assertEqual(place.amenities, [wifi])
+        self.assertEqual(wifi.places, [place])
+        self.assertIsNone(place.city)
@@ -5,6 +5,7 @@ Module: test_state
 Unit test for the State class.
 """
 import unittest
+from models.city import City
 from models.state import State
 
 
@@ -14,3 +15,13 @@ class TestState(unittest.TestCase):
     def test_attributes(self):
         state = State()
         self.assertIsInstance(state.name, str)
+
+    def test_cities(self):
+        """Test that cities are the cities of the state"""
+        state = State()
+        city = City()
+        city.state_id = state.id
+        self.assertEqual(state.cities, [city])
+        self.assertIs(city.state, state)
+        with self.assertRaises(AttributeError):
+            state.cities = []